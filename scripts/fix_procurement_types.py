@@ -8,6 +8,8 @@ from dotenv import load_dotenv
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 load_dotenv()
 
+from src.enrichment.rule_tier import guess_procurement_type
+
 CHROMA_HOST = os.getenv("CHROMA_HOST", "136.114.154.210")
 CHROMA_PORT = int(os.getenv("CHROMA_PORT", 8002))
 COLLECTION_NAME = "tenders_v1"
@@ -46,15 +48,10 @@ def fix_types():
             
         # Rule 2: Unknown -> Keyword Guess
         elif ptype in ["Unknown", "Unclassified", "Other"]:
-            if any(k in title for k in ["work", "construction", "build", "road", "civil"]):
-                new_type = "Works"
-                stats["Unknown->Works"] += 1
-            elif any(k in title for k in ["supply", "purchase", "delivery", "procurement of", "equipment", "goods"]):
-                new_type = "Supply"
-                stats["Unknown->Supply"] += 1
-            elif any(k in title for k in ["service", "consult", "manpower", "hiring", "amc", "security", "cleaning"]):
-                new_type = "Services"
-                stats["Unknown->Services"] += 1
+            # Same rules as the enrichment rule tier (src/enrichment/rule_tier.py)
+            new_type, _ = guess_procurement_type(title)
+            if new_type:
+                stats[f"Unknown->{new_type}"] += 1
             else:
                 stats["Skipped"] += 1
                 
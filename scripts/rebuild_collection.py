@@ -0,0 +1,80 @@
+"""
+Rebuilds a Chroma collection (and its shards) at another embedding width, e.g. to move the
+3072-dim tenders_v1 to EMBEDDING_DIM=768. Documents and metadata are copied as they are;
+only the embeddings are recomputed, so no enrichment calls are made.
+
+    python scripts/rebuild_collection.py --dim 768            # builds tenders_v1_rebuild_768
+    python scripts/rebuild_collection.py --dim 768 --swap     # ...then swaps it in as tenders_v1
+
+--swap renames the old collections to <name>_old_<width> (delete them once search is verified),
+renames the rebuilt ones into place and moves the ingestion ledger to the new index target.
+Restart the API afterwards and set EMBEDDING_DIM to the new width. With QUANTIZED_STORE set,
+point QUANTIZED_STORE_PATH at an empty directory: the store is rebuilt along with the collection.
+"""
+import os
+import sys
+import logging
+import argparse
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+load_dotenv()
+
+from src.indexing.chroma_loader import ChromaLoader
+from src.indexing.embeddings import existing_dimension
+from src.indexing.sharding import list_shards, SHARD_SEPARATOR
+from src.ingestion.ledger import IngestionLedger
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def rebuild(source: str, dim: int, swap: bool, page_size: int = 500):
+    target = f"{source}_rebuild_{dim}"
+    loader = ChromaLoader(collection_name=target, output_dimensionality=dim)
+    client = loader.client
+    old_dim = existing_dimension(client, [source, *list_shards(client, source)])
+    if old_dim is None:
+        raise SystemExit(f"Collection {source} is empty or does not exist.")
+    if old_dim == dim:
+        raise SystemExit(f"Collection {source} is already {dim}-dim.")
+    old_target = f"{source}|{loader.shard_by or 'flat'}|{old_dim}"
+
+    copied = 0
+    for name in [source, *list_shards(client, source)]:
+        collection = client.get_collection(name)
+        offset = 0
+        while True:
+            page = collection.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+            if not page["ids"]:
+                break
+            failures = []
+            for batch in loader.embed_records(page["ids"], page["documents"], page["metadatas"], failures=failures):
+                loader.upsert(*batch)
+            if failures:
+                raise SystemExit(f"Embedding failed for {sum(len(ids) for ids, _ in failures)} records in {name}; "
+                                 f"re-run to resume (upserts are idempotent).")
+            copied += len(page["ids"])
+            offset += len(page["ids"])
+            logging.info(f"{name}: {offset} records re-embedded")
+    logging.info(f"Rebuilt {copied} records into {target} ({old_dim} -> {dim} dims).")
+
+    if not swap:
+        return
+    for name in [source, *list_shards(client, source)]:
+        client.get_collection(name).modify(name=name.replace(source, f"{source}_old_{old_dim}", 1))
+    for name in [target, *list_shards(client, target)]:
+        client.get_collection(name).modify(name=name.replace(target, source, 1))
+    moved = IngestionLedger().retarget(old_target, f"{source}|{loader.shard_by or 'flat'}|{dim}")
+    logging.info(f"Swapped {target} in as {source} (old index kept as {source}_old_{old_dim}); "
+                 f"{moved} ledger entries moved. Set EMBEDDING_DIM={dim} and restart the API.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-embed a Chroma collection at another width")
+    parser.add_argument("--collection", default="tenders_v1")
+    parser.add_argument("--dim", type=int, required=True, help="New embedding width (e.g. 768)")
+    parser.add_argument("--swap", action="store_true", help="Swap the rebuilt collection in under the old name")
+    args = parser.parse_args()
+    if SHARD_SEPARATOR in args.collection:
+        raise SystemExit("Pass the base collection name, not a shard.")
+    rebuild(args.collection, args.dim, args.swap)
@@ -1,25 +1,53 @@
 import logging
 import time
 from typing import List, Optional, Dict, Any
-from fastapi import FastAPI, HTTPException, Request, UploadFile, File, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 import os
-import shutil
-import json
 import asyncio
+import uuid
 from datetime import datetime
+from contextlib import asynccontextmanager
 
 from src.search.engine import SmartSearchEngine
-from src.ingestion.pipeline import IngestionPipeline
+from src.search.lifecycle import SearchEngineLifecycle
+from src.search.response import resolve_fields, required_includes, build_results, FastJSONResponse
+from src.ingestion.progress import ProgressBroadcaster
+from src.ingestion.jobs import JobStore, JobManager
+from src.ingestion.streaming import StreamingUpload, iter_upload_file
+from src.feedback.writer import FeedbackWriter
+from src.monitoring.metrics import REGISTRY, track
 
 # Configure logging
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-app = FastAPI(title="Tender Search API", version="1.0")
+# Feedback is buffered and written by a background task (see FeedbackWriter)
+# In Docker, 'data/' should be a mounted volume
+feedback_writer = FeedbackWriter(data_dir="data")
+
+# Ingestion progress is pushed to dashboards (SSE) and the index count is kept
+# incrementally from upsert results, so dashboards never hit Chroma.
+ingestion_progress = ProgressBroadcaster()
+
+# Ingestion jobs: persistent SQLite queue, executed in worker processes (INGEST_CONCURRENCY)
+job_store = JobStore()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    feedback_writer.start()
+    # Engine connects and warms up in the background; /ready reports when it is done
+    engine_lifecycle.start()
+    job_manager.start()
+    yield
+    await job_manager.stop()
+    await engine_lifecycle.stop()
+    await feedback_writer.stop()
+
+app = FastAPI(title="Tender Search API", version="1.0", lifespan=lifespan)
 
 # Mount UI directory
 app.mount("/src/ui", StaticFiles(directory="src/ui"), name="ui")
@@ -33,73 +61,109 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Search Engine
-try:
-    search_engine = SmartSearchEngine()
-    logging.info("Search Engine initialized successfully.")
-except Exception as e:
-    logging.error(f"Failed to initialize Search Engine: {e}")
-    search_engine = None
-
-# Global Ingestion State
-ingestion_state = {
-    "status": "idle",
-    "progress": 0,
-    "total": 0,
-    "current_offset": 0,
-    "last_log": "",
-    "chroma_count": 0
-}
-
-async def run_ingestion_task(file_path: str):
-    global ingestion_state
-    ingestion_state["status"] = "processing"
-    
-    async def update_progress(data):
-        input_data = data # Capture data
-        ingestion_state["status"] = input_data["status"]
-        ingestion_state["current_offset"] = input_data["current"]
-        ingestion_state["total"] = input_data["total"]
-        ingestion_state["last_log"] = input_data["last_log"]
-        # Calculate progress %
-        if ingestion_state["total"] > 0:
-            ingestion_state["progress"] = round((ingestion_state["current_offset"] / ingestion_state["total"]) * 100, 1)
-        
-    try:
-        pipeline = IngestionPipeline(input_file=file_path, progress_callback=update_progress)
-        await pipeline.run()
-        ingestion_state["status"] = "completed"
-        ingestion_state["progress"] = 100
-    except Exception as e:
-        ingestion_state["status"] = "error"
-        ingestion_state["last_log"] = f"Error: {str(e)}"
-        logging.error(f"Ingestion Task Failed: {e}")
+async def refresh_index_count():
+    """
+    Reads the real index count from Chroma. Only called once the engine is ready and after a job,
+    never per dashboard poll.
+    """
+    if engine_lifecycle.engine:
+        try:
+            ingestion_progress.set_count(await asyncio.to_thread(engine_lifecycle.engine.count))
+        except Exception as e:
+            logging.warning(f"Could not read index count: {e}")
+
+# Search Engine: built lazily at startup (retry + warm-up), not at import time
+engine_lifecycle = SearchEngineLifecycle(SmartSearchEngine, on_ready=refresh_index_count)
 
-# ... existing code ...
+job_manager = JobManager(job_store, progress=ingestion_progress, on_job_finished=refresh_index_count)
+
+def ingest_upload_path(filename: str) -> str:
+    # Unique per upload, so two uploads of the same file name never clobber each other
+    return os.path.join("temp_ingest", f"{uuid.uuid4().hex[:8]}_{os.path.basename(filename)}")
 
 @app.post("/api/ingest/upload")
-async def upload_ingest(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
-    # Save file
-    os.makedirs("temp_ingest", exist_ok=True)
-    file_path = f"temp_ingest/{file.filename}"
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+async def upload_ingest(file: UploadFile = File(...)):
+    # Save file (chunked, off the event loop); the checkpoint signature is taken in the same pass
+    file_path = ingest_upload_path(file.filename)
+    signature = await StreamingUpload(file_path, expected_size=file.size).write_from(iter_upload_file(file))
         
-    # Start Background Task
-    background_tasks.add_task(run_ingestion_task, file_path)
+    # Queue the job; a worker process picks it up
+    job_id = await asyncio.to_thread(job_manager.submit, file_path, signature)
     
-    return {"message": "Ingestion started", "file": file.filename}
+    return {"message": "Ingestion queued", "file": file.filename, "job_id": job_id}
+
+@app.post("/api/ingest/upload/stream")
+async def upload_ingest_stream(request: Request, filename: str):
+    """
+    Raw-body upload (e.g. fetch(url, {method: 'POST', body: file})).
+    CSV rows are parsed and enriched by the worker while the body is still
+    arriving; the response returns once the upload is complete.
+    """
+    file_path = ingest_upload_path(filename)
+    # Raw body: Content-Length is the file size (absent for chunked transfers)
+    length = request.headers.get("content-length")
+    upload = StreamingUpload(file_path, expected_size=int(length) if length and length.isdigit() else None)
+
+    if not filename.lower().endswith(".csv"):
+        # Excel can't be parsed incrementally: stream to disk, then queue the regular pipeline
+        signature = await upload.write_from(request.stream())
+        job_id = await asyncio.to_thread(job_manager.submit, file_path, signature)
+        return {"message": "Ingestion queued", "file": filename, "job_id": job_id}
+
+    # The worker tails the file until the job store says the upload is complete; it checkpoints
+    # as soon as the signature is stored (with Content-Length: after the first 4KB)
+    job_id = await asyncio.to_thread(job_manager.submit, file_path, None, True)
+
+    async def store_signature(signature: str):
+        await asyncio.to_thread(job_store.update, job_id, file_signature=signature)
+
+    upload.on_signature = store_signature
+    try:
+        signature = await upload.write_from(request.stream())
+    except Exception:
+        await asyncio.to_thread(job_manager.cancel, job_id)
+        raise
+    await asyncio.to_thread(job_store.complete_upload, job_id, signature)
+    return {"message": "Upload complete, ingestion running", "file": filename, "job_id": job_id}
+
+@app.get("/api/ingest/jobs")
+async def list_ingest_jobs(limit: int = 50):
+    return await asyncio.to_thread(job_store.list, limit)
+
+@app.get("/api/ingest/jobs/{job_id}")
+async def get_ingest_job(job_id: str):
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/api/ingest/jobs/{job_id}/cancel")
+async def cancel_ingest_job(job_id: str):
+    if not await asyncio.to_thread(job_manager.cancel, job_id):
+        raise HTTPException(status_code=409, detail="Job is not queued or running")
+    return {"status": "cancelled", "job_id": job_id}
+
+@app.post("/api/ingest/jobs/{job_id}/resume")
+async def resume_ingest_job(job_id: str):
+    if not await asyncio.to_thread(job_manager.resume, job_id):
+        raise HTTPException(status_code=409, detail="Only failed or cancelled jobs can be resumed")
+    return {"status": "queued", "job_id": job_id}
 
 @app.get("/api/ingest/status")
 async def get_ingest_status():
-    global ingestion_state
-    
-    # Refresh Chroma Count (Simple approach)
-    # If search engine is available, use it
-    if search_engine and search_engine.collection:
-        ingestion_state["chroma_count"] = search_engine.collection.count()
-        
-    return ingestion_state
+    # Served from memory; chroma_count is maintained incrementally
+    return ingestion_progress.state
+
+@app.get("/api/ingest/stream")
+async def stream_ingest_status():
+    """
+    Server-Sent Events stream of ingestion progress (replaces polling /api/ingest/status).
+    """
+    return StreamingResponse(
+        ingestion_progress.subscribe(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 
@@ -107,6 +171,7 @@ class SearchRequest(BaseModel):
     query: str
     limit: int = 100
     include_corrigendum: bool = True
+    fields: Optional[List[str]] = None # Projection, e.g. ["id", "score", "title"]. None = all fields.
 
 class ChatRequest(BaseModel):
     tender_id: str
@@ -128,10 +193,32 @@ async def read_index():
 
 @app.get("/health")
 def health_check():
+    # Liveness: the process is up. Use /ready to gate traffic. Fails once the engine
+    # could not be built ENGINE_INIT_ATTEMPTS times in a row, so the pod gets restarted.
+    if not engine_lifecycle.healthy:
+        return JSONResponse(status_code=503, content=engine_lifecycle.state)
     return {"status": "ok"}
 
+@app.get("/ready")
+def readiness_check():
+    """
+    Readiness: 200 only once the engine is connected and the search path is warm.
+    """
+    if not engine_lifecycle.ready:
+        return JSONResponse(status_code=503, content=engine_lifecycle.state)
+    return engine_lifecycle.state
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus scrape endpoint: this process's metrics plus those reported by ingestion workers.
+    """
+    worker_snapshots = await asyncio.to_thread(job_store.metrics_snapshots)
+    return PlainTextResponse(REGISTRY.render(worker_snapshots), media_type="text/plain; version=0.0.4")
+
 @app.post("/api/chat")
 async def chat_tender(request: ChatRequest):
+    search_engine = engine_lifecycle.engine
     if not search_engine:
         raise HTTPException(status_code=503, detail="Search Engine not initialized")
     
@@ -152,100 +239,50 @@ async def submit_feedback(request: FeedbackRequest):
             "comment": request.comment
         }
         
-        # Ensure data directory exists
-        os.makedirs("data", exist_ok=True)
-        
-        # In Docker, 'data/' should be a mounted volume
-        with open("data/feedback_logs.jsonl", "a") as f:
-            f.write(json.dumps(feedback_entry) + "\n")
+        # Queue put only; batching, locking and rotation happen in the background writer
+        if not feedback_writer.submit(feedback_entry):
+            raise HTTPException(status_code=503, detail="Feedback buffer full, please retry")
             
         return {"status": "success", "message": "Feedback recorded"}
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Feedback Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/search")
 async def search_tenders(request: SearchRequest):
+    search_engine = engine_lifecycle.engine
     if not search_engine:
         raise HTTPException(status_code=503, detail="Search Engine not initialized")
     
+    # Field projection: only ask Chroma for the columns the requested fields need
+    try:
+        fields = resolve_fields(request.fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     start_time = time.time()
     try:
         # Perform Search
-        results = await search_engine.search(request.query, k=request.limit, include_corrigendum=request.include_corrigendum)
-        
-        # Process Results for Frontend
-        processed_results = []
-        
-        ids = results.get("ids", [[]])[0]
-        metadatas = results.get("metadatas", [[]])[0]
-        distances = results.get("distances", [[]])[0]
+        results = await search_engine.search(
+            request.query,
+            k=request.limit,
+            include_corrigendum=request.include_corrigendum,
+            include=required_includes(fields)
+        )
         
-        for i, tender_id in enumerate(ids):
-            meta = metadatas[i] if i < len(metadatas) else {}
-            # Chroma returns distance. For Cosine/L2, lower is better.
-            # We convert to a 'match score' relative to a threshold.
-            # Assuming distance ranges ~0.5 (good) to ~1.0 (bad) for this model.
-            dist = distances[i]
-            # Calibrated Scoring using Piecewise Linear Mapping for text-embedding-004
-            # Dist 0.5 -> 100%
-            # Dist 0.7 -> 90% (Strong Semantic Match)
-            # Dist 0.9 -> 60% (Broad Context)
-            # Dist 1.1 -> 20% (Weak)
-            # Dist 1.2 -> 0%
-            
-            def get_score(d):
-                if d <= 0.5: return 1.0
-                if d <= 0.7: return 1.0 - (0.1 * (d - 0.5) / 0.2) # 1.0 -> 0.9
-                if d <= 0.9: return 0.9 - (0.3 * (d - 0.7) / 0.2) # 0.9 -> 0.6
-                if d <= 1.1: return 0.6 - (0.4 * (d - 0.9) / 0.2) # 0.6 -> 0.2
-                if d <= 1.2: return 0.2 - (0.2 * (d - 1.1) / 0.1) # 0.2 -> 0.0
-                return 0.0
-
-            score = get_score(dist)
-            score_pct = round(score * 100, 1)
-            
-            # Determine Label and Color
-            if score >= 0.85:
-                label = "Excellent Match"
-                color = "green" # UI class
-            elif score >= 0.65:
-                label = "Strong Match"
-                color = "teal"
-            elif score >= 0.45:
-                label = "Good Match"
-                color = "yellow"
-            else:
-                label = "Potential Lead"
-                color = "gray"
-            
-            processed_results.append({
-                "id": tender_id,
-                "score": score_pct,
-                "match_label": label,
-                "match_color": color,
-                "title": meta.get("original_title", "No Title"),
-                "description": meta.get("description", "No description available."),
-                "core_domain": meta.get("core_domain", "Unclassified"),
-                "procurement_type": meta.get("procurement_type", "Unknown"),
-                "authority": meta.get("authority_name", "Unknown"),
-                "country": meta.get("country", "Unknown"),
-                "city": meta.get("location_city", "Unknown"),
-                "state": meta.get("location_state", "Unknown"),
-                "closing_date": meta.get("closing_date", "N/A"),
-                "url": meta.get("url", "#"),
-                "ref_no": meta.get("ref_no", "N/A"),
-                "tot_id": meta.get("tot_id", "N/A"),
-                "is_corrigendum": meta.get("is_corrigendum", False)
-            })
+        # Process Results for Frontend (vectorized scoring + projection)
+        with track("search", "build_response"):
+            processed_results = build_results(results, fields)
             
         latency = round(time.time() - start_time, 3)
-        return {
+        return FastJSONResponse({
             "query": request.query,
             "count": len(processed_results),
             "latency_seconds": latency,
             "results": processed_results
-        }
+        })
         
     except Exception as e:
         logging.error(f"Search API Error: {e}")
@@ -0,0 +1,175 @@
+import os
+import time
+import sqlite3
+import logging
+import datetime
+import threading
+from typing import Any, Optional
+from google.generativeai import caching
+from src.enrichment.result_cache import content_version
+from src.monitoring.metrics import REGISTRY
+
+DEFAULT_CONTEXT_CACHE_DB = "data/context_cache.db"
+
+CONTEXT_CACHE_EVENTS = REGISTRY.counter(
+    "tenders_gemini_context_cache_total",
+    "Gemini context-cache lifecycle events (reused, created, extended, lost).",
+    ("event",),
+)
+
+
+def is_cache_lost(error: BaseException) -> bool:
+    """
+    The cached content behind a call expired or was deleted (Gemini answers 403/404
+    "CachedContent not found (or permission denied)").
+    """
+    message = str(error).lower()
+    return ("cachedcontent" in message or "cached content" in message) and \
+        any(s in message for s in ("not found", "expired", "permission denied"))
+
+
+class ContextCacheManager:
+    """
+    Lifecycle of the Gemini context cache holding the static system prompt (taxonomy).
+
+    The cache name is persisted in SQLite keyed by a hash of model + system prompt, so
+    every process and run on the host reuses the same live cache instead of creating its
+    own. While work runs, `ensure_fresh()` extends the TTL once less than `refresh_margin`
+    remains, and recreates the cache if it expired or was deleted anyway.
+
+    Configure with ENRICH_CONTEXT_TTL (minutes, default 60) and ENRICH_CONTEXT_CACHE_DB.
+    """
+
+    def __init__(self, model_name: str, system_instruction: str, display_name: str = "tender_enrichment_cache",
+                 db_path: str = None, ttl_minutes: float = None, refresh_margin: float = None):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.display_name = display_name
+        self.key = content_version(model_name + "\n" + system_instruction)
+        self.ttl = datetime.timedelta(minutes=ttl_minutes or float(os.getenv("ENRICH_CONTEXT_TTL", "60")))
+        # Extend when a quarter of the TTL (at most 10 minutes) is left
+        self.refresh_margin = refresh_margin if refresh_margin is not None else \
+            min(600.0, self.ttl.total_seconds() / 4)
+        self.db_path = db_path or os.getenv("ENRICH_CONTEXT_CACHE_DB", DEFAULT_CONTEXT_CACHE_DB)
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self.cache: Optional[Any] = None
+        self.expires_at = 0.0  # time.time() when the current cache expires
+        self.last_failure = 0.0
+        self._lock = threading.RLock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS context_caches (
+                    cache_key TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    expire_time REAL,
+                    updated_at REAL
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+
+    @property
+    def name(self) -> Optional[str]:
+        return self.cache.name if self.cache is not None else None
+
+    def expires_in(self) -> float:
+        return self.expires_at - time.time()
+
+    def needs_refresh(self) -> bool:
+        if self.cache is None:
+            # Creation failed earlier: try again at most once a minute
+            return time.time() - self.last_failure > 60
+        return self.expires_in() < self.refresh_margin
+
+    @staticmethod
+    def _expire_timestamp(cache: Any, fallback: float) -> float:
+        expire_time = getattr(cache, "expire_time", None)
+        try:
+            return expire_time.timestamp()
+        except Exception:
+            return fallback
+
+    def acquire(self, skip: str = None) -> Any:
+        """
+        The live cache for this prompt: reused from another process/run if one is still
+        alive (extended if close to expiry), otherwise created. `skip` is a cache name
+        known to be gone. Raises if creation fails.
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                # Serialise lookup + create across processes, so they converge on one cache
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute("SELECT name FROM context_caches WHERE cache_key = ?", (self.key,)).fetchone()
+                cache = self._reuse(row[0]) if row and row[0] != skip else None
+                if cache is None:
+                    cache = caching.CachedContent.create(
+                        model=self.model_name,
+                        display_name=self.display_name,
+                        system_instruction=self.system_instruction,
+                        ttl=self.ttl,
+                    )
+                    self.expires_at = self._expire_timestamp(cache, time.time() + self.ttl.total_seconds())
+                    CONTEXT_CACHE_EVENTS.inc(event="created")
+                    logging.info(f"Created Gemini context cache {cache.name} (expires in {self.expires_in():.0f}s)")
+                self.cache = cache
+                conn.execute(
+                    "INSERT OR REPLACE INTO context_caches (cache_key, name, expire_time, updated_at) VALUES (?, ?, ?, ?)",
+                    (self.key, cache.name, self.expires_at, time.time())
+                )
+                conn.execute("COMMIT")
+                return cache
+            except Exception:
+                self.last_failure = time.time()
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+
+    def _reuse(self, name: str) -> Optional[Any]:
+        # Caller holds the lock and the database transaction
+        try:
+            cache = caching.CachedContent.get(name)
+            self.expires_at = self._expire_timestamp(cache, 0.0)
+            if self.expires_in() < 30:
+                raise RuntimeError("about to expire")
+            if self.expires_in() < self.refresh_margin:
+                self._extend(cache)
+            if self.cache is None or self.cache.name != cache.name:
+                CONTEXT_CACHE_EVENTS.inc(event="reused")
+                logging.info(f"Reusing Gemini context cache {name} (expires in {self.expires_in():.0f}s)")
+            return cache
+        except Exception as e:
+            CONTEXT_CACHE_EVENTS.inc(event="lost")
+            logging.info(f"Stored Gemini context cache {name} is no longer usable ({e}), creating a new one")
+            return None
+
+    def _extend(self, cache: Any):
+        cache.update(ttl=self.ttl)
+        self.expires_at = self._expire_timestamp(cache, time.time() + self.ttl.total_seconds())
+        if self.expires_in() < self.refresh_margin:
+            # Older clients do not refresh expire_time after update()
+            self.expires_at = time.time() + self.ttl.total_seconds()
+        CONTEXT_CACHE_EVENTS.inc(event="extended")
+        logging.info(f"Extended Gemini context cache {cache.name} by {self.ttl}")
+
+    def ensure_fresh(self, lost: str = None) -> bool:
+        """
+        Extends (or recreates) the cache when it is close to expiry. `lost` names a cache a
+        call reported gone; it is only dropped if still current, so concurrent reports of
+        the same loss recreate it once. Returns True when the cache changed.
+        """
+        with self._lock:
+            before = self.name
+            if lost and before == lost:
+                CONTEXT_CACHE_EVENTS.inc(event="lost")
+                self.cache = None
+                self.expires_at = 0.0
+                self.last_failure = 0.0
+            if not self.needs_refresh():
+                return False
+            self.acquire(skip=lost)
+            return self.name != before
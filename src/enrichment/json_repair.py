@@ -0,0 +1,146 @@
+import re
+import json
+from typing import Any, List, Tuple
+from src.monitoring.metrics import REGISTRY
+
+JSON_REPAIRS = REGISTRY.counter(
+    "tenders_enrichment_json_repairs_total",
+    "Malformed enrichment answers: repaired locally, unrepairable, or completed by a field re-ask.",
+    ("result",),
+)
+
+# Opening fence with optional language tag; the closing fence may be cut off
+_FENCE = re.compile(r"```[a-zA-Z]*\s*(.*?)(?:```|$)", re.DOTALL)
+
+# Candidate truncation points tried per answer before giving up
+MAX_REPAIR_ATTEMPTS = 50
+# Candidate start positions (a `{` or `[`) tried per answer
+MAX_START_ATTEMPTS = 20
+
+
+def strip_fences(text: Any) -> str:
+    """
+    The JSON inside a ```json fenced block (closed or not), or the text itself.
+    """
+    text = str(text or "").strip()
+    match = _FENCE.search(text)
+    # A stray closing fence after bare JSON captures nothing useful: keep the text
+    if match and any(c in match.group(1) for c in "{["):
+        return match.group(1).strip()
+    return text
+
+
+def _close(out: List[str], stack: Tuple[str, ...]) -> str:
+    text = "".join(out).rstrip()
+    if text.endswith(","):
+        text = text[:-1]
+    return text + "".join("}" if opener == "{" else "]" for opener in reversed(stack))
+
+
+def _repair_from(text: str, start: int) -> Tuple[Any, int]:
+    """
+    Repairs the JSON value opening at `text[start]`. Returns (value, index just past it);
+    raises ValueError if it cannot be parsed.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    safe: List[Tuple[int, Tuple[str, ...]]] = []  # (output length, open brackets) after complete elements
+    in_string = escape = False
+    end = len(text)
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            elif char == "\n":
+                char = "\\n"
+            out.append(char)
+            continue
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append(char)
+            out.append(char)
+            safe.append((len(out), tuple(stack)))
+            continue
+        elif char in "}]":
+            # Trailing comma before the closer
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack:
+                stack.pop()
+            out.append(char)
+            if not stack:
+                end = index + 1
+                break  # First complete value; ignore whatever follows
+            continue
+        elif char == ",":
+            safe.append((len(out), tuple(stack)))
+        out.append(char)
+
+    candidates = [] if in_string else [_close(out, tuple(stack))]
+    candidates += [_close(out[:length], opened) for length, opened in reversed(safe[-MAX_REPAIR_ATTEMPTS:])]
+    for candidate in candidates:
+        try:
+            return json.loads(candidate), end
+        except ValueError:
+            continue
+    raise ValueError("Answer is not repairable JSON")
+
+
+def repair_json(text: str) -> Any:
+    """
+    Parses the JSON object/array in `text`, repairing what LLM output typically gets
+    wrong: trailing commas, raw newlines in strings, prose around the JSON and truncation
+    (open brackets are closed; a dangling key or cut-off value is dropped back to the last
+    complete element, so it reads as missing rather than as a wrong, shortened value).
+
+    Prose may contain brackets too ("Answer [v2]: {...}"), so each `{` / `[` is tried in turn
+    (skipping those inside a value already parsed) and the first non-empty object wins;
+    otherwise the first non-empty array, then an empty value. Raises ValueError if nothing
+    parseable remains.
+    """
+    best, best_rank = None, None
+    position = 0
+    for _ in range(MAX_START_ATTEMPTS):
+        starts = [i for i in (text.find("{", position), text.find("[", position)) if i >= 0]
+        if not starts:
+            break
+        start = min(starts)
+        try:
+            value, position = _repair_from(text, start)
+        except ValueError:
+            position = start + 1
+            continue
+        if isinstance(value, dict) and value:
+            return value
+        rank = (bool(value), isinstance(value, dict))
+        if best_rank is None or rank > best_rank:
+            best, best_rank = value, rank
+    if best_rank is None:
+        raise ValueError("No JSON object or array in the answer")
+    return best
+
+
+def loads_lenient(text: Any) -> Any:
+    """
+    json.loads for model answers: fenced or not, repaired locally when malformed.
+    """
+    cleaned = strip_fences(text)
+    try:
+        return json.loads(cleaned)
+    except ValueError:
+        pass
+    try:
+        value = repair_json(cleaned)
+    except ValueError:
+        JSON_REPAIRS.inc(result="unrepairable")
+        raise
+    JSON_REPAIRS.inc(result="repaired")
+    return value
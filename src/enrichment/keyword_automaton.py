@@ -0,0 +1,112 @@
+from collections import deque
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over the taxonomy keywords (keywords.json).
+
+    Built once; `find()` then reports every keyword occurring in a text in a single
+    linear pass, however many keywords there are (the pre-filter used to run one
+    substring search per keyword). Matching is case-insensitive substring matching,
+    the same semantics as `keyword in text.lower()`.
+    """
+
+    def __init__(self, keywords: Iterable[str], categories: Dict[str, List[str]] = None):
+        self.keywords: List[str] = []  # Original spelling, indexed by keyword id
+        self.categories = categories or {}  # lower-cased keyword -> categories it is listed under
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+
+        seen = set()
+        for keyword in keywords:
+            lowered = str(keyword).lower()
+            if not lowered.strip() or lowered in seen:
+                continue
+            seen.add(lowered)
+            self._add(lowered, len(self.keywords))
+            self.keywords.append(str(keyword))
+        self._build_links()
+
+    @classmethod
+    def from_taxonomy(cls, data: Any) -> "KeywordAutomaton":
+        """
+        Accepts keywords.json as loaded: {category: [keyword, ...]} or a flat list.
+        """
+        if isinstance(data, dict):
+            keywords, categories = [], {}
+            for category, keys in data.items():
+                if isinstance(keys, list):
+                    for key in keys:
+                        keywords.append(key)
+                        categories.setdefault(str(key).lower(), []).append(category)
+            return cls(keywords, categories)
+        if isinstance(data, list):
+            return cls(data)
+        return cls([])
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def _add(self, keyword: str, keyword_id: int):
+        state = 0
+        for char in keyword:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] += (keyword_id,)
+
+    def _build_links(self):
+        # Breadth-first: a state's failure link is the longest proper suffix that is also a prefix
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                # Keywords ending at the suffix state also end here
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def _scan(self, text: str, first_only: bool) -> List[int]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Dict[int, None] = {}
+        state = 0
+        for char in str(text).lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                for keyword_id in out[state]:
+                    found.setdefault(keyword_id)
+                if first_only:
+                    break
+        return list(found)
+
+    def find(self, text: str) -> List[str]:
+        """
+        Keywords occurring in `text` (original spelling), in order of where they end.
+        """
+        return [self.keywords[i] for i in self._scan(text, first_only=False)]
+
+    def contains_any(self, text: str) -> bool:
+        return bool(self._scan(text, first_only=True))
+
+    def match_categories(self, matches: Iterable[str]) -> List[str]:
+        """
+        Taxonomy categories of matched keywords (deduplicated, in match order).
+        """
+        found: Dict[str, None] = {}
+        for keyword in matches:
+            for category in self.categories.get(keyword.lower(), []):
+                found.setdefault(category)
+        return list(found)
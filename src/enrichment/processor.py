@@ -2,25 +2,94 @@ import os
 import json
 import logging
 import asyncio
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, AsyncIterator, Callable, Tuple, Optional
 import pandas as pd
 import google.generativeai as genai
 from dotenv import load_dotenv
 from src.cleaning.cleaner import CurrencyNormalizer, DateStandardizer, Deduplicator
+from src.monitoring.metrics import REGISTRY, track, CACHE_EVENTS, PREFILTER_SKIPS
+from src.ingestion.csv_source import CSVRecordSource
+from src.ingestion.rate_control import AdaptiveRateController, get_rate_controller
+from src.enrichment.worker_pool import sliding_window, hedged_call, in_flight, InFlightClock
+from src.enrichment.result_cache import EnrichmentCache, content_version
+from src.enrichment.keyword_automaton import KeywordAutomaton
+from src.enrichment.rule_tier import RuleBasedEnricher
+from src.enrichment.context_cache import ContextCacheManager, is_cache_lost
+from src.enrichment.taxonomy_codec import TaxonomyCodec
+from src.enrichment.json_repair import JSON_REPAIRS, loads_lenient
 
 load_dotenv()
 from src.enrichment.prompts import ENRICHMENT_PROMPT, STATIC_SYSTEM_PROMPT_TEMPLATE, TENDER_USER_PROMPT_TEMPLATE
-import datetime
-from google.generativeai import caching
+from src.enrichment.prompts import PACKED_ENRICHMENT_PROMPT, PACKED_TENDERS_PROMPT_TEMPLATE, PACKED_TENDER_TEMPLATE
+from src.enrichment.prompts import FIELD_REASK_ENRICHMENT_PROMPT, FIELD_REASK_PROMPT_TEMPLATE
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Rough output budget per enrichment call, for the shared token limiter
+ENRICHMENT_OUTPUT_TOKENS = 512
+
+# Rule-tier verdict not taken yet (None means the rules deferred the tender to Gemini)
+_UNCLASSIFIED = object()
+
+PACKED_TENDERS = REGISTRY.counter(
+    "tenders_enrichment_packed_total",
+    "Tenders sent in packed enrichment calls, by outcome (packed = answered in the pack, split = retried alone).",
+    ("result",),
+)
+
+
+def pack_by_tokens(rows: Iterable[Dict[str, Any]], max_size: int, max_tokens: int,
+                   packable: Callable[[Dict[str, Any]], bool] = lambda row: True) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Groups rows (in order) into packs of at most `max_size` tenders whose estimated prompt +
+    output tokens stay within `max_tokens`: short tenders pack densely, long ones travel in
+    small packs. Rows that are not `packable` (e.g. pre-filtered) go out as packs of one.
+    """
+    pack: List[Dict[str, Any]] = []
+    tokens = 0
+    for row in rows:
+        if not packable(row):
+            if pack:
+                yield pack
+                pack, tokens = [], 0
+            yield [row]
+            continue
+        text = str(row.get("Summary") or row.get("Title") or "") + str(row.get("Description") or "")
+        cost = len(text) // 4 + ENRICHMENT_OUTPUT_TOKENS  # ~4 chars per token
+        if pack and (len(pack) >= max_size or tokens + cost > max_tokens):
+            yield pack
+            pack, tokens = [], 0
+        pack.append(row)
+        tokens += cost
+    if pack:
+        yield pack
+
 class TenderEnricher:
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, rate_controller: AdaptiveRateController = None):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         if not self.api_key:
              logging.warning("No GEMINI_API_KEY found. API calls will fail.")
+
+        # AIMD concurrency + retry for Gemini calls; quota shared with every other
+        # ingestion process on this host (GEMINI_RPM / GEMINI_TPM)
+        self.rate_control = rate_controller or get_rate_controller()
+
+        # Sliding-window pool: tenders in flight at once, and straggler handling (seconds
+        # after the request went out before a hedged retry / before giving up)
+        self.concurrency = int(os.getenv("ENRICH_CONCURRENCY", "50"))
+        self.hedge_after = float(os.getenv("ENRICH_HEDGE_AFTER", "10"))
+        self.deadline = float(os.getenv("ENRICH_DEADLINE", "60"))
+
+        # Packed mode: up to ENRICH_PACK_SIZE tenders per call (1 = one call per tender),
+        # packs sized to fit ENRICH_PACK_TOKENS estimated prompt + output tokens
+        self.pack_size = int(os.getenv("ENRICH_PACK_SIZE", "1"))
+        self.pack_tokens = int(os.getenv("ENRICH_PACK_TOKENS", "8000"))
+
+        # Content-addressed result cache (ENRICH_CACHE_DB); ENRICH_CACHE=0 disables it.
+        # Keys include prompt and taxonomy versions, so editing either re-enriches.
+        self.result_cache = EnrichmentCache() if os.getenv("ENRICH_CACHE", "1") != "0" else None
+        self.prompt_version = content_version(ENRICHMENT_PROMPT)
         
         genai.configure(api_key=self.api_key)
         
@@ -31,7 +100,6 @@ class TenderEnricher:
             if os.path.exists(keywords_path):
                 with open(keywords_path, 'r', encoding='utf-8') as f:
                     keywords_data = json.load(f)
-                    self.keywords_str = json.dumps(keywords_data, indent=2)
                     logging.info(f"Loaded keywords from {keywords_path}")
             else:
                 logging.warning(f"keywords.json not found at {keywords_path}")
@@ -40,43 +108,100 @@ class TenderEnricher:
              logging.warning(f"Error loading keywords: {e}")
              keywords_data = []
 
+        # Compact taxonomy: tags as short IDs, one line per category (far fewer tokens than
+        # indented JSON); answers are constrained by a response schema and decoded back to names
+        self.taxonomy = TaxonomyCodec(keywords_data)
+        self.keywords_str = self.taxonomy.encode()
+        self.response_schema = self.taxonomy.response_schema()
+        self.packed_response_schema = self.taxonomy.response_schema(packed=True)
+
         # Strategy A: Context Caching
+        # The manager reuses a live cache for this prompt across processes/runs, extends its
+        # TTL while we work and recreates it on expiry (see ensure_context_cache)
         self.use_cache = False
+        self.context_cache = ContextCacheManager(
+            'models/gemini-2.5-flash-lite',
+            STATIC_SYSTEM_PROMPT_TEMPLATE.format(keyword_mapping=self.keywords_str),
+        )
         try:
-            # Format the static part once
-            formatted_system_prompt = STATIC_SYSTEM_PROMPT_TEMPLATE.format(keyword_mapping=self.keywords_str)
-            
-            # Create Cache
-            # ATTEMPT to use gemini-2.5-flash-lite with caching.
-            # If this model is too new for caching, the try/except will catch it.
-            self.cache = caching.CachedContent.create(
-                model='models/gemini-2.5-flash-lite', 
-                display_name="tender_enrichment_cache",
-                system_instruction=formatted_system_prompt,
-                ttl=datetime.timedelta(minutes=60),
-            )
+            self.cache = self.context_cache.acquire()
             self.model = genai.GenerativeModel.from_cached_content(cached_content=self.cache)
             self.use_cache = True
             logging.info("Context Caching ENABLED for Enrichment (gemini-2.5-flash-lite).")
         except Exception as e:
-            logging.warning(f"Context Caching setup failed for gemini-2.5-flash-lite: {e}. Falling back to standard generation.")
-            # Fallback to standard generation WITHOUT cache using the requested model
+            logging.error(f"Context Caching setup failed for gemini-2.5-flash-lite: {e}. Sending the full prompt "
+                          f"until the cache can be created.")
+            # Standard generation WITHOUT cache; ensure_context_cache() keeps retrying
+            self.cache = None
             self.model = genai.GenerativeModel("gemini-2.5-flash-lite") 
             self.use_cache = False
 
         # Pre-Filter init
-        # Flatten keywords for fast searching
-             
-        # Flatten keywords for fast searching
-        self.flat_keywords = []
-        if isinstance(keywords_data, dict):
-            for category, keys in keywords_data.items():
-                if isinstance(keys, list):
-                    self.flat_keywords.extend([k.lower() for k in keys])
-        elif isinstance(keywords_data, list):
-            self.flat_keywords = [k.lower() for k in keywords_data]
-            
-        logging.info(f"Pre-Filter initialized with {len(self.flat_keywords)} keywords.")
+        # Compiled once into an Aho-Corasick automaton: one pass per text finds every matching tag
+        self.keyword_automaton = KeywordAutomaton.from_taxonomy(keywords_data)
+
+        logging.info(f"Pre-Filter initialized with {len(self.keyword_automaton)} keywords.")
+
+        # Local rule tier: tenders classified with confidence >= ENRICH_RULES_THRESHOLD
+        # skip Gemini entirely (ENRICH_RULES=0 disables)
+        self.rule_tier = RuleBasedEnricher(self.keyword_automaton) if os.getenv("ENRICH_RULES", "1") != "0" else None
+        self.rule_threshold = float(os.getenv("ENRICH_RULES_THRESHOLD", "0.8"))
+        # Verdicts taken while packing (by result key), consumed when the pack is enriched
+        self._rule_verdicts: Dict[str, Optional[Dict[str, Any]]] = {}
+
+        # Result-cache keys change with the keyword mapping
+        self.taxonomy_version = content_version(self.keywords_str)
+
+    async def ensure_context_cache(self, lost: str = None):
+        """
+        Called before each Gemini call: extends the context cache TTL when it is close to
+        expiry, and switches to a recreated (or finally created) cache. `lost` is the name
+        of a cache a call just reported gone.
+        """
+        if lost is None and not self.context_cache.needs_refresh():
+            return
+        try:
+            # Network calls; the manager serialises concurrent refreshes
+            await asyncio.to_thread(self.context_cache.ensure_fresh, lost)
+        except Exception as e:
+            logging.error(f"Context cache refresh failed: {e}")
+            if self.use_cache and (lost or self.context_cache.expires_in() <= 0):
+                self._use_full_prompt()
+            return
+        cache = self.context_cache.cache
+        if cache is not None and (not self.use_cache or cache.name != self.cache.name):
+            self.cache = cache
+            self.model = genai.GenerativeModel.from_cached_content(cached_content=cache)
+            self.use_cache = True
+
+    def _use_full_prompt(self):
+        logging.error("Context cache unavailable: sending the full prompt until it can be recreated.")
+        self.model = genai.GenerativeModel("gemini-2.5-flash-lite")
+        self.use_cache = False
+
+    def _current_model(self) -> Tuple[Any, Any]:
+        """
+        (model, context cache or None), read together: ensure_context_cache swaps both at once.
+        """
+        return self.model, self.cache if self.use_cache else None
+
+    async def _generate(self, prompt_for: Callable[[bool], str], config: Any) -> Any:
+        """
+        One generation call. The prompt is built (`prompt_for(cached)`) for the model it is sent
+        with, at send time: a call that waited in rate control while the cache was lost or
+        recreated never sends a cache-less prompt to a cached model, or the reverse. If the
+        cache vanished mid-call it is recreated and the call resent with a matching prompt.
+        """
+        model, cache = self._current_model()
+        try:
+            return await model.generate_content_async(prompt_for(cache is not None), generation_config=config)
+        except Exception as e:
+            if cache is None or not is_cache_lost(e):
+                raise
+            logging.warning(f"Gemini context cache {cache.name} lost mid-run ({e}), recreating it")
+            await self.ensure_context_cache(lost=cache.name)
+            model, cache = self._current_model()
+            return await model.generate_content_async(prompt_for(cache is not None), generation_config=config)
 
     def _should_enrich(self, title: str, description: str) -> bool:
         """
@@ -94,20 +219,25 @@ class TenderEnricher:
         # But to be safe for cost, let's require at least ONE broad match if text is short-ish.
         if len(text) < 100:
             # For short text, STRICTLY require a keyword match
-            if not any(k in text for k in self.flat_keywords):
+            if not self.keyword_automaton.contains_any(text):
                 return False
                 
         return True
 
-    async def enrich_tender(self, title: str, description: str = "") -> Dict[str, Any]:
+    async def enrich_tender(self, title: str, description: str = "", clock: InFlightClock = None,
+                            lookup_cache: bool = True, ruled: Optional[Dict[str, Any]] = _UNCLASSIFIED) -> Dict[str, Any]:
         """
         Enriches a single tender using the comprehensive enrichment prompt.
+        `clock` times the requests actually sent (for hedged_call's straggler timers).
+        `lookup_cache=False` skips the result-cache read (caller already missed).
+        `ruled` is a rule-tier verdict the caller already took and counted (None: deferred).
         """
         # Fallback for nulls
-        desc_text = description if description and pd.notna(description) else "No description provided."
+        desc_text = self._description_text(description)
         
         # Strategy B: Pre-Filter
         if not self._should_enrich(title, desc_text):
+            PREFILTER_SKIPS.inc()
             return {
                 "core_domain": "Unclassified",
                 "project_tags": [],
@@ -118,93 +248,426 @@ class TenderEnricher:
                 "note": "Skipped by Cost Optimizer (Pre-Filter)"
             }
         
+        # Same content enriched before (any run, any process): no API call
+        result_key = self._result_key(title, desc_text)
+        if self.result_cache and lookup_cache:
+            cached = self.result_cache.get(result_key)
+            CACHE_EVENTS.inc(cache="enrichment_result", result="hit" if cached is not None else "miss")
+            if cached is not None:
+                return cached
+
+        # Easy tenders: the local rules are confident enough, no API call
+        if ruled is _UNCLASSIFIED:
+            ruled = self.rule_tier.try_enrich(title, desc_text, self.rule_threshold) if self.rule_tier else None
+        if ruled is not None:
+            return ruled
+
         # Select Prompt based on Cache Status
-        if self.use_cache:
-            # We only send the dynamic part, system prompt is cached
-            prompt = TENDER_USER_PROMPT_TEMPLATE.format(title=title, description=desc_text)
-        else:
+        def prompt_for(cached: bool) -> str:
+            if cached:
+                # We only send the dynamic part, system prompt is cached
+                return TENDER_USER_PROMPT_TEMPLATE.format(title=title, description=desc_text)
             # Full prompt
-            prompt = ENRICHMENT_PROMPT.format(
+            return ENRICHMENT_PROMPT.format(
                 title=title, 
                 description=desc_text, 
                 keyword_mapping=self.keywords_str
             )
+
+        await self.ensure_context_cache()
+        cached_prompt = self.use_cache
+        prompt = prompt_for(cached_prompt)
         
         config = genai.types.GenerationConfig(
             temperature=0.1, 
             response_mime_type="application/json",
+            response_schema=self.response_schema,
         )
 
+        # Context cache hit = the static system prompt was not resent
+        CACHE_EVENTS.inc(cache="gemini_context", result="hit" if cached_prompt else "miss")
+
+        async def send():
+            with in_flight(clock):
+                return await self._generate(prompt_for, config)
+
         try:
             # Use async generation for better concurrency
-            response = await self.model.generate_content_async(
-                prompt,
-                generation_config=config
-            )
+            with track("enrichment", "llm"):
+                # Retries 429s / 5xx with backoff; ~4 chars per token for the token bucket
+                response = await self.rate_control.run(
+                    "generate",
+                    send,
+                    requests=1,
+                    tokens=len(prompt) // 4 + ENRICHMENT_OUTPUT_TOKENS
+                )
             
-            response_text = response.text.strip()
-            # Clean potential markdown
-            if response_text.startswith("```json"):
-                response_text = response_text[7:-3]
-            elif response_text.startswith("```"):
-                response_text = response_text[3:-3]
-                
-            return json.loads(response_text)
+            with track("enrichment", "parse"):
+                try:
+                    # Fences, trailing commas and truncation are repaired locally
+                    raw = loads_lenient(response.text)
+                except ValueError:
+                    raw = {}
+            missing = self.taxonomy.missing_fields(raw)
+            if missing:
+                # Only the missing fields are asked for again, not the whole enrichment
+                raw = await self._reask_fields(title, desc_text, raw if isinstance(raw, dict) else {}, missing)
+            result = self.taxonomy.decode(raw)
+            if not self._is_valid_result(result):
+                raise ValueError(f"Answer is missing {', '.join(self.taxonomy.missing_fields(raw))}")
+            if self.result_cache:
+                self.result_cache.put(result_key, result)
+            return result
             
         except Exception as e:
             logging.error(f"Error enriching tender '{title}': {e}")
-            return {
-                "core_domain": "Unclassified",
-                "project_tags": [],
-                "procurement_type": "Unknown",
-                "search_keywords": [],
-                "entities": {},
-                "signal_summary": title,
-                "error": str(e)
-            }
+            return self._error_result(title, e)
+
+    @staticmethod
+    def _description_text(description: Any) -> str:
+        return description if description and pd.notna(description) else "No description provided."
+
+    def _result_key(self, title: Any, description_text: str) -> str:
+        return EnrichmentCache.key_for(title, description_text, self.prompt_version, self.taxonomy_version)
+
+    async def _reask_fields(self, title: str, desc_text: str, partial: Dict[str, Any],
+                            missing: List[str]) -> Dict[str, Any]:
+        """
+        Minimal follow-up call for an answer that failed validation: asks for the `missing`
+        fields only (schema restricted to them) and merges them into `partial`.
+        """
+        fields = ", ".join(missing)
+
+        def prompt_for(cached: bool) -> str:
+            if cached:
+                return FIELD_REASK_PROMPT_TEMPLATE.format(title=title, description=desc_text, fields=fields)
+            return FIELD_REASK_ENRICHMENT_PROMPT.format(title=title, description=desc_text, fields=fields,
+                                                        keyword_mapping=self.keywords_str)
+
+        await self.ensure_context_cache()
+        cached_prompt = self.use_cache
+        prompt = prompt_for(cached_prompt)
+        config = genai.types.GenerationConfig(
+            temperature=0.1,
+            response_mime_type="application/json",
+            response_schema=self.taxonomy.response_schema(fields=missing),
+        )
+        CACHE_EVENTS.inc(cache="gemini_context", result="hit" if cached_prompt else "miss")
+
+        try:
+            with track("enrichment", "llm_reask"):
+                response = await self.rate_control.run(
+                    "generate",
+                    lambda: self._generate(prompt_for, config),
+                    requests=1,
+                    tokens=len(prompt) // 4 + ENRICHMENT_OUTPUT_TOKENS // 2
+                )
+            answer = loads_lenient(response.text)
+        except Exception as e:
+            logging.warning(f"Field re-ask ({fields}) for '{title}' failed: {e}")
+            JSON_REPAIRS.inc(result="reask_failed")
+            return partial
+        JSON_REPAIRS.inc(result="reasked")
+        merged = dict(partial)
+        if isinstance(answer, dict):
+            merged.update({field: answer[field] for field in missing if field in answer})
+        return merged
+
+    @staticmethod
+    def _error_result(title: str, error: Any) -> Dict[str, Any]:
+        return {
+            "core_domain": "Unclassified",
+            "project_tags": [],
+            "procurement_type": "Unknown",
+            "search_keywords": [],
+            "entities": {},
+            "signal_summary": title,
+            "error": str(error)
+        }
+
+    async def enrich_row(self, row: Dict[str, Any], lookup_cache: bool = True,
+                         ruled: Optional[Dict[str, Any]] = _UNCLASSIFIED) -> Dict[str, Any]:
+        """
+        Enriches one row (hedged against stragglers) and returns it merged with the result.
+        """
+        # TITLE MAPPING: Use 'Summary' as Title
+        title = row.get("Summary") or row.get("Title") or ""
+        description = row.get("Description", "")
+        attempts = 0
+
+        def attempt(clock: InFlightClock):
+            nonlocal attempts
+            attempts += 1
+            # A hedge only starts once a request went out: the rules deferred this tender already
+            verdict = ruled if attempts == 1 else None
+            return self.enrich_tender(title, description, clock=clock, lookup_cache=lookup_cache, ruled=verdict)
+
+        try:
+            result = await hedged_call(
+                attempt,
+                hedge_after=self.hedge_after,
+                deadline=self.deadline,
+                succeeded=lambda r: "error" not in r
+            )
+        except asyncio.TimeoutError:
+            logging.error(f"Enrichment of tender '{title}' exceeded {self.deadline}s")
+            result = self._error_result(title, f"Enrichment deadline of {self.deadline}s exceeded")
+
+        return self._merge(row, result)
+
+    def match_keywords(self, title: Any, description: Any) -> List[str]:
+        """
+        Taxonomy keywords found in the tender text (one automaton pass).
+        """
+        return self.keyword_automaton.find(str(title) + " " + str(self._description_text(description)))
+
+    def _merge(self, row: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+        # Merge original data with enrichment result, plus the matched taxonomy keywords
+        # as hints for later stages
+        merged = row.copy()
+        merged.update(result)
+        merged["keyword_hints"] = self.match_keywords(row.get("Summary") or row.get("Title") or "", row.get("Description", ""))
+        return merged
+
+    def _packable(self, row: Dict[str, Any]) -> bool:
+        # Pre-filtered and rule-tier tenders need no LLM call, so they never take pack space.
+        # The rule verdict is kept for enrich_pack, which counts it once the result cache missed.
+        title = row.get("Summary") or row.get("Title") or ""
+        description = self._description_text(row.get("Description", ""))
+        if not self._should_enrich(title, description):
+            return False
+        if self.rule_tier:
+            result, confidence = self.rule_tier.classify(title, description)
+            verdict = result if confidence >= self.rule_threshold else None
+            self._rule_verdicts[self._result_key(title, description)] = verdict
+            return verdict is None
+        return True
+
+    async def enrich_pack(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Enriches several rows with one LLM call (answers keyed by position id). Rows already in
+        the result cache are not sent; rows missing or malformed in the answer - or all of
+        them, if the call fails - are retried one by one. Returns merged rows in input order.
+        """
+        keys = [self._result_key(r.get("Summary") or r.get("Title") or "", self._description_text(r.get("Description", "")))
+                for r in rows]
+        verdicts = [self._rule_verdicts.pop(key, _UNCLASSIFIED) for key in keys]
+        cached = self.result_cache.get_many(keys) if self.result_cache else {}
+        if self.result_cache:
+            CACHE_EVENTS.inc(sum(1 for k in keys if k in cached), cache="enrichment_result", result="hit")
+            CACHE_EVENTS.inc(sum(1 for k in keys if k not in cached), cache="enrichment_result", result="miss")
+
+        merged: List[Dict[str, Any]] = [self._merge(row, cached[key]) if key in cached else None for row, key in zip(rows, keys)]
+        pending = [i for i, m in enumerate(merged) if m is None]
+        for i in pending:
+            # The verdict taken while packing is final now that the cache missed
+            if verdicts[i] is not _UNCLASSIFIED:
+                self.rule_tier.record(accepted=verdicts[i] is not None)
+        if len(pending) == 1:
+            i = pending[0]
+            merged[i] = await self.enrich_row(rows[i], lookup_cache=False, ruled=verdicts[i])
+        elif pending:
+            enriched = await self._enrich_pack_call([rows[i] for i in pending], [keys[i] for i in pending])
+            for i, row in zip(pending, enriched):
+                merged[i] = row
+        return merged
+
+    async def _enrich_pack_call(self, rows: List[Dict[str, Any]], keys: List[str]) -> List[Dict[str, Any]]:
+        blocks = []
+        for i, row in enumerate(rows):
+            blocks.append(PACKED_TENDER_TEMPLATE.format(
+                id=i + 1,
+                title=row.get("Summary") or row.get("Title") or "",
+                description=self._description_text(row.get("Description", ""))
+            ))
+        def prompt_for(cached: bool) -> str:
+            if cached:
+                return PACKED_TENDERS_PROMPT_TEMPLATE.format(count=len(rows), tenders="\n".join(blocks))
+            return PACKED_ENRICHMENT_PROMPT.format(count=len(rows), tenders="\n".join(blocks), keyword_mapping=self.keywords_str)
+
+        await self.ensure_context_cache()
+        cached_prompt = self.use_cache
+        prompt = prompt_for(cached_prompt)
+        CACHE_EVENTS.inc(cache="gemini_context", result="hit" if cached_prompt else "miss")
+
+        config = genai.types.GenerationConfig(
+            temperature=0.1,
+            response_mime_type="application/json",
+            response_schema=self.packed_response_schema,
+        )
+
+        async def call(clock: InFlightClock = None) -> Dict[str, Any]:
+            async def send():
+                with in_flight(clock):
+                    return await self._generate(prompt_for, config)
+
+            with track("enrichment", "llm_packed"):
+                # Own AIMD window: a packed call is len(rows) tenders of work, not one
+                response = await self.rate_control.run(
+                    "generate_packed",
+                    send,
+                    size=len(rows),
+                    requests=1,
+                    tokens=len(prompt) // 4 + len(rows) * ENRICHMENT_OUTPUT_TOKENS
+                )
+            with track("enrichment", "parse"):
+                return self._parse_packed(response.text, len(rows))
+
+        try:
+            # Answer time grows with the tenders answered: scale the straggler timers by pack size
+            results = await hedged_call(call, hedge_after=self.hedge_after * len(rows),
+                                        deadline=self.deadline * len(rows))
+        except Exception as e:
+            logging.warning(f"Packed enrichment of {len(rows)} tenders failed ({e}), retrying individually")
+            results = {}
+
+        merged: List[Dict[str, Any]] = [None] * len(rows)
+        retry = []
+        partial = []
+        fresh = {}
+        for i, row in enumerate(rows):
+            raw = results.get(str(i + 1))
+            missing = self.taxonomy.missing_fields(raw)
+            if not missing:
+                complete = raw
+            elif isinstance(raw, dict) and set(raw) - {"id"}:
+                # Cut short (e.g. the end of a truncated array): re-ask its missing fields only
+                partial.append((i, raw, missing))
+                continue
+            else:
+                retry.append(i)
+                continue
+            result = self.taxonomy.decode(complete)
+            result.pop("id", None)
+            merged[i] = self._merge(row, result)
+            fresh[keys[i]] = result
+
+        if partial:
+            completed = await asyncio.gather(*(
+                self._reask_fields(rows[i].get("Summary") or rows[i].get("Title") or "",
+                                   self._description_text(rows[i].get("Description", "")), raw, missing)
+                for i, raw, missing in partial
+            ))
+            for (i, _, _), raw in zip(partial, completed):
+                result = self.taxonomy.decode(raw)
+                if self._is_valid_result(result):
+                    result.pop("id", None)
+                    merged[i] = self._merge(rows[i], result)
+                    fresh[keys[i]] = result
+                else:
+                    retry.append(i)
+        if self.result_cache:
+            self.result_cache.put_many(fresh)
+
+        PACKED_TENDERS.inc(len(rows) - len(retry), result="packed")
+        if retry:
+            PACKED_TENDERS.inc(len(retry), result="split")
+            logging.info(f"Packed enrichment: retrying {len(retry)}/{len(rows)} tenders individually")
+            singles = await asyncio.gather(*(self.enrich_row(rows[i], lookup_cache=False, ruled=None) for i in retry))
+            for i, single in zip(retry, singles):
+                merged[i] = single
+        return merged
+
+    @classmethod
+    def _parse_packed(cls, text: str, count: int) -> Dict[str, Any]:
+        """
+        Maps tender id ("1".."count") -> result object from a packed answer. Objects without an
+        id are matched by position, but only when the array has exactly `count` entries.
+        Raises ValueError if the answer is not JSON at all.
+        """
+        data = loads_lenient(text)
+        if isinstance(data, dict):
+            # Tolerate {"tenders": [...]} style wrappers
+            data = next((v for v in data.values() if isinstance(v, list)), [data])
+        if not isinstance(data, list):
+            raise ValueError("Packed answer is not a JSON array")
+
+        results: Dict[str, Any] = {}
+        for position, item in enumerate(data):
+            if not isinstance(item, dict):
+                continue
+            item_id = item.get("id")
+            if item_id is not None:
+                results.setdefault(str(item_id).strip(), item)
+            elif len(data) == count:
+                results.setdefault(str(position + 1), item)
+        return results
+
+    @staticmethod
+    def _is_valid_result(result: Any) -> bool:
+        return (isinstance(result, dict) and isinstance(result.get("signal_summary"), str)
+                and bool(result["signal_summary"].strip()) and "core_domain" in result)
+
+    def enrich_stream(self, rows: Iterable[Dict[str, Any]], concurrency: int = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Enriches rows through a sliding window of `concurrency` in-flight tenders (default
+        ENRICH_CONCURRENCY), yielding merged rows in input order. The rate controller decides
+        how many of those calls Gemini actually sees at once. With ENRICH_PACK_SIZE > 1 the
+        window holds packs (concurrency / pack size of them), each one LLM call.
+        """
+        concurrency = concurrency or self.concurrency
+        if self.pack_size <= 1:
+            return sliding_window(rows, self.enrich_row, concurrency)
+        return self._enrich_packed(rows, concurrency)
+
+    async def _enrich_packed(self, rows: Iterable[Dict[str, Any]], concurrency: int) -> AsyncIterator[Dict[str, Any]]:
+        packs = pack_by_tokens(rows, self.pack_size, self.pack_tokens, packable=self._packable)
+        async for enriched in sliding_window(packs, self.enrich_pack, max(1, concurrency // self.pack_size)):
+            for row in enriched:
+                yield row
 
     async def process_batch(self, tenders_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Process a list of dictionaries (rows).
         """
-        tasks = []
-        for row in tenders_data:
-            # TITLE MAPPING: Use 'Summary' as Title
-            title = row.get("Summary") or row.get("Title") or ""
-            tasks.append(self.enrich_tender(title, row.get("Description", "")))
-        
-        results = await asyncio.gather(*tasks)
-        
-        enriched_rows = []
-        for original, result in zip(tenders_data, results):
-            # Merge original data with enrichment result
-            merged = original.copy()
-            merged.update(result)
-            enriched_rows.append(merged)
-            
-        return enriched_rows
+        return [row async for row in self.enrich_stream(tenders_data)]
 
-    async def process_csv_to_jsonl(self, input_csv: str, output_jsonl: str, batch_size: int = 50, limit: int = None, offset: int = 0):
+    async def process_csv_to_jsonl(self, input_csv: str, output_jsonl: str, concurrency: int = None, limit: int = None, offset: int = 0):
         """
-        Reads CSV, cleans & deduplicates, enriches in batches, writes to JSONL.
-        Supports pagination via limit/offset.
+        Reads CSV, cleans & deduplicates, enriches through the sliding window, writes to JSONL.
+        Supports pagination via limit/offset. `concurrency` (in-flight tenders, default
+        ENRICH_CONCURRENCY) replaces the former `batch_size`.
+        (The ingestion pipeline reads chunks itself via CSVRecordSource and calls enrich_records.)
         """
-        # Read only specific chunk of the CSV
-        # offset+1 because header is row 0
+        logging.info(f"Reading CSV from offset {offset} with limit {limit}...")
         try:
-             # Load chunk
-             logging.info(f"Reading CSV from offset {offset} with limit {limit}...")
-             if limit:
-                 df = pd.read_csv(input_csv, skiprows=range(1, offset+1), nrows=limit)
-             else:
-                 df = pd.read_csv(input_csv, skiprows=range(1, offset+1))
-        except pd.errors.EmptyDataError:
+            # One chunk of `limit` rows (or everything); the rows before `offset` are scanned, not parsed
+            chunk = next(CSVRecordSource(input_csv, chunk_size=limit or float("inf")).chunks(start_row=offset), None)
+        except ValueError as e:
+            logging.warning(f"Could not read CSV: {e}")
+            return
+        if chunk is None:
             logging.warning("No data found in the specified range.")
             return
 
-        records = df.to_dict(orient='records')
+        records = chunk.records
         logging.info(f"Loaded {len(records)} raw records from CSV chunk.")
         
+        await self.process_records_to_jsonl(records, output_jsonl, concurrency=concurrency)
+
+    async def process_records_to_jsonl(self, records: List[Dict[str, Any]], output_jsonl: str, concurrency: int = None):
+        """
+        Cleans & deduplicates already-parsed rows, enriches them (sliding window), appends to JSONL in input order.
+        """
+        cleaned_records = self.clean_records(records)
+
+        # Ensure dir exists
+        os.makedirs(os.path.dirname(output_jsonl) or ".", exist_ok=True)
+        # We don't clear output file here because we might be appending from multiple runs. 
+        # User responsible for managing output file cleanup or rotation.
+
+        # Appending to file incrementally is safer for large jobs (line-buffered: each row is flushed)
+        with open(output_jsonl, 'a', buffering=1) as f:
+            async for item in self.enrich_stream(cleaned_records, concurrency):
+                f.write(json.dumps(item) + "\n")
+
+        self._log_enrichment_stats()
+        logging.info(f"Finished processing. Output wrote to {output_jsonl}")
+
+    def clean_records(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Normalizes fields, adds DedupHash/RefNo and drops duplicates within `records`.
+        """
         # 1. CLEANING & DEDUPLICATION (Local to this batch)
         cleaned_records = []
         seen_hashes = set()
@@ -236,29 +699,24 @@ class TenderEnricher:
             cleaned_records.append(row)
             
         logging.info(f"After cleanup & dedup: {len(cleaned_records)} records to process.")
-        
-        async def _run_all():
-            all_results = []
-            for i in range(0, len(cleaned_records), batch_size):
-                batch = cleaned_records[i:i+batch_size]
-                logging.info(f"Processing batch {i} to {i+batch_size}...")
-                enriched_batch = await self.process_batch(batch)
-                all_results.extend(enriched_batch)
-                
-                # Appending to file incrementally is safer for large jobs
-                with open(output_jsonl, 'a') as f:
-                    for item in enriched_batch:
-                        f.write(json.dumps(item) + "\n")
-                        
-            logging.info(f"Finished processing. Output wrote to {output_jsonl}")
+        return cleaned_records
 
-        # Ensure dir exists
-        os.makedirs(os.path.dirname(output_jsonl) or ".", exist_ok=True)
-        # We don't clear output file here because we might be appending from multiple runs. 
-        # User responsible for managing output file cleanup or rotation.
+    async def enrich_records(self, records: List[Dict[str, Any]], concurrency: int = None) -> List[Dict[str, Any]]:
+        """
+        Enriches cleaned rows through the sliding-window pool (in memory, no JSONL), in input order.
+        """
+        enriched = [row async for row in self.enrich_stream(records, concurrency)]
+        self._log_enrichment_stats()
+        return enriched
 
-        # Await the execution directly since we are now async
-        await _run_all()
+    def _log_enrichment_stats(self):
+        if self.result_cache:
+            cache = self.result_cache
+            logging.info(f"Enrichment cache: {cache.hits} hits / {cache.misses} misses so far ({cache.hit_rate:.0%} hit rate)")
+        if self.rule_tier:
+            rules = self.rule_tier
+            logging.info(f"Rule tier: {rules.accepted} tenders enriched locally, {rules.deferred} sent to Gemini "
+                         f"({rules.skip_rate:.0%} of LLM calls skipped)")
 
 if __name__ == "__main__":
     import sys
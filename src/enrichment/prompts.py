@@ -6,7 +6,8 @@ STATIC_SYSTEM_PROMPT_TEMPLATE = """
 You are an expert Tender Analyst. Your goal is to structure and enrich procurement data for a high-precision search engine.
 
 ## CONTEXT: PROJECT TAGS (SUB-SECTOR KEYWORDS)
-The following is a list of specific Project Tags grouped by their source category.
+The following is a list of specific Project Tags grouped by their source category,
+one category per line, each tag written as `ID=Tag name`.
 Use this mapping to identify specific `project_tags` that apply to this tender.
 {keyword_mapping}
 
@@ -15,8 +16,8 @@ Use this mapping to identify specific `project_tags` that apply to this tender.
 1. **Domain & Category Assignment**:
    - Assign a **BROAD** `core_domain` from this fixed list: 
      [Agriculture, Healthcare, Infrastructure, Energy, Defense, Technology, Transport, Other].
-   - **Project Tags**: Select 1-3 most relevant specific tags from the provided `keyword_mapping` (VALUES) if they match the tender content.
-     - Example: If tender is "Ear Tags", `core_domain`="Agriculture", `project_tags`=["Animal Identification Ear Tags"].
+   - **Project Tags**: Select 1-3 most relevant specific tags from the provided `keyword_mapping` if they match the tender content, and return their IDs.
+     - Example: If tender is "Ear Tags", `core_domain`="Agriculture", `project_tags`=[ID of "Animal Identification Ear Tags"], e.g. ["T12"].
    - Assign a `procurement_type` from: [Works, Supply, Services].
    - **Note**: "Consultancy" or "Hiring" should be mapped to "Services". "Construction" is "Works". "Purchase" is "Supply".
    - **CRITICAL**: Distinguish between "Hospital Construction" (Infrastructure) and "Medical Equipment" (Healthcare).
@@ -43,7 +44,7 @@ Use this mapping to identify specific `project_tags` that apply to this tender.
 ## OUTPUT SCHEMA (JSON ONLY)
 {{
   "core_domain": "String",
-  "project_tags": ["String"],
+  "project_tags": ["Tag ID"],
   "procurement_type": "String",
   "search_keywords": ["String", "String"],
   "entities": {{
@@ -65,3 +66,31 @@ Description: {description}
 # Keep original for backward compatibility if needed (combining them)
 ENRICHMENT_PROMPT = STATIC_SYSTEM_PROMPT_TEMPLATE + "\n" + TENDER_USER_PROMPT_TEMPLATE
 
+
+# Packed mode: several tenders per request (one OUTPUT SCHEMA object per tender)
+PACKED_TENDERS_PROMPT_TEMPLATE = """
+Analyze each of the following {count} tenders independently.
+Return a JSON array with exactly one object per tender, in the same order. Each object follows
+the OUTPUT SCHEMA above and adds an "id" field with the tender's id exactly as given.
+
+{tenders}
+"""
+
+PACKED_TENDER_TEMPLATE = """### Tender id: {id}
+Title: {title}
+Description: {description}
+"""
+
+PACKED_ENRICHMENT_PROMPT = STATIC_SYSTEM_PROMPT_TEMPLATE + "\n" + PACKED_TENDERS_PROMPT_TEMPLATE
+
+
+# Field re-ask: an answer was malformed or incomplete, ask only for what is missing
+FIELD_REASK_PROMPT_TEMPLATE = """
+Analyze the following tender:
+Title: {title}
+Description: {description}
+
+Return a JSON object with ONLY these fields of the OUTPUT SCHEMA: {fields}.
+"""
+
+FIELD_REASK_ENRICHMENT_PROMPT = STATIC_SYSTEM_PROMPT_TEMPLATE + "\n" + FIELD_REASK_PROMPT_TEMPLATE
@@ -0,0 +1,98 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import unicodedata
+from typing import Dict, Any, List, Optional
+
+DEFAULT_ENRICH_CACHE_DB = "data/enrichment_cache.db"
+
+
+def normalize_text(text: Any) -> str:
+    """
+    Case, whitespace and unicode-form insensitive text, so reposted notices and
+    re-exported rows hash the same.
+    """
+    text = unicodedata.normalize("NFKC", str(text or ""))
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def content_version(text: str) -> str:
+    """
+    Short stable hash of a prompt or taxonomy; changing either invalidates cached results.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class EnrichmentCache:
+    """
+    Content-addressed store of enrichment results (SQLite, shared by every process on the host).
+
+    Keyed by a hash of the normalized title + description, the prompt version and the
+    taxonomy (keyword mapping) version, so the same tender text is only ever sent to
+    Gemini once per prompt/taxonomy. Only successful results are stored.
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or os.getenv("ENRICH_CACHE_DB", DEFAULT_ENRICH_CACHE_DB)
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    content_key TEXT PRIMARY KEY,
+                    result TEXT NOT NULL,
+                    created_at REAL
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def key_for(title: Any, description: Any, prompt_version: str, taxonomy_version: str) -> str:
+        payload = json.dumps([normalize_text(title), normalize_text(description), prompt_version, taxonomy_version])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        found: Dict[str, Dict[str, Any]] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._connect() as conn:
+            for i in range(0, len(unique), 500):
+                batch = unique[i:i+500]
+                placeholders = ", ".join("?" for _ in batch)
+                for key, result in conn.execute(
+                    f"SELECT content_key, result FROM results WHERE content_key IN ({placeholders})", batch
+                ):
+                    found[key] = json.loads(result)
+        hits = sum(1 for key in keys if key in found)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return found
+
+    def put(self, key: str, result: Dict[str, Any]):
+        self.put_many({key: result})
+
+    def put_many(self, results: Dict[str, Dict[str, Any]]):
+        if not results:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO results (content_key, result, created_at) VALUES (?, ?, ?)",
+                [(key, json.dumps(result, default=str), now) for key, result in results.items()]
+            )
+        logging.debug(f"Enrichment cache: stored {len(results)} results.")
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,224 @@
+import os
+import re
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+from src.enrichment.keyword_automaton import KeywordAutomaton
+from src.monitoring.metrics import REGISTRY
+
+RULE_TIER = REGISTRY.counter(
+    "tenders_enrichment_rule_tier_total",
+    "Tenders seen by the local rule tier: accepted (no LLM call) or deferred to Gemini.",
+    ("result",),
+)
+
+# Procurement type rules (also used by scripts/fix_procurement_types.py). Checked in order;
+# a leading phrase ("supply of ...") is a strong signal, a keyword anywhere a weak one.
+PROCUREMENT_PHRASES = [
+    ("Works", ("construction of", "construction and", "repair of", "renovation of", "widening of", "building of", "civil work")),
+    ("Supply", ("supply of", "supply and", "purchase of", "procurement of", "delivery of")),
+    ("Services", ("hiring of", "providing of", "provision of", "consultancy for", "consultancy services", "maintenance of")),
+]
+PROCUREMENT_KEYWORDS = [
+    ("Works", ("work", "construction", "build", "road", "civil")),
+    ("Supply", ("supply", "purchase", "delivery", "procurement of", "equipment", "goods")),
+    ("Services", ("service", "consult", "manpower", "hiring", "amc", "security", "cleaning")),
+]
+
+# Issuing bodies recognised in titles (the prompt's own examples and common central agencies)
+AUTHORITY_ACRONYMS = ["AIIMS", "NHAI", "CPWD", "PWD", "NHIDCL", "RITES", "IRCON", "BSNL", "DRDO", "ONGC", "NTPC", "BHEL", "GAIL", "IOCL"]
+
+# Default gazetteer: states and union territories of India (most tenders). gazetteer.json
+# next to keywords.json can add cities: {"State": ["City", ...]}.
+INDIAN_STATES = [
+    "Andhra Pradesh", "Arunachal Pradesh", "Assam", "Bihar", "Chhattisgarh", "Goa", "Gujarat", "Haryana",
+    "Himachal Pradesh", "Jharkhand", "Karnataka", "Kerala", "Madhya Pradesh", "Maharashtra", "Manipur",
+    "Meghalaya", "Mizoram", "Nagaland", "Odisha", "Punjab", "Rajasthan", "Sikkim", "Tamil Nadu", "Telangana",
+    "Tripura", "Uttar Pradesh", "Uttarakhand", "West Bengal", "Andaman and Nicobar Islands", "Chandigarh",
+    "Dadra and Nagar Haveli and Daman and Diu", "Delhi", "Jammu and Kashmir", "Ladakh", "Lakshadweep", "Puducherry",
+]
+
+# Admin prefixes that carry no signal
+_JARGON = re.compile(r"^\s*(e-?tender|tender|notice inviting tender|nit|rfp|rfq|bid)\b\s*(no\.?\s*\S+\s*)?(for|of|:|-)?\s*", re.IGNORECASE)
+
+
+def guess_procurement_type(title: str) -> Tuple[Optional[str], float]:
+    """
+    (procurement_type, strength): 1.0 for a leading phrase like "supply of", 0.5 for a
+    keyword anywhere in the title, (None, 0) when nothing matches.
+    """
+    text = str(title or "").lower()
+    stripped = _JARGON.sub("", text)
+    for ptype, phrases in PROCUREMENT_PHRASES:
+        if stripped.startswith(phrases):
+            return ptype, 1.0
+    for ptype, keywords in PROCUREMENT_KEYWORDS:
+        if any(k in text for k in keywords):
+            return ptype, 0.5
+    return None, 0.0
+
+
+def _pad(text: str) -> str:
+    # Words separated by single spaces, with a space on each side
+    return " " + re.sub(r"[^0-9a-z]+", " ", str(text).lower()).strip() + " "
+
+
+class _WordMatcher:
+    """
+    Whole-word, punctuation-insensitive matching ("goa" must not match inside "goat"):
+    names and text are both padded/normalized, then matched with one automaton pass.
+    """
+
+    def __init__(self, names: List[str]):
+        self.names: Dict[str, str] = {}
+        for name in names:
+            if _pad(name).strip():
+                self.names.setdefault(_pad(name), name)
+        self.automaton = KeywordAutomaton(list(self.names))
+
+    def find(self, text: str) -> List[str]:
+        return [self.names[m] for m in self.automaton.find(_pad(text))]
+
+
+# Taxonomy category (top-level keywords.json / tender sheet headers) -> core_domain.
+# Explicit, because category names rarely contain the domain name ("Defence", "Oil and Gas").
+CATEGORY_DOMAINS = {
+    "Agriculture, Farming and Forestry": "Agriculture",
+    "Food and Beverage": "Agriculture",
+    "Banking, Financial Services and Insurance (BFSI)": "Other",
+    "Education, Training and R&D": "Other",
+    "Environment": "Other",
+    "Information Technology": "Technology",
+    "Transportation Service and Supply Chain Management": "Transport",
+    "Transportation Equipment, Machinery and Vehicles": "Transport",
+    "Healthcare": "Healthcare",
+    "Power and Energy": "Energy",
+    "Oil and Gas": "Energy",
+    "Legal Services": "Other",
+    "Defence": "Defense",
+    "Aviation": "Transport",
+    "HVAC": "Infrastructure",
+    "Telecommunication": "Technology",
+    "Construction": "Infrastructure",
+    "Mining, Minerals, Ores, Basic Metal and Alloys": "Other",
+    "Chemicals": "Other",
+    "Space": "Technology",
+    "Other Materials and Products": "Other",
+    "Other Services": "Other",
+    "Other Equipment And Machineries": "Other",
+}
+_CATEGORY_DOMAINS = {" ".join(c.lower().split()): d for c, d in CATEGORY_DOMAINS.items()}
+
+
+def _domain_for_category(category: str) -> Optional[str]:
+    # Unknown categories give no domain, so the tender is left to Gemini
+    return _CATEGORY_DOMAINS.get(" ".join(str(category).lower().split()))
+
+
+class RuleBasedEnricher:
+    """
+    Local deterministic enrichment tier: taxonomy tags found in the title (Aho-Corasick),
+    their categories' domain, procurement type from title phrases, and location/authority
+    from a gazetteer. Each result carries a confidence; TenderEnricher only accepts results
+    at or above its threshold and sends everything else to Gemini.
+
+    Confidence = 0.4 (a taxonomy tag in the title) + 0.3 (all tags agree on one domain)
+               + 0.2 x procurement-type strength + 0.1 (a state or authority was found).
+    """
+
+    def __init__(self, automaton: KeywordAutomaton, gazetteer: Dict[str, List[str]] = None):
+        self.automaton = automaton  # Taxonomy (for tag categories)
+        self._tags = _WordMatcher(automaton.keywords)
+        gazetteer = gazetteer if gazetteer is not None else self.load_gazetteer()
+        # Places: states (and optional cities); value = (state, city)
+        self._places: Dict[str, Tuple[str, str]] = {}
+        for state, cities in gazetteer.items():
+            self._places[state] = (state, "Unknown")
+            for city in cities or []:
+                self._places.setdefault(str(city), (state, str(city)))
+        self._place_matcher = _WordMatcher(list(self._places))
+        self._authority_matcher = _WordMatcher(AUTHORITY_ACRONYMS)
+        self.accepted = 0
+        self.deferred = 0
+
+    @staticmethod
+    def load_gazetteer(path: str = None) -> Dict[str, List[str]]:
+        gazetteer: Dict[str, List[str]] = {state: [] for state in INDIAN_STATES}
+        path = path or os.path.join(os.path.dirname(__file__), "gazetteer.json")
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for state, cities in json.load(f).items():
+                        gazetteer.setdefault(state, []).extend(cities or [])
+            except Exception as e:
+                logging.warning(f"Error loading gazetteer: {e}")
+        return gazetteer
+
+    def classify(self, title: str, description: str = "") -> Tuple[Dict[str, object], float]:
+        """
+        Returns (enrichment result in the LLM's output schema, confidence 0..1). An unknown
+        authority is left for ChromaLoader, which falls back to Purchaser_Name.
+        """
+        title = str(title or "")
+        confidence = 0.0
+
+        # Longest tags first: "Animal Identification Ear Tags" before "Ear Tags"
+        tags = sorted(self._tags.find(title), key=len, reverse=True)[:3]
+        if tags:
+            confidence += 0.4
+        domains = {d for d in (_domain_for_category(c) for c in self.automaton.match_categories(tags)) if d}
+        core_domain = domains.pop() if len(domains) == 1 else "Unclassified"
+        if core_domain != "Unclassified":
+            confidence += 0.3
+
+        procurement_type, strength = guess_procurement_type(title)
+        confidence += 0.2 * strength
+
+        text = title + " " + str(description or "")
+        places = [self._places[p] for p in self._place_matcher.find(text)]
+        # Prefer a city match (it implies the state)
+        state, city = next((p for p in places if p[1] != "Unknown"), places[0] if places else ("Unknown", "Unknown"))
+        authorities = self._authority_matcher.find(title)
+        authority = authorities[0] if authorities else "Unknown"
+        if state != "Unknown" or authority != "Unknown":
+            confidence += 0.1
+
+        summary = _JARGON.sub("", title).strip() or title
+        result = {
+            "core_domain": core_domain,
+            "project_tags": tags,
+            "procurement_type": procurement_type or "Unknown",
+            "search_keywords": self._tags.find(text)[:10],
+            "entities": {
+                "authority_name": authority,
+                "location_city": city,
+                "location_state": state,
+            },
+            "signal_summary": " ".join(summary.split()[:12]),
+            "enrichment_source": "rules",
+            "rule_confidence": round(confidence, 2),
+        }
+        return result, confidence
+
+    def try_enrich(self, title: str, description: str, threshold: float) -> Optional[Dict[str, object]]:
+        """
+        The rule result if its confidence reaches `threshold`, else None (caller asks Gemini).
+        """
+        result, confidence = self.classify(title, description)
+        if confidence >= threshold:
+            self.record(accepted=True)
+            return result
+        self.record(accepted=False)
+        return None
+
+    def record(self, accepted: bool):
+        if accepted:
+            self.accepted += 1
+        else:
+            self.deferred += 1
+        RULE_TIER.inc(result="accepted" if accepted else "deferred")
+
+    @property
+    def skip_rate(self) -> float:
+        total = self.accepted + self.deferred
+        return self.accepted / total if total else 0.0
@@ -0,0 +1,167 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+# Fixed vocabularies of the enrichment output (also enforced through the response schema)
+CORE_DOMAINS = ["Agriculture", "Healthcare", "Infrastructure", "Energy", "Defense", "Technology", "Transport", "Other"]
+PROCUREMENT_TYPES = ["Works", "Supply", "Services"]
+ENTITY_FIELDS = ["authority_name", "location_city", "location_state"]
+REQUIRED_FIELDS = ["core_domain", "project_tags", "procurement_type", "search_keywords", "entities", "signal_summary"]
+
+# Tag IDs are only listed as an enum up to this many tags: the schema travels with every
+# request (it cannot be context-cached), so a huge enum would cost more than it saves.
+# Larger taxonomies are validated by decode() alone.
+MAX_TAG_ENUM = 300
+
+# Legacy labels the model still uses now and then
+_PROCUREMENT_ALIASES = {"consultancy": "Services", "hiring": "Services", "service": "Services",
+                        "construction": "Works", "work": "Works", "purchase": "Supply", "goods": "Supply"}
+
+
+class TaxonomyCodec:
+    """
+    Compact, ID-encoded form of the keyword taxonomy (keywords.json) for the enrichment prompt.
+
+    Each tag gets a short ID ("T1", "T2", ...) and the prompt lists one category per line
+    ("Category: T1=Tag; T2=Tag") instead of indented JSON. The model answers with tag IDs
+    under a response schema that pins `core_domain` and `procurement_type` to their enums;
+    `decode()` validates an answer and maps the IDs back to tag names.
+    """
+
+    def __init__(self, data: Any):
+        self.tags: Dict[str, str] = {}  # ID -> tag name
+        self._ids_by_name: Dict[str, str] = {}  # lower-cased tag name -> ID
+        self.groups: List[Tuple[str, List[str]]] = []  # (category, [IDs]) in keywords.json order
+        if isinstance(data, dict):
+            groups = [(str(category), keys) for category, keys in data.items() if isinstance(keys, list)]
+        elif isinstance(data, list):
+            groups = [("Tags", data)]
+        else:
+            groups = []
+        for category, keys in groups:
+            ids = []
+            for key in keys:
+                name = str(key).strip()
+                if not name:
+                    continue
+                tag_id = self._ids_by_name.get(name.lower())
+                if tag_id is None:
+                    tag_id = f"T{len(self.tags) + 1}"
+                    self.tags[tag_id] = name
+                    self._ids_by_name[name.lower()] = tag_id
+                if tag_id not in ids:
+                    ids.append(tag_id)
+            self.groups.append((category, ids))
+
+    def __len__(self):
+        return len(self.tags)
+
+    def encode(self) -> str:
+        """
+        The taxonomy as prompt text: one line per category.
+        """
+        if not self.tags:
+            return "No specific keywords loaded."
+        return "\n".join(
+            f"{category}: " + "; ".join(f"{tag_id}={self.tags[tag_id]}" for tag_id in ids)
+            for category, ids in self.groups if ids
+        )
+
+    def response_schema(self, packed: bool = False, fields: List[str] = None) -> Dict[str, Any]:
+        """
+        JSON schema for GenerationConfig.response_schema: one result object, or for packed
+        prompts an array of them each carrying the tender "id". `fields` restricts the
+        object to those fields (for a field re-ask).
+        """
+        tag_item: Dict[str, Any] = {"type": "string"}
+        if 0 < len(self.tags) <= MAX_TAG_ENUM:
+            tag_item = {"type": "string", "enum": list(self.tags)}
+        result = {
+            "type": "object",
+            "properties": {
+                "core_domain": {"type": "string", "enum": CORE_DOMAINS},
+                "project_tags": {"type": "array", "items": tag_item},
+                "procurement_type": {"type": "string", "enum": PROCUREMENT_TYPES},
+                "search_keywords": {"type": "array", "items": {"type": "string"}},
+                "entities": {
+                    "type": "object",
+                    "properties": {field: {"type": "string"} for field in ENTITY_FIELDS},
+                    "required": list(ENTITY_FIELDS),
+                },
+                "signal_summary": {"type": "string"},
+            },
+            "required": list(REQUIRED_FIELDS),
+        }
+        if fields:
+            result["properties"] = {field: result["properties"][field] for field in fields}
+            result["required"] = list(fields)
+        if packed:
+            result["properties"]["id"] = {"type": "string"}
+            result["required"].insert(0, "id")
+            return {"type": "array", "items": result}
+        return result
+
+    def tag_name(self, value: Any) -> Optional[str]:
+        """
+        Tag name for an ID, or for a tag the model spelled out in full; None if unknown.
+        """
+        text = str(value).strip()
+        if text.upper() in self.tags:
+            return self.tags[text.upper()]
+        tag_id = self._ids_by_name.get(text.lower())
+        return self.tags[tag_id] if tag_id else None
+
+    @staticmethod
+    def missing_fields(result: Any) -> List[str]:
+        """
+        Required fields absent from a raw answer or of the wrong type (before decode(), which
+        fills in defaults). Empty when the answer is complete.
+        """
+        if not isinstance(result, dict):
+            return list(REQUIRED_FIELDS)
+        missing = []
+        for field in REQUIRED_FIELDS:
+            value = result.get(field)
+            if field in ("project_tags", "search_keywords"):
+                valid = isinstance(value, list)
+            elif field == "entities":
+                valid = isinstance(value, dict) and all(f in value for f in ENTITY_FIELDS)
+            else:
+                valid = isinstance(value, str) and bool(value.strip())
+            if not valid:
+                missing.append(field)
+        return missing
+
+    def decode(self, result: Any) -> Optional[Dict[str, Any]]:
+        """
+        Validates one answer object in place of trusting it: enums snapped to their canonical
+        values, tag IDs mapped to names (unknown ones dropped, at most 3), list/entity fields
+        coerced to their types. Returns None if `result` is not an object.
+        """
+        if not isinstance(result, dict):
+            return None
+        decoded = dict(result)
+
+        domain = result.get("core_domain")
+        if domain is not None:
+            decoded["core_domain"] = next((d for d in CORE_DOMAINS if d.lower() == str(domain).strip().lower()), "Other")
+
+        ptype = str(result.get("procurement_type") or "").strip().lower()
+        decoded["procurement_type"] = next((p for p in PROCUREMENT_TYPES if p.lower() == ptype),
+                                           _PROCUREMENT_ALIASES.get(ptype, "Unknown"))
+
+        tags = result.get("project_tags")
+        names: List[str] = []
+        for value in tags if isinstance(tags, list) else [tags] if tags else []:
+            name = self.tag_name(value)
+            if name and name not in names:
+                names.append(name)
+        decoded["project_tags"] = names[:3]
+
+        keywords = result.get("search_keywords")
+        decoded["search_keywords"] = [str(k) for k in keywords if k] if isinstance(keywords, list) else []
+
+        entities = result.get("entities") if isinstance(result.get("entities"), dict) else {}
+        decoded["entities"] = {field: str(entities.get(field) or "Unknown") for field in ENTITY_FIELDS}
+
+        if "signal_summary" in result and not isinstance(result["signal_summary"], str):
+            decoded["signal_summary"] = str(result["signal_summary"] or "")
+        return decoded
@@ -0,0 +1,110 @@
+import os
+import time
+import asyncio
+import datetime
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from src.enrichment.context_cache import ContextCacheManager, is_cache_lost
+from src.enrichment.processor import TenderEnricher
+
+class FakeCache:
+    """Stands in for the Gemini CachedContent API (server-side state in `live`)."""
+    live = {}
+    created = 0
+
+    def __init__(self, name, ttl):
+        self.name = name
+        self.expire_time = datetime.datetime.now(datetime.timezone.utc) + ttl
+
+    @classmethod
+    def create(cls, model, display_name, system_instruction, ttl):
+        cls.created += 1
+        cache = cls(f"cachedContents/{cls.created}", ttl)
+        cls.live[cache.name] = cache
+        return cache
+
+    @classmethod
+    def get(cls, name):
+        if name not in cls.live:
+            raise Exception("403 CachedContent not found (or permission denied)")
+        return cls.live[name]
+
+    def update(self, ttl):
+        self.expire_time = datetime.datetime.now(datetime.timezone.utc) + ttl
+
+class TestContextCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, "context.db")
+        FakeCache.live, FakeCache.created = {}, 0
+        patcher = patch("src.enrichment.context_cache.caching.CachedContent", FakeCache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def manager(self, prompt="taxonomy v1"):
+        return ContextCacheManager("models/m", prompt, db_path=self.db, ttl_minutes=60)
+
+    def test_reused_across_processes_and_keyed_by_prompt(self):
+        first = self.manager().acquire()
+        second = self.manager().acquire()
+        self.assertEqual(first.name, second.name)
+        self.assertEqual(FakeCache.created, 1)
+
+        self.manager("taxonomy v2").acquire()
+        self.assertEqual(FakeCache.created, 2)
+
+    def test_extends_before_expiry_and_recreates_when_lost(self):
+        manager = self.manager()
+        cache = manager.acquire()
+        self.assertFalse(manager.ensure_fresh())
+
+        # Close to expiry: TTL is extended, same cache
+        cache.expire_time = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=5)
+        manager.expires_at = time.time() + 300
+        self.assertFalse(manager.ensure_fresh())
+        self.assertGreater(manager.expires_in(), 3000)
+        self.assertEqual(FakeCache.created, 1)
+
+        # Gone on the server: recreated once, however many calls report it
+        del FakeCache.live[cache.name]
+        self.assertTrue(manager.ensure_fresh(lost=cache.name))
+        self.assertFalse(manager.ensure_fresh(lost=cache.name))
+        self.assertEqual(FakeCache.created, 2)
+        self.assertTrue(is_cache_lost(Exception("403 CachedContent not found (or permission denied)")))
+        self.assertFalse(is_cache_lost(Exception("429 Resource exhausted")))
+
+class FakeModel:
+    def __init__(self, lost=False):
+        self.lost = lost
+        self.sent = []
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        self.sent.append(prompt)
+        if self.lost:
+            raise Exception("403 CachedContent not found (or permission denied)")
+        return prompt
+
+class TestPromptFollowsModel(unittest.TestCase):
+
+    def test_prompt_is_rebuilt_for_the_model_it_is_sent_with(self):
+        enricher = TenderEnricher.__new__(TenderEnricher)
+        cached_model, full_model = FakeModel(lost=True), FakeModel()
+        enricher.model, enricher.cache, enricher.use_cache = cached_model, FakeCache("cachedContents/1", datetime.timedelta(0)), True
+        # Cache lost and cannot be recreated: falls back to the full prompt
+        enricher.context_cache = Mock(needs_refresh=Mock(return_value=False), expires_in=Mock(return_value=0),
+                                      ensure_fresh=Mock(side_effect=Exception("503 unavailable")))
+        prompt_for = lambda cached: "tender only" if cached else "system prompt + tender"
+
+        with patch("src.enrichment.processor.genai.GenerativeModel", return_value=full_model):
+            self.assertEqual(asyncio.run(enricher._generate(prompt_for, None)), "system prompt + tender")
+        self.assertEqual(cached_model.sent, ["tender only"])
+        self.assertEqual(full_model.sent, ["system prompt + tender"])
+        self.assertFalse(enricher.use_cache)
+
+if __name__ == '__main__':
+    unittest.main()
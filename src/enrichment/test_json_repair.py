@@ -0,0 +1,29 @@
+import unittest
+from src.enrichment.json_repair import loads_lenient
+from src.enrichment.taxonomy_codec import TaxonomyCodec
+
+class TestJsonRepair(unittest.TestCase):
+
+    def test_repairs_common_llm_mistakes(self):
+        self.assertEqual(loads_lenient('```json\n{"a": 1, "b": [1, 2,],}\n```'), {"a": 1, "b": [1, 2]})
+        self.assertEqual(loads_lenient('{"a": 1}\n```'), {"a": 1})
+        self.assertEqual(loads_lenient('Here you go: {"a": "x\ny"} Hope this helps'), {"a": "x\ny"})
+        self.assertEqual(loads_lenient('```\n[{"id": "1", "x": 2}, {"id": "2", "x"'), [{"id": "1", "x": 2}, {"id": "2"}])
+        with self.assertRaises(ValueError):
+            loads_lenient("no json here")
+
+    def test_brackets_in_prose_before_the_answer(self):
+        self.assertEqual(loads_lenient('Answer [v2]: {"core_domain": "Energy"}'), {"core_domain": "Energy"})
+        self.assertEqual(loads_lenient('Note {see below} then {"a": 1, "b": [2'), {"a": 1, "b": [2]})
+        self.assertEqual(loads_lenient('See [1, 2]: {"a": 1}'), {"a": 1})
+        # A packed array is not split into its first object
+        self.assertEqual(loads_lenient('Result [v2]: [{"id": "1"}, {"id": "2"}]'), [{"id": "1"}, {"id": "2"}])
+
+    def test_truncated_values_are_dropped_not_shortened(self):
+        answer = loads_lenient('{"core_domain": "Healthcare", "entities": {"location_city": "Delhi", "location_state": "De')
+        self.assertEqual(answer, {"core_domain": "Healthcare", "entities": {"location_city": "Delhi"}})
+        self.assertEqual(TaxonomyCodec([]).missing_fields(answer),
+                         ["project_tags", "procurement_type", "search_keywords", "entities", "signal_summary"])
+
+if __name__ == '__main__':
+    unittest.main()
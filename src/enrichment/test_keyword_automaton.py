@@ -0,0 +1,36 @@
+import random
+import unittest
+from src.enrichment.keyword_automaton import KeywordAutomaton
+
+class TestKeywordAutomaton(unittest.TestCase):
+
+    def test_finds_overlapping_keywords_with_categories(self):
+        automaton = KeywordAutomaton.from_taxonomy({
+            "Healthcare": ["Hospital", "Medical Equipment", "Ear Tags"],
+            "Agriculture": ["Animal Identification Ear Tags", "ear tags"],
+            "Infrastructure": ["Road", "Roads", "he"],
+        })
+        text = "Supply of ANIMAL IDENTIFICATION EAR TAGS and hospital roads"
+        matches = automaton.find(text)
+
+        self.assertEqual(sorted(matches), sorted(["Animal Identification Ear Tags", "Ear Tags", "Hospital", "Road", "Roads"]))
+        self.assertEqual(sorted(automaton.match_categories(matches)), ["Agriculture", "Healthcare", "Infrastructure"])
+        self.assertTrue(automaton.contains_any("the road"))
+        self.assertFalse(automaton.contains_any("supply of laptops"))
+
+    def test_same_results_as_substring_search(self):
+        rng = random.Random(7)
+        alphabet = "abc "
+        keywords = list({"".join(rng.choice(alphabet) for _ in range(rng.randint(1, 5))).strip() or "a" for _ in range(60)})
+        automaton = KeywordAutomaton(keywords)
+        for _ in range(200):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+            self.assertEqual(set(automaton.find(text)), {k for k in keywords if k in text})
+
+    def test_empty_taxonomy(self):
+        automaton = KeywordAutomaton.from_taxonomy([])
+        self.assertEqual(automaton.find("anything"), [])
+        self.assertFalse(automaton.contains_any("anything"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+from unittest import mock
+from src.enrichment.keyword_automaton import KeywordAutomaton
+from src.enrichment.rule_tier import RuleBasedEnricher
+from src.enrichment.processor import TenderEnricher, pack_by_tokens, ENRICHMENT_OUTPUT_TOKENS
+
+class TestPacking(unittest.TestCase):
+
+    def test_packs_are_sized_by_tokens(self):
+        short = {"Summary": "Supply of laptops", "Description": "x" * 40}
+        long = {"Summary": "Hospital construction", "Description": "x" * 16000}  # ~4000 tokens
+        rows = [short] * 6 + [long, long] + [short]
+        packs = list(pack_by_tokens(rows, max_size=4, max_tokens=3 * ENRICHMENT_OUTPUT_TOKENS + 4600))
+
+        self.assertEqual([len(p) for p in packs], [4, 3, 2])  # Size cap, then the token budget (one long tender per pack)
+        self.assertEqual([r for p in packs for r in p], rows)  # Order preserved
+
+    def test_unpackable_rows_go_alone(self):
+        rows = [{"Summary": str(i)} for i in range(5)]
+        packs = list(pack_by_tokens(rows, max_size=10, max_tokens=10 ** 6, packable=lambda r: r["Summary"] != "2"))
+        self.assertEqual([[r["Summary"] for r in p] for p in packs], [["0", "1"], ["2"], ["3", "4"]])
+
+    def test_parse_packed_answers(self):
+        text = '```json\n[{"id": "2", "signal_summary": "b"}, {"id": 1, "signal_summary": "a"}]\n```'
+        self.assertEqual(TenderEnricher._parse_packed(text, 3), {
+            "2": {"id": "2", "signal_summary": "b"},
+            "1": {"id": 1, "signal_summary": "a"},
+        })
+        # No ids: positions only count when nothing is missing
+        self.assertEqual(set(TenderEnricher._parse_packed('{"tenders": [{}, {}]}', 2)), {"1", "2"})
+        self.assertEqual(TenderEnricher._parse_packed('[{}, {}]', 3), {})
+        with self.assertRaises(ValueError):
+            TenderEnricher._parse_packed("not json", 2)
+
+    def test_rule_tier_classifies_each_row_once(self):
+        automaton = KeywordAutomaton.from_taxonomy({"Healthcare": ["Ventilators"]})
+        enricher = TenderEnricher.__new__(TenderEnricher)
+        enricher.keyword_automaton = automaton
+        enricher.rule_tier = RuleBasedEnricher(automaton, gazetteer={"Delhi": ["New Delhi"]})
+        enricher.rule_threshold = 0.8
+        enricher._rule_verdicts = {}
+        enricher.result_cache = None
+        enricher.pack_size, enricher.pack_tokens = 4, 10 ** 6
+        enricher.hedge_after, enricher.deadline = 10, 60
+        enricher.prompt_version = enricher.taxonomy_version = "v"
+
+        async def pack_call(rows, keys):
+            return [dict(row, core_domain="Other") for row in rows]
+
+        rows = [
+            {"Summary": "Supply of Ventilators for AIIMS New Delhi", "Description": "ICU"},
+            {"Summary": "Annual maintenance requirement", "Description": "Various works"},
+            {"Summary": "Tender for miscellaneous items", "Description": "Various items"},
+        ]
+        with mock.patch.object(enricher.rule_tier, "classify", wraps=enricher.rule_tier.classify) as classify, \
+             mock.patch.object(enricher, "_should_enrich", return_value=True), \
+             mock.patch.object(enricher, "_enrich_pack_call", side_effect=pack_call) as packed:
+
+            async def run():
+                return [row async for row in enricher._enrich_packed(rows, 4)]
+
+            enriched = asyncio.run(run())
+
+        self.assertEqual(classify.call_count, 3)
+        self.assertEqual((enricher.rule_tier.accepted, enricher.rule_tier.deferred), (1, 2))
+        self.assertEqual(enriched[0]["enrichment_source"], "rules")
+        self.assertEqual(len(packed.call_args[0][0]), 2)
+        self.assertEqual(enricher._rule_verdicts, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import os
+import tempfile
+import unittest
+from src.enrichment.result_cache import EnrichmentCache
+
+class TestEnrichmentCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = EnrichmentCache(os.path.join(self.tmp.name, "cache.db"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_keys_ignore_case_and_whitespace_but_not_versions(self):
+        key = EnrichmentCache.key_for("Supply of  Laptops", "For the\ndistrict office", "p1", "t1")
+        self.assertEqual(key, EnrichmentCache.key_for("supply of laptops ", "for the district office", "p1", "t1"))
+        self.assertNotEqual(key, EnrichmentCache.key_for("supply of laptops", "for the district office", "p2", "t1"))
+        self.assertNotEqual(key, EnrichmentCache.key_for("supply of laptops", "for the district office", "p1", "t2"))
+
+    def test_round_trip_and_hit_rate(self):
+        result = {"core_domain": "Technology", "signal_summary": "Supply laptops", "project_tags": ["IT"]}
+        self.assertIsNone(self.cache.get("a"))
+        self.cache.put("a", result)
+        self.assertEqual(self.cache.get_many(["a", "b"]), {"a": result})
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+        self.assertAlmostEqual(self.cache.hit_rate, 1 / 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from src.enrichment.keyword_automaton import KeywordAutomaton
+from src.enrichment.rule_tier import RuleBasedEnricher, CATEGORY_DOMAINS, guess_procurement_type, _domain_for_category
+from src.enrichment.taxonomy_codec import CORE_DOMAINS
+
+# Category headers of the real tender taxonomy (excel_structure.txt)
+REAL_CATEGORIES = [
+    "Agriculture, Farming and Forestry", "Food and Beverage", "Banking, Financial Services and Insurance (BFSI)",
+    "Education, Training and R&D", "Environment", "Information Technology",
+    "Transportation Service and Supply Chain Management", "Transportation Equipment, Machinery and Vehicles",
+    "Healthcare", "Power and Energy", "Oil and Gas", "Legal Services", "Defence", "Aviation", "HVAC",
+    "Telecommunication", "Construction", "Mining, Minerals, Ores, Basic Metal and Alloys", "Chemicals", "Space",
+    "Other Materials and Products", "Other Services", "Other Equipment And Machineries",
+]
+
+class TestRuleTier(unittest.TestCase):
+
+    def setUp(self):
+        automaton = KeywordAutomaton.from_taxonomy({
+            "Healthcare": ["Ventilators", "Medical Equipment (Imaging)"],
+            "Construction": ["Road"],
+        })
+        self.rules = RuleBasedEnricher(automaton, gazetteer={"Delhi": ["New Delhi"], "Goa": []})
+
+    def test_confident_title_skips_llm(self):
+        result = self.rules.try_enrich("Supply of Ventilators for AIIMS New Delhi", "", threshold=0.8)
+
+        self.assertIsNotNone(result)
+        self.assertEqual(result["core_domain"], "Healthcare")
+        self.assertEqual(result["project_tags"], ["Ventilators"])
+        self.assertEqual(result["procurement_type"], "Supply")
+        self.assertEqual(result["entities"], {"authority_name": "AIIMS", "location_city": "New Delhi", "location_state": "Delhi"})
+        self.assertEqual(result["enrichment_source"], "rules")
+        self.assertEqual(self.rules.skip_rate, 1.0)
+
+    def test_vague_title_deferred(self):
+        self.assertIsNone(self.rules.try_enrich("Tender for annual requirement", "", threshold=0.8))
+        # Keywords with punctuation still match on whole words
+        result, confidence = self.rules.classify("Medical equipment imaging for goat farm", "")
+        self.assertEqual(result["project_tags"], ["Medical Equipment (Imaging)"])
+        self.assertEqual(result["entities"]["location_state"], "Unknown")  # "goat" is not Goa
+        self.assertLess(confidence, 0.8)
+        self.assertEqual(self.rules.deferred, 1)
+
+    def test_every_real_category_has_a_domain(self):
+        self.assertEqual(sorted(CATEGORY_DOMAINS), sorted(REAL_CATEGORIES))
+        for category in REAL_CATEGORIES:
+            self.assertIn(_domain_for_category(category), CORE_DOMAINS, category)
+        self.assertEqual(_domain_for_category("Defence"), "Defense")
+        self.assertEqual(_domain_for_category("oil and  gas"), "Energy")
+        self.assertEqual(_domain_for_category("Construction"), "Infrastructure")
+        self.assertIsNone(_domain_for_category("Healthcare Equipment"))
+
+    def test_procurement_type_strength(self):
+        self.assertEqual(guess_procurement_type("e-Tender for Construction of road"), ("Works", 1.0))
+        self.assertEqual(guess_procurement_type("Annual cleaning contract"), ("Services", 0.5))
+        self.assertEqual(guess_procurement_type("Misc"), (None, 0.0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import json
+import unittest
+from src.enrichment.taxonomy_codec import TaxonomyCodec, MAX_TAG_ENUM
+
+class TestTaxonomyCodec(unittest.TestCase):
+
+    def setUp(self):
+        self.taxonomy = {
+            "Animal Husbandry": ["Animal Identification Ear Tags", "Veterinary Medicines"],
+            "Medical Devices": ["Ventilators", "veterinary medicines"],
+        }
+        self.codec = TaxonomyCodec(self.taxonomy)
+
+    def test_compact_encoding(self):
+        self.assertEqual(self.codec.encode(),
+                         "Animal Husbandry: T1=Animal Identification Ear Tags; T2=Veterinary Medicines\n"
+                         "Medical Devices: T3=Ventilators; T2=Veterinary Medicines")
+        self.assertLess(len(self.codec.encode()), len(json.dumps(self.taxonomy, indent=2)))
+        self.assertEqual(TaxonomyCodec([]).encode(), "No specific keywords loaded.")
+
+    def test_schema_constrains_enums_and_tag_ids(self):
+        schema = self.codec.response_schema()
+        self.assertIn("Healthcare", schema["properties"]["core_domain"]["enum"])
+        self.assertEqual(schema["properties"]["procurement_type"]["enum"], ["Works", "Supply", "Services"])
+        self.assertEqual(schema["properties"]["project_tags"]["items"]["enum"], ["T1", "T2", "T3"])
+
+        packed = self.codec.response_schema(packed=True)
+        self.assertEqual(packed["type"], "array")
+        self.assertIn("id", packed["items"]["required"])
+
+        large = TaxonomyCodec({"Big": [f"tag {i}" for i in range(MAX_TAG_ENUM + 1)]})
+        self.assertNotIn("enum", large.response_schema()["properties"]["project_tags"]["items"])
+
+    def test_decode_maps_ids_and_validates(self):
+        decoded = self.codec.decode({
+            "core_domain": "agriculture",
+            "project_tags": ["T1", "t3", "Veterinary Medicines", "T99", "T1"],
+            "procurement_type": "Consultancy",
+            "search_keywords": "not a list",
+            "entities": {"authority_name": "AIIMS", "location_city": None},
+            "signal_summary": "Supply of ear tags",
+        })
+        self.assertEqual(decoded["core_domain"], "Agriculture")
+        self.assertEqual(decoded["project_tags"], ["Animal Identification Ear Tags", "Ventilators", "Veterinary Medicines"])
+        self.assertEqual(decoded["procurement_type"], "Services")
+        self.assertEqual(decoded["search_keywords"], [])
+        self.assertEqual(decoded["entities"], {"authority_name": "AIIMS", "location_city": "Unknown", "location_state": "Unknown"})
+        self.assertEqual(self.codec.decode({"core_domain": "Space"})["core_domain"], "Other")
+        self.assertIsNone(self.codec.decode(["not", "an", "object"]))
+
+if __name__ == '__main__':
+    unittest.main()
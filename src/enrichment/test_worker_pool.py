@@ -0,0 +1,87 @@
+import time
+import asyncio
+import unittest
+from src.enrichment.worker_pool import sliding_window, hedged_call
+
+class TestSlidingWindow(unittest.TestCase):
+
+    def test_straggler_does_not_block_other_slots(self):
+        active, peak = [0], [0]
+
+        async def work(item):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.3 if item == 0 else 0.01)
+            active[0] -= 1
+            return item * 10
+
+        async def main():
+            start = time.monotonic()
+            results = [r async for r in sliding_window(range(40), work, concurrency=4)]
+            return results, time.monotonic() - start
+
+        results, elapsed = asyncio.run(main())
+        self.assertEqual(results, [i * 10 for i in range(40)])  # Input order despite the straggler
+        self.assertEqual(peak[0], 4)
+        # Lockstep batches of 4 would take >= 0.3 + 9 * 0.01; the other 3 slots keep going meanwhile
+        self.assertLess(elapsed, 0.38)
+
+class TestHedgedCall(unittest.TestCase):
+
+    def test_straggler_is_hedged_and_cancelled(self):
+        calls, cancelled = [], []
+
+        async def call(clock):
+            calls.append(clock)
+            if len(calls) == 1:
+                with clock.request():
+                    try:
+                        await asyncio.sleep(10)  # Stuck primary
+                    except asyncio.CancelledError:
+                        cancelled.append(True)
+                        raise
+            return "hedge"
+
+        result = asyncio.run(hedged_call(call, hedge_after=0.05, deadline=1.0))
+        self.assertEqual(result, "hedge")
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(cancelled, [True])
+
+    def test_queue_time_does_not_trigger_hedge(self):
+        calls = []
+
+        async def call(clock):
+            calls.append(clock)
+            await asyncio.sleep(0.2)  # Waiting for a rate-control slot
+            with clock.request():
+                await asyncio.sleep(0.02)
+            return "ok"
+
+        self.assertEqual(asyncio.run(hedged_call(call, hedge_after=0.1, deadline=1.0)), "ok")
+        self.assertEqual(len(calls), 1)
+
+    def test_backoff_pauses_hedge_and_deadline(self):
+        calls = []
+
+        async def call(clock):
+            calls.append(clock)
+            with clock.request():
+                await asyncio.sleep(0.02)  # 429
+            await asyncio.sleep(0.3)  # Retry-After backoff
+            with clock.request():
+                await asyncio.sleep(0.02)
+            return "ok"
+
+        self.assertEqual(asyncio.run(hedged_call(call, hedge_after=0.1, deadline=0.2)), "ok")
+        self.assertEqual(len(calls), 1)
+
+    def test_deadline(self):
+        async def call(clock):
+            with clock.request():
+                await asyncio.sleep(10)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(hedged_call(call, hedge_after=0.05, deadline=0.1))
+
+if __name__ == '__main__':
+    unittest.main()
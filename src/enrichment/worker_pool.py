@@ -0,0 +1,162 @@
+import asyncio
+import logging
+from contextlib import contextmanager, nullcontext
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Set
+from src.monitoring.metrics import REGISTRY
+
+HEDGED_CALLS = REGISTRY.counter(
+    "tenders_enrichment_hedged_calls_total",
+    "Straggling enrichment calls that got a hedged retry, by which attempt answered (primary/hedge/failed).",
+    ("result",),
+)
+
+
+async def sliding_window(items: Iterable[Any], worker: Callable[[Any], Awaitable[Any]],
+                         concurrency: int) -> AsyncIterator[Any]:
+    """
+    Runs `worker(item)` over `items` with exactly `concurrency` calls in flight: a slot is
+    refilled as soon as any call finishes, so one slow call never idles the others (unlike
+    gather() over fixed batches). Results are yielded in input order through a reorder
+    buffer; it only grows while the oldest call is still running, which the hedge deadline bounds.
+    """
+    iterator = iter(items)
+    running: Dict[asyncio.Future, int] = {}
+    finished: Dict[int, Any] = {}
+    submitted = emitted = 0
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(running) < concurrency:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                running[asyncio.ensure_future(worker(item))] = submitted
+                submitted += 1
+            if not running:
+                return
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                finished[running.pop(task)] = task.result()
+            while emitted in finished:
+                yield finished.pop(emitted)
+                emitted += 1
+    finally:
+        for task in running:
+            task.cancel()
+
+
+class InFlightClock:
+    """
+    Time during which at least one attempt of a call has a request out. Waiting for a
+    rate-control slot and sleeping through 429 / retry backoff do not count.
+    Calls wrap each request in `with clock.request():`.
+    """
+
+    def __init__(self):
+        self._active = 0
+        self._since = 0.0
+        self._elapsed = 0.0
+        self._changed = asyncio.Event()
+
+    @property
+    def elapsed(self) -> float:
+        if self._active:
+            return self._elapsed + asyncio.get_running_loop().time() - self._since
+        return self._elapsed
+
+    @contextmanager
+    def request(self):
+        if not self._active:
+            self._since = asyncio.get_running_loop().time()
+            self._changed.set()
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            if not self._active:
+                self._elapsed += asyncio.get_running_loop().time() - self._since
+                self._changed.set()
+
+    async def wait(self, seconds: float, tasks: Set[asyncio.Future]):
+        """
+        Returns once `seconds` of in-flight time have passed or any of `tasks` is done.
+        """
+        while not any(task.done() for task in tasks):
+            remaining = seconds - self.elapsed
+            if remaining <= 0:
+                return
+            self._changed.clear()
+            changed = asyncio.ensure_future(self._changed.wait())
+            try:
+                await asyncio.wait({*tasks, changed}, timeout=remaining if self._active else None,
+                                   return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                changed.cancel()
+
+
+def in_flight(clock: Optional[InFlightClock]):
+    """
+    `clock.request()`, or a no-op when the call is not timed.
+    """
+    return clock.request() if clock is not None else nullcontext()
+
+
+async def hedged_call(call: Callable[[Optional[InFlightClock]], Awaitable[Any]], hedge_after: float, deadline: float,
+                      succeeded: Callable[[Any], bool] = lambda result: True) -> Any:
+    """
+    Runs `call(clock)`; if its request has been out for `hedge_after` seconds without an
+    answer, races a second attempt against it and returns whichever succeeds first. The loser
+    is cancelled. Raises asyncio.TimeoutError when nothing answered within `deadline`.
+
+    Both clocks count in-flight time only (see InFlightClock, shared by both attempts): a call
+    queueing for a rate-control slot or backing off after a 429 is neither hedged nor timed out.
+    """
+    clock = InFlightClock()
+    primary = asyncio.ensure_future(call(clock))
+    tasks = [primary]
+    try:
+        racing = {primary}
+        if hedge_after and hedge_after < deadline:
+            await clock.wait(hedge_after, racing)
+            if not primary.done():
+                logging.info(f"Enrichment call still in flight after {hedge_after}s, sending a hedged retry")
+                hedge = asyncio.ensure_future(call(clock))
+                tasks.append(hedge)
+                racing.add(hedge)
+        else:
+            await clock.wait(deadline, racing)
+        if primary.done() and len(racing) == 1:
+            return primary.result()
+
+        fallback, error = None, None
+        while racing:
+            await clock.wait(deadline, racing)
+            done = {task for task in racing if task.done()}
+            if not done:
+                break
+            racing -= done
+            for task in done:
+                try:
+                    result = task.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                if succeeded(result):
+                    HEDGED_CALLS.inc(result="primary" if task is primary else "hedge")
+                    return result
+                fallback = result if fallback is None else fallback
+
+        HEDGED_CALLS.inc(result="failed")
+        if fallback is not None:
+            return fallback
+        if error is not None:
+            raise error
+        raise asyncio.TimeoutError(f"No response within {deadline}s")
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,50 @@
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+from src.feedback.writer import FeedbackWriter
+
+def _entry(i):
+    return {"timestamp": "2026-01-28T10:00:00", "query": f"q{i}", "result_id": f"T{i}", "rating": 1,
+            "position": i, "session_id": None, "result_metadata_snapshot": {"core_domain": "Energy"}, "comment": None}
+
+class TestFeedbackWriter(unittest.TestCase):
+
+    def test_batches_are_flushed_on_stop(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            async def run():
+                writer = FeedbackWriter(data_dir=tmp, batch_size=3, flush_interval=60)
+                writer.start()
+                for i in range(7):
+                    self.assertTrue(writer.submit(_entry(i)))
+                await writer.stop()
+                return writer
+
+            writer = asyncio.run(run())
+            with open(writer.log_path) as f:
+                lines = [json.loads(line) for line in f]
+            self.assertEqual([l["result_id"] for l in lines], [f"T{i}" for i in range(7)])
+
+    def test_rotation_and_compaction(self):
+        import duckdb
+        with tempfile.TemporaryDirectory() as tmp:
+            async def run():
+                writer = FeedbackWriter(data_dir=tmp, batch_size=2, flush_interval=60, max_bytes=1)
+                writer.start()
+                for i in range(4):
+                    writer.submit(_entry(i))
+                await writer.stop()
+                return writer
+
+            writer = asyncio.run(run())
+            self.assertFalse(os.path.exists(writer.log_path))
+            self.assertEqual(len(os.listdir(writer.archive_dir)), 2)
+
+            target = writer.compact()
+            self.assertEqual([f for f in os.listdir(writer.archive_dir) if f.endswith(".jsonl")], [])
+            count = duckdb.sql(f"SELECT count(*) FROM '{target}'").fetchone()[0]
+            self.assertEqual(count, 4)
+
+if __name__ == '__main__':
+    unittest.main()
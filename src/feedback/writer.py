@@ -0,0 +1,180 @@
+import os
+import glob
+import json
+import time
+import fcntl
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+# Fixed schema for compaction, so differing result snapshots never break the Parquet schema
+FEEDBACK_COLUMNS = {
+    "timestamp": "VARCHAR",
+    "query": "VARCHAR",
+    "result_id": "VARCHAR",
+    "rating": "INTEGER",
+    "position": "INTEGER",
+    "session_id": "VARCHAR",
+    "result_metadata_snapshot": "JSON",
+    "comment": "VARCHAR",
+}
+
+
+class FeedbackWriter:
+    """
+    Buffered, asynchronous feedback log writer.
+
+    The request path only does a queue put. A background task batches entries and
+    appends them to `data/feedback_logs.jsonl` (flushing on batch size or interval)
+    under an exclusive file lock, so several uvicorn workers never interleave lines.
+    Full logs are rotated into `feedback_archive/`, and rotated logs are periodically
+    compacted into Parquet (via DuckDB) under `feedback_parquet/`.
+    """
+
+    def __init__(self, data_dir: str = "data", filename: str = "feedback_logs.jsonl",
+                 batch_size: int = 100, flush_interval: float = 2.0,
+                 max_bytes: int = 50 * 1024 * 1024, compact_interval: float = 3600.0,
+                 max_queue: int = 10000):
+        self.data_dir = data_dir
+        self.log_path = os.path.join(data_dir, filename)
+        self.lock_path = self.log_path + ".lock"
+        self.archive_dir = os.path.join(data_dir, "feedback_archive")
+        self.parquet_dir = os.path.join(data_dir, "feedback_parquet")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.compact_interval = compact_interval
+
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._last_compaction = time.monotonic()
+        self.dropped = 0
+
+    def start(self):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        os.makedirs(self.parquet_dir, exist_ok=True)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logging.info(f"Feedback writer started ({self.log_path}).")
+
+    async def stop(self):
+        """
+        Drains the queue and flushes everything before shutdown.
+        """
+        if self._task is None:
+            return
+        await self.queue.put(None)  # Sentinel
+        await self._task
+        self._task = None
+
+    def submit(self, entry: Dict[str, Any]) -> bool:
+        """
+        Non-blocking enqueue. Returns False (and counts a drop) if the buffer is full.
+        """
+        try:
+            self.queue.put_nowait(entry)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logging.warning(f"Feedback queue full, dropped entry (total dropped: {self.dropped}).")
+            return False
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+
+            # On shutdown, also take whatever is still buffered
+            while stopping and not self.queue.empty():
+                entry = self.queue.get_nowait()
+                if entry is not None:
+                    batch.append(entry)
+
+            try:
+                if batch:
+                    await asyncio.to_thread(self._write_batch, batch)
+                if time.monotonic() - self._last_compaction >= self.compact_interval:
+                    self._last_compaction = time.monotonic()
+                    await asyncio.to_thread(self.compact)
+            except Exception as e:
+                logging.error(f"Feedback writer error: {e}")
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        """
+        Appends a batch with one write() while holding an exclusive lock (shared across processes).
+        """
+        payload = "".join(json.dumps(entry) + "\n" for entry in batch)
+        with open(self.lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                with open(self.log_path, 'a') as f:
+                    f.write(payload)
+                if os.path.getsize(self.log_path) >= self.max_bytes:
+                    self._rotate()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _rotate(self):
+        """
+        Moves the active log into the archive. Caller holds the lock.
+        """
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        target = os.path.join(self.archive_dir, f"feedback_logs_{stamp}_{os.getpid()}.jsonl")
+        os.replace(self.log_path, target)
+        logging.info(f"Rotated feedback log to {target}")
+
+    def compact(self) -> Optional[str]:
+        """
+        Compacts rotated JSONL logs into a single Parquet file and removes them.
+        Returns the Parquet path, or None if there was nothing to compact.
+        """
+        # Only one worker compacts at a time; the others skip this round
+        with open(os.path.join(self.archive_dir, ".compact.lock"), 'a') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+            try:
+                return self._compact_archive()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _compact_archive(self) -> Optional[str]:
+        files = sorted(glob.glob(os.path.join(self.archive_dir, "*.jsonl")))
+        if not files:
+            return None
+
+        import duckdb
+
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        target = os.path.join(self.parquet_dir, f"feedback_{stamp}_{os.getpid()}.parquet")
+        file_list = ", ".join("'" + f.replace("'", "''") + "'" for f in files)
+        columns = ", ".join(f"'{name}': '{dtype}'" for name, dtype in FEEDBACK_COLUMNS.items())
+
+        con = duckdb.connect()
+        try:
+            con.execute(
+                f"COPY (SELECT * FROM read_json([{file_list}], format='newline_delimited', columns={{{columns}}})) "
+                f"TO '{target}' (FORMAT PARQUET)"
+            )
+        finally:
+            con.close()
+
+        for f in files:
+            os.remove(f)
+        logging.info(f"Compacted {len(files)} feedback logs into {target}")
+        return target
@@ -2,18 +2,29 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 import json
+import time
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 import chromadb
 from chromadb.config import Settings
 import google.generativeai as genai # Keep for other files potentially? No, new SDK.
 from google import genai
 from google.genai import types
+from src.indexing.sharding import get_shard_by, shard_for_metadata, shard_collection_name, list_shards
+from src.indexing.embeddings import (
+    EMBEDDING_MODEL, get_output_dimensionality, embed_config, normalize_embeddings, check_collection_dimension,
+    existing_dimension
+)
+from src.indexing.quantized_store import QuantizedVectorStore, get_quantized_store_mode
+from src.monitoring.metrics import track
+from src.ingestion.rate_control import get_rate_controller
+from src.ingestion.corrigenda import is_corrigendum, child_id
 
 # ...
 
 class ChromaLoader:
-    def __init__(self, collection_name: str = "tenders_v1", persist_directory: str = "./chroma_db", api_key: str = None):
+    def __init__(self, collection_name: str = "tenders_v1", persist_directory: str = "./chroma_db", api_key: str = None,
+                 shard_by: str = None, output_dimensionality: int = None):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         if not self.api_key:
              logging.warning("No GEMINI_API_KEY found. Embeddings will fail.")
@@ -32,7 +43,135 @@ class ChromaLoader:
             logging.info(f"Connecting to Local ChromaDB at {persist_directory}...")
             self.client = chromadb.PersistentClient(path=persist_directory)
             
-        self.collection = self.client.get_or_create_collection(name=collection_name)
+        # Embedding width: EMBEDDING_DIM, else the width the existing index was built with
+        # (768 for a new one). Recorded on the collection so the search engine can refuse
+        # to query with a different width.
+        self.collection_name = collection_name
+        existing = None
+        if not (output_dimensionality or os.getenv("EMBEDDING_DIM")):
+            existing = existing_dimension(self.client, [collection_name, *list_shards(self.client, collection_name)])
+        self.embedding_dim = get_output_dimensionality(output_dimensionality, existing)
+
+        self.collection = self.client.get_or_create_collection(name=collection_name, metadata={"embedding_dim": self.embedding_dim})
+        check_collection_dimension(self.collection, self.embedding_dim)
+
+        # Optional Sharding: route records to per-domain / per-country collections
+        # (CHROMA_SHARD_BY=domain|country). Each shard keeps its own, smaller HNSW index.
+        self.shard_by = get_shard_by(shard_by)
+        self.shard_collections = {}
+        # Shards other processes create are picked up every CHROMA_SHARD_REFRESH seconds, not per batch
+        self.shard_refresh_interval = float(os.getenv("CHROMA_SHARD_REFRESH", "300"))
+        self._listed_shards = set()
+        self._shards_listed_at = None
+        if self.shard_by:
+            logging.info(f"Sharding ENABLED by '{self.shard_by}' (base: {collection_name}).")
+
+        # Process-wide AIMD window for embedding calls; quota shared across processes (GEMINI_EMBED_RPM)
+        self.rate_control = get_rate_controller()
+
+        # Optional quantized local store (QUANTIZED_STORE=int8|float16), written alongside Chroma
+        self.quantized_store = None
+        quantized_mode = get_quantized_store_mode()
+        if quantized_mode:
+            store_path = os.getenv("QUANTIZED_STORE_PATH", "./vector_store")
+            self.quantized_store = QuantizedVectorStore(store_path, self.embedding_dim, quantized_mode)
+            logging.info(f"Quantized vector store ENABLED ({quantized_mode}) at {store_path}.")
+
+    @property
+    def index_target(self) -> str:
+        """
+        Identifies where and how records are indexed (collection, sharding, embedding width),
+        e.g. "tenders_v1|flat|768". The ingestion ledger keys its entries by it.
+        """
+        return f"{self.collection_name}|{self.shard_by or 'flat'}|{self.embedding_dim}"
+
+    def _get_shard_collection(self, name: str):
+        if name not in self.shard_collections:
+            self.shard_collections[name] = self.client.get_or_create_collection(name=name, metadata={"embedding_dim": self.embedding_dim})
+            check_collection_dimension(self.shard_collections[name], self.embedding_dim)
+        return self.shard_collections[name]
+
+    def reset_shard(self, shard_value: str):
+        """
+        Drops a single shard so it can be rebuilt independently of the others.
+        """
+        name = shard_collection_name(self.collection_name, shard_value)
+        self.shard_collections.pop(name, None)
+        self._listed_shards.discard(name)
+        try:
+            self.client.delete_collection(name=name)
+            logging.info(f"Dropped shard collection {name}.")
+        except Exception as e:
+            logging.warning(f"Could not drop shard {name}: {e}")
+
+    def upsert(self, ids: List[str], embeddings: List[List[float]], metadatas: List[Dict[str, Any]], documents: List[str]):
+        """
+        Upserts records into the flat collection, or into their shard collections when sharding is enabled.
+        Returns how many of the ids were new to the index (lets callers keep a count without count() calls).
+        """
+        with track("indexing", "upsert"):
+            return self._upsert(ids, embeddings, metadatas, documents)
+
+    def _upsert(self, ids: List[str], embeddings: List[List[float]], metadatas: List[Dict[str, Any]], documents: List[str]) -> int:
+        if self.quantized_store:
+            self.quantized_store.add(ids, embeddings)
+
+        if not self.shard_by:
+            new_count = self._count_new(self.collection, ids)
+            self.collection.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+            return new_count
+
+        groups = {}
+        for idx, meta in enumerate(metadatas):
+            groups.setdefault(shard_for_metadata(self.collection_name, meta, self.shard_by), []).append(idx)
+
+        # Ids new to their target shard; records already there have not moved
+        fresh = {}
+        for name, idxs in groups.items():
+            shard_ids = list(dict.fromkeys(ids[i] for i in idxs))
+            existing = set(self._get_shard_collection(name).get(ids=shard_ids, include=[])["ids"])
+            fresh[name] = [i for i in shard_ids if i not in existing]
+
+        # A record whose shard key changed since it was last indexed (e.g. a re-enriched
+        # core_domain) would otherwise stay behind in its old shard as a duplicate.
+        moved = set()
+        for name in self._shard_names() | set(groups):
+            elsewhere = [i for other, new_ids in fresh.items() if other != name for i in new_ids]
+            if not elsewhere:
+                continue
+            collection = self._get_shard_collection(name)
+            stale = collection.get(ids=elsewhere, include=[])["ids"]
+            if stale:
+                collection.delete(ids=stale)
+                moved.update(stale)
+                logging.info(f"Moved {len(stale)} records out of shard {name}.")
+
+        new_count = sum(len(new_ids) for new_ids in fresh.values()) - len(moved)
+        for name, idxs in groups.items():
+            self._get_shard_collection(name).upsert(
+                ids=[ids[i] for i in idxs],
+                embeddings=[embeddings[i] for i in idxs],
+                metadatas=[metadatas[i] for i in idxs],
+                documents=[documents[i] for i in idxs]
+            )
+        return new_count
+
+    def _shard_names(self, refresh: bool = False) -> set:
+        """
+        Names of this collection's shards: the ones this loader opened, plus the server's
+        list (including shards other processes created), re-listed every CHROMA_SHARD_REFRESH seconds.
+        """
+        now = time.monotonic()
+        if refresh or self._shards_listed_at is None or now - self._shards_listed_at > self.shard_refresh_interval:
+            self._listed_shards = set(list_shards(self.client, self.collection_name))
+            self._shards_listed_at = now
+        return self._listed_shards | set(self.shard_collections)
+
+    @staticmethod
+    def _count_new(collection, ids: List[str]) -> int:
+        unique_ids = list(dict.fromkeys(ids))
+        existing = collection.get(ids=unique_ids, include=[])["ids"]
+        return len(unique_ids) - len(existing)
         
     def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
         """
@@ -46,10 +185,17 @@ class ChromaLoader:
             batch = texts[i:i+batch_size]
             try:
                 # Use the working model found: gemini-embedding-001
-                response = self.client_genai.models.embed_content(
-                    model="gemini-embedding-001",
-                    contents=batch,
-                )
+                with track("indexing", "embedding"):
+                    # AIMD window + retry with backoff, shared embed quota (GEMINI_EMBED_RPM)
+                    response = self.rate_control.run_sync(
+                        "embed",
+                        lambda: self.client_genai.models.embed_content(
+                            model=EMBEDDING_MODEL,
+                            contents=batch,
+                            config=embed_config(self.embedding_dim),
+                        ),
+                        embed_requests=1
+                    )
                 
                 # Response structure is different in new SDK
                 # It returns an object with .embeddings attribute which is a list
@@ -61,7 +207,7 @@ class ChromaLoader:
                     
                     # Update: In Python SDK 0.x it was dict. In new SDK it's object.
                     # Let's extract values properly.
-                    batch_embeddings = [e.values for e in response.embeddings]
+                    batch_embeddings = normalize_embeddings([e.values for e in response.embeddings], self.embedding_dim)
                     all_embeddings.extend(batch_embeddings)
                 else:
                     logging.error(f"Empty embeddings response for batch {i}")
@@ -73,104 +219,167 @@ class ChromaLoader:
                 
         return all_embeddings
 
-    def load_from_jsonl(self, jsonl_path: str, batch_size: int = 50):
+    def load_from_jsonl(self, jsonl_path: str, batch_size: int = 50) -> int:
         """
         Reads enriched JSONL and loads into ChromaDB.
+        Returns the number of records newly added to the index.
         """
         if not os.path.exists(jsonl_path):
             logging.error(f"File not found: {jsonl_path}")
-            return
+            return 0
 
         with open(jsonl_path, 'r') as f:
             lines = f.readlines()
             
         total = len(lines)
         logging.info(f"Found {total} records to load into ChromaDB.")
+        new_records = 0
         
         # Process in chunks
         for i in range(0, total, batch_size):
-            chunk_lines = lines[i:i+batch_size]
-            documents = []
-            metadatas = []
-            ids = []
-            
-            for line in chunk_lines:
+            items = []
+            for line in lines[i:i+batch_size]:
                 try:
-                    data = json.loads(line)
-                    
-                    # VALIDATION: Check for failed enrichment
-                    if "error" in data:
-                        logging.warning(f"Skipping record with error: {data.get('error')}")
-                        continue
-                        
-                    # CRITICAL: Use 'signal_summary' + keywords for embedding
-                    signal_text = data.get("signal_summary", "")
-                    keywords = ", ".join(data.get("search_keywords", []))
-                    tags = ", ".join(data.get("project_tags", []))
-                    
-                    # Augmented text for better retrieval
-                    embedding_text = f"{signal_text}. Tags: {tags}. Keywords: {keywords}"
-                    
-                    if not signal_text:
-                        logging.warning(f"Skipping record with empty signal_summary: {data}")
-                        continue
-                        
-                    # Metadata Guardrails
-                    entities = data.get("entities", {})
-                    meta = {
-                        "core_domain": data.get("core_domain", "Unclassified"),
-                        "project_tags": tags,
-                        "procurement_type": data.get("procurement_type", "Unknown"),
-                        "authority_name": entities.get("authority_name", "Unknown"),
-                        "location_city": entities.get("location_city", "Unknown"),
-                        "location_state": entities.get("location_state", "Unknown"),
-                        "country": data.get("Country", "Unknown"),
-                        # Store raw title/desc in metadata for retrieval display
-                        "original_title": data.get("Summary", data.get("Title", ""))[:300],
-                        "original_title": data.get("Summary", data.get("Title", ""))[:300], 
-                        "description": str(data.get("Description") or data.get("signal_summary") or "")[:500],
-                        "closing_date": data.get("Closing_Date", "N/A"),
-                        "url": data.get("Tender_Notice_Document", "#"),
-                        "ref_no": str(data.get("RefNo", hash(signal_text))),
-                        "tot_id": str(data.get("TOT_ID", "N/A")),
-                        "is_corrigendum": "corrigendum" in (data.get("Summary") or data.get("Title", "")).lower()
-                    }
-                    
-                    # Fix Authority Name if Unknown
-                    if meta["authority_name"] in ["Unknown", "N/A"] and data.get("Purchaser_Name"):
-                         # Ensure it is a string
-                         p_name = str(data.get("Purchaser_Name"))
-                         meta["authority_name"] = p_name[:100]
-                    
-                    documents.append(embedding_text)
-                    metadatas.append(meta)
-                    # Unique ID 
-                    ids.append(str(data.get("RefNo", f"hash_{hash(signal_text)}")))
-                    
+                    items.append(json.loads(line))
                 except json.JSONDecodeError:
                     logging.error(f"Failed to decode JSON line: {line[:50]}...")
+
+            for batch in self.embed_records(*self.build_records(items), batch_size=batch_size):
+                # Upsert to Chroma
+                logging.info(f"Upserting {len(batch[0])} records to ChromaDB...")
+                new_records += self.upsert(*batch)
             
-            if not documents:
+        logging.info("ChromaDB loading complete.")
+        return new_records
+
+    def build_records(self, items: List[Dict[str, Any]]) -> Tuple[List[str], List[str], List[Dict[str, Any]]]:
+        """
+        Turns enriched tenders into (ids, documents, metadatas) for indexing.
+        Records whose enrichment failed or that have no signal_summary are skipped.
+        """
+        documents = []
+        metadatas = []
+        ids = []
+        for data in items:
+            # VALIDATION: Check for failed enrichment
+            if "error" in data:
+                logging.warning(f"Skipping record with error: {data.get('error')}")
                 continue
                 
+            # CRITICAL: Use 'signal_summary' + keywords for embedding
+            signal_text = data.get("signal_summary", "")
+            keywords = ", ".join(data.get("search_keywords", []))
+            tags = ", ".join(data.get("project_tags", []))
+            
+            # Augmented text for better retrieval
+            embedding_text = f"{signal_text}. Tags: {tags}. Keywords: {keywords}"
+            
+            if not signal_text:
+                logging.warning(f"Skipping record with empty signal_summary: {data}")
+                continue
+                
+            # Metadata Guardrails
+            entities = data.get("entities", {})
+            meta = {
+                "core_domain": data.get("core_domain", "Unclassified"),
+                "project_tags": tags,
+                "procurement_type": data.get("procurement_type", "Unknown"),
+                "authority_name": entities.get("authority_name", "Unknown"),
+                "location_city": entities.get("location_city", "Unknown"),
+                "location_state": entities.get("location_state", "Unknown"),
+                "country": data.get("Country", "Unknown"),
+                # Store raw title/desc in metadata for retrieval display
+                "original_title": data.get("Summary", data.get("Title", ""))[:300],
+                "original_title": data.get("Summary", data.get("Title", ""))[:300], 
+                "description": str(data.get("Description") or data.get("signal_summary") or "")[:500],
+                "closing_date": data.get("Closing_Date", "N/A"),
+                "url": data.get("Tender_Notice_Document", "#"),
+                "ref_no": str(data.get("RefNo", hash(signal_text))),
+                "tot_id": str(data.get("TOT_ID", "N/A")),
+                "is_corrigendum": is_corrigendum(data.get("Summary") or data.get("Title", ""))
+            }
+            
+            # Fix Authority Name if Unknown
+            if meta["authority_name"] in ["Unknown", "N/A"] and data.get("Purchaser_Name"):
+                 # Ensure it is a string
+                 p_name = str(data.get("Purchaser_Name"))
+                 meta["authority_name"] = p_name[:100]
+            
+            documents.append(embedding_text)
+            metadatas.append(meta)
+            # Unique ID 
+            ids.append(str(data.get("RefNo", f"hash_{hash(signal_text)}")))
+
+        return ids, documents, metadatas
+
+    def fetch_records(self, ids: List[str]) -> Dict[str, Tuple[List[float], Dict[str, Any], str]]:
+        """
+        Indexed records by id as (embedding, metadata, document), from the flat collection or,
+        when sharded, whichever shard holds them. Missing ids are left out.
+        """
+        collections = [self.collection]
+        if self.shard_by:
+            # Rare (corrigenda only) and a missed parent is costly: always re-list
+            collections = [self._get_shard_collection(n) for n in sorted(self._shard_names(refresh=True))]
+
+        found = {}
+        pending = list(dict.fromkeys(ids))
+        for collection in collections:
+            if not pending:
+                break
+            res = collection.get(ids=pending, include=["embeddings", "metadatas", "documents"])
+            for i, record_id in enumerate(res["ids"]):
+                found[record_id] = ([float(x) for x in res["embeddings"][i]], res["metadatas"][i], res["documents"][i])
+            pending = [i for i in pending if i not in found]
+        return found
+
+    def build_child_records(self, linked: List[Tuple[Dict[str, Any], str, Tuple[List[float], Dict[str, Any], str]]]
+                            ) -> Tuple[List[str], List[List[float]], List[Dict[str, Any]], List[str]]:
+        """
+        Corrigenda linked to their parent tender (CorrigendumLinker) as records ready for upsert():
+        the parent's embedding, document and enrichment, with the corrigendum's own title,
+        notice, dates and ids, is_corrigendum=True and parent_id set. No Gemini calls.
+        """
+        ids, embeddings, metadatas, documents = [], [], [], []
+        for row, parent_id, (embedding, parent_meta, document) in linked:
+            meta = dict(parent_meta)
+            meta.update({
+                "original_title": str(row.get("Summary") or row.get("Title") or "")[:300],
+                "description": str(row.get("Description") or parent_meta.get("description", ""))[:500],
+                "closing_date": row.get("Closing_Date") or parent_meta.get("closing_date", "N/A"),
+                "url": row.get("Tender_Notice_Document") or parent_meta.get("url", "#"),
+                "ref_no": str(row.get("RefNo")),
+                "tot_id": str(row.get("TOT_ID", "N/A")),
+                "is_corrigendum": True,
+                "parent_id": parent_id,
+            })
+            ids.append(child_id(row, parent_id))
+            embeddings.append(embedding)
+            metadatas.append(meta)
+            documents.append(document)
+        return ids, embeddings, metadatas, documents
+
+    def embed_records(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]],
+                      batch_size: int = 50, failures: List[Tuple[List[str], str]] = None
+                      ) -> List[Tuple[List[str], List[List[float]], List[Dict[str, Any]], List[str]]]:
+        """
+        Embeds records in batches. Returns (ids, embeddings, metadatas, documents) per batch, ready for upsert().
+        A batch whose embedding call fails is logged and skipped (and appended to `failures` as (ids, error)).
+        """
+        batches = []
+        for i in range(0, len(documents), batch_size):
+            batch_docs = documents[i:i+batch_size]
             # Generate Embeddings
-            logging.info(f"Embedding batch {i} to {i+len(documents)}...")
+            logging.info(f"Embedding batch {i} to {i+len(batch_docs)}...")
             try:
-                embeddings = self.generate_embeddings(documents)
+                embeddings = self.generate_embeddings(batch_docs)
             except Exception as e:
                 logging.error(f"Skipping batch due to embedding error: {e}")
+                if failures is not None:
+                    failures.append((ids[i:i+batch_size], str(e)))
                 continue
-            
-            # Upsert to Chroma
-            logging.info(f"Upserting {len(documents)} records to ChromaDB...")
-            self.collection.upsert(
-                ids=ids,
-                embeddings=embeddings,
-                metadatas=metadatas,
-                documents=documents
-            )
-            
-        logging.info("ChromaDB loading complete.")
+            batches.append((ids[i:i+batch_size], embeddings, metadatas[i:i+batch_size], batch_docs))
+        return batches
         
 if __name__ == "__main__":
     # Mock Test
@@ -0,0 +1,86 @@
+import os
+import logging
+from typing import Iterable, List, Optional
+import numpy as np
+from google.genai import types
+
+# Shared embedding settings. The loader and the search engine MUST agree on these,
+# otherwise query vectors and stored vectors live in different spaces.
+EMBEDDING_MODEL = "gemini-embedding-001"
+DEFAULT_EMBEDDING_DIM = 768
+
+
+def get_output_dimensionality(value: Optional[int] = None, existing: Optional[int] = None) -> int:
+    """
+    Resolves the embedding width. Explicit argument wins, then EMBEDDING_DIM env var, then
+    `existing` (the width the collection was already built with, see existing_dimension),
+    then 768 for a new collection. An index built at another width keeps working until it
+    is rebuilt (scripts/rebuild_collection.py).
+    """
+    dim = int(value or os.getenv("EMBEDDING_DIM") or existing or DEFAULT_EMBEDDING_DIM)
+    if dim <= 0:
+        raise ValueError(f"Invalid embedding dimensionality: {dim}")
+    return dim
+
+
+def embed_config(dim: int) -> types.EmbedContentConfig:
+    return types.EmbedContentConfig(output_dimensionality=dim)
+
+
+def normalize_embeddings(vectors: List[List[float]], dim: int) -> List[List[float]]:
+    """
+    Validates the width and L2-normalizes vectors.
+    gemini-embedding-001 only returns unit vectors at full width (3072); truncated
+    outputs must be re-normalized so distances stay comparable (and the score calibration holds).
+    """
+    arr = np.asarray(vectors, dtype=np.float32)
+    if arr.ndim != 2 or arr.shape[1] != dim:
+        raise ValueError(f"Embedding dimension mismatch: expected {dim}, got {arr.shape[-1] if arr.ndim else 0}")
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (arr / norms).tolist()
+
+
+def collection_dimension(collection) -> Optional[int]:
+    """
+    Width of the vectors in a collection: recorded in its metadata when it was created;
+    collections built before that are measured on a stored vector. None when empty.
+    """
+    stored = (collection.metadata or {}).get("embedding_dim")
+    if stored is not None:
+        return int(stored)
+    sample = collection.get(limit=1, include=["embeddings"])
+    embeddings = sample.get("embeddings")
+    if embeddings is None or not len(embeddings):
+        return None
+    logging.info(f"Collection {collection.name} has no recorded embedding_dim; its vectors are {len(embeddings[0])}-dim.")
+    return len(embeddings[0])
+
+
+def existing_dimension(client, names: Iterable[str]) -> Optional[int]:
+    """
+    Width of the first of the named collections (base collection, then its shards) that exists
+    and holds vectors, or None.
+    """
+    for name in names:
+        try:
+            dim = collection_dimension(client.get_collection(name))
+        except Exception:
+            continue  # Does not exist (yet)
+        if dim is not None:
+            return dim
+    return None
+
+
+def check_collection_dimension(collection, dim: int):
+    """
+    Refuses to mix embedding widths in one collection (see collection_dimension).
+    """
+    stored = collection_dimension(collection)
+    if stored is None:
+        return  # Empty: the first upsert sets the width
+    if stored != dim:
+        raise ValueError(
+            f"Collection {collection.name} was built with {stored}-dim embeddings, "
+            f"but EMBEDDING_DIM is {dim}. Rebuild the collection or fix the setting."
+        )
@@ -0,0 +1,218 @@
+import os
+import json
+import fcntl
+import logging
+from contextlib import contextmanager
+from typing import Iterable, List, Tuple, Optional
+import numpy as np
+
+SUPPORTED_DTYPES = ("int8", "float16")
+
+
+def get_quantized_store_mode(mode: Optional[str] = None) -> Optional[str]:
+    """
+    Resolves QUANTIZED_STORE (int8 | float16). Returns None when disabled.
+    """
+    value = (mode if mode is not None else os.getenv("QUANTIZED_STORE", "")).strip().lower()
+    if not value or value == "none":
+        return None
+    if value not in SUPPORTED_DTYPES:
+        raise ValueError(f"Unsupported quantized store dtype: {value}. Use one of {SUPPORTED_DTYPES}")
+    return value
+
+
+class QuantizedVectorStore:
+    """
+    Local, append-only store of quantized vectors for candidate generation. It keeps codes
+    only (int8: 1 byte per dimension plus a scale per row; float16: 2 bytes per dimension),
+    no float copy: callers re-score the candidates exactly against Chroma's own vectors.
+
+    Layout (inside `path`):
+        meta.json    - {"dim": 768, "dtype": "int8"}
+        records.bin  - fixed-size records (codes + float32 scale), one per row (kept in RAM)
+        ids.txt      - one id per row; written LAST
+        .lock        - appends hold an exclusive flock on it, so concurrent writers never interleave
+
+    A crash between the two writes leaves records without ids: readers only read as many
+    records as there are ids, and the next writer truncates the orphans before appending.
+    Re-upserting an id appends a new row; the older row is masked out.
+    Vectors are expected to be L2-normalized; distances are squared L2 (Chroma's default space).
+    """
+
+    def __init__(self, path: str, dim: int, dtype: str = "int8"):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported quantized store dtype: {dtype}")
+        self.path = path
+        self.dim = dim
+        self.dtype = dtype
+        os.makedirs(path, exist_ok=True)
+
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            if meta.get("dim") != dim or meta.get("dtype") != dtype:
+                raise ValueError(f"Quantized store at {path} is {meta}, requested dim={dim}, dtype={dtype}")
+        else:
+            with open(meta_path, 'w') as f:
+                json.dump({"dim": dim, "dtype": dtype}, f)
+
+        self._ids_path = os.path.join(path, "ids.txt")
+        self._records_path = os.path.join(path, "records.bin")
+        self._lock_path = os.path.join(path, ".lock")
+        self._record = np.dtype([("code", self._code_dtype, (dim,)), ("scale", np.float32)])
+        with self._locked():
+            self._migrate_split_files()
+            self._drop_partial_append()
+        self._loaded_size = -1
+        self._load()
+
+    @property
+    def _code_dtype(self):
+        return np.int8 if self.dtype == "int8" else np.float16
+
+    @contextmanager
+    def _locked(self):
+        with open(self._lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_ids(self) -> List[str]:
+        """
+        Complete lines of ids.txt (a half-written last line is not an id).
+        """
+        if not os.path.exists(self._ids_path):
+            return []
+        with open(self._ids_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        return text[:text.rfind("\n") + 1].splitlines()
+
+    def _drop_partial_append(self):
+        """
+        Caller holds the lock. Cuts ids.txt back to its last complete line and records.bin
+        back to one record per id, removing what an interrupted append left behind.
+        """
+        ids = self._read_ids()
+        if os.path.exists(self._ids_path):
+            complete = len("".join(f"{i}\n" for i in ids).encode("utf-8"))
+            if os.path.getsize(self._ids_path) > complete:
+                os.truncate(self._ids_path, complete)
+        expected = len(ids) * self._record.itemsize
+        if os.path.exists(self._records_path) and os.path.getsize(self._records_path) > expected:
+            logging.warning(f"Quantized store at {self.path}: dropping rows of an interrupted append.")
+            os.truncate(self._records_path, expected)
+
+    def _migrate_split_files(self):
+        """
+        Caller holds the lock. Converts stores written as codes.bin/scales.bin/full.bin into records.bin.
+        """
+        codes_path = os.path.join(self.path, "codes.bin")
+        if not os.path.exists(codes_path) or os.path.exists(self._records_path):
+            return
+        n = len(self._read_ids())
+        records = np.zeros(n, dtype=self._record)
+        records["code"] = np.fromfile(codes_path, dtype=self._code_dtype, count=n * self.dim).reshape(n, self.dim)
+        scales_path = os.path.join(self.path, "scales.bin")
+        records["scale"] = np.fromfile(scales_path, dtype=np.float32, count=n) if self.dtype == "int8" else 1.0
+        records.tofile(self._records_path + ".tmp")
+        os.replace(self._records_path + ".tmp", self._records_path)
+        for name in ("codes.bin", "scales.bin", "full.bin"):
+            if os.path.exists(os.path.join(self.path, name)):
+                os.remove(os.path.join(self.path, name))
+        logging.info(f"Quantized store at {self.path} converted to a single record file ({n} rows).")
+
+    def _load(self):
+        """
+        (Re)loads the store from disk. Cheap no-op when nothing was appended since the last load.
+        """
+        size = os.path.getsize(self._ids_path) if os.path.exists(self._ids_path) else 0
+        if size == self._loaded_size:
+            return
+        self._loaded_size = size
+
+        ids = self._read_ids()
+        n = len(ids)
+        # Only as many records as there are ids: rows of an append in progress are not visible yet
+        records = np.fromfile(self._records_path, dtype=self._record, count=n) if n else np.zeros(0, dtype=self._record)
+        if len(records) < n:
+            raise ValueError(f"Quantized store at {self.path} has {n} ids but {len(records)} records")
+
+        self.ids = ids
+        self.codes = records["code"]
+        self.scales = records["scale"]
+
+        # Latest row wins for duplicated ids
+        latest = {}
+        for row, tender_id in enumerate(ids):
+            latest[tender_id] = row
+        self.rows = latest
+        self.live = np.zeros(n, dtype=bool)
+        if latest:
+            self.live[list(latest.values())] = True
+        logging.info(f"Quantized store loaded: {len(latest)} live vectors ({n} rows, {self.dtype}).")
+
+    def quantize(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if self.dtype == "float16":
+            return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def add(self, ids: List[str], embeddings: List[List[float]]):
+        """
+        Appends vectors under the store's lock: records first, then ids, so readers never
+        see an id without its record.
+        """
+        if not ids:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.shape != (len(ids), self.dim):
+            raise ValueError(f"Expected {len(ids)}x{self.dim} vectors, got {vectors.shape}")
+
+        records = np.zeros(len(ids), dtype=self._record)
+        records["code"], records["scale"] = self.quantize(vectors)
+        with self._locked():
+            self._drop_partial_append()
+            with open(self._records_path, 'ab') as f:
+                f.write(records.tobytes())
+            with open(self._ids_path, 'a', encoding='utf-8') as f:
+                f.write("".join(f"{i}\n" for i in ids))
+        # No reload here: writers (ingestion) never search, readers reload lazily in search()
+
+    def search(self, query: List[float], k: int, block_size: int = 65536,
+               within: Optional[Iterable[str]] = None) -> Tuple[List[str], List[float]]:
+        """
+        Approximate scan over the quantized codes. `within` restricts the search to those ids
+        (e.g. the ones matching a metadata filter). Returns the k best (ids, approximate
+        squared L2 distances) in ascending order; ask for more than you need and re-score
+        them exactly (see SmartSearchEngine._query_quantized).
+        """
+        self._load()
+        n = len(self.ids)
+        if n == 0 or k <= 0:
+            return [], []
+
+        allowed = self.live
+        if within is not None:
+            allowed = np.zeros(n, dtype=bool)
+            allowed[[self.rows[i] for i in set(within) if i in self.rows]] = True
+
+        q = np.asarray(query, dtype=np.float32)
+        approx = np.empty(n, dtype=np.float32)
+        for start in range(0, n, block_size):
+            block = self.codes[start:start + block_size].astype(np.float32)
+            approx[start:start + block_size] = (block @ q) * self.scales[start:start + block_size]
+        approx[~allowed] = -np.inf
+
+        live_count = int(allowed.sum())
+        if live_count == 0:
+            return [], []
+        n_cand = min(live_count, k)
+        cand = np.argpartition(-approx, n_cand - 1)[:n_cand]
+        dists = np.maximum(2.0 - 2.0 * approx[cand], 0.0)
+        order = np.argsort(dists)
+        return [self.ids[cand[i]] for i in order], [float(dists[i]) for i in order]
@@ -0,0 +1,83 @@
+import os
+import re
+from typing import List, Dict, Any, Optional
+
+# Shard key (CHROMA_SHARD_BY value) -> metadata field used for routing
+SHARD_FIELDS = {
+    "domain": "core_domain",
+    "country": "country",
+}
+
+SHARD_SEPARATOR = "__"
+
+
+def get_shard_by(shard_by: Optional[str] = None) -> Optional[str]:
+    """
+    Resolves the sharding mode. Explicit argument wins, then CHROMA_SHARD_BY env var.
+    Returns None when sharding is disabled (single flat collection).
+    """
+    value = shard_by if shard_by is not None else os.getenv("CHROMA_SHARD_BY", "")
+    value = (value or "").strip().lower()
+    if not value or value == "none":
+        return None
+    if value not in SHARD_FIELDS:
+        raise ValueError(f"Unsupported shard key: {value}. Use one of {list(SHARD_FIELDS)}")
+    return value
+
+
+def shard_collection_name(base_name: str, shard_value: Any) -> str:
+    """
+    Builds a Chroma-safe collection name for a shard, e.g. tenders_v1__healthcare.
+    """
+    slug = re.sub(r'[^a-z0-9]+', '_', str(shard_value or "").lower()).strip('_')
+    return f"{base_name}{SHARD_SEPARATOR}{slug or 'unknown'}"
+
+
+def shard_for_metadata(base_name: str, meta: Dict[str, Any], shard_by: str) -> str:
+    """
+    Returns the shard collection name a record belongs to.
+    """
+    return shard_collection_name(base_name, meta.get(SHARD_FIELDS[shard_by]))
+
+
+def is_shard_of(base_name: str, collection_name: str) -> bool:
+    return collection_name.startswith(f"{base_name}{SHARD_SEPARATOR}")
+
+
+def merge_query_results(results: List[Dict[str, Any]], k: int) -> Dict[str, Any]:
+    """
+    Merges several Chroma query results (one per shard) into a single result
+    in the same [[...]] shape, ordered by ascending distance and cut to k.
+    """
+    keys = ["ids", "metadatas", "documents", "distances", "embeddings"]
+    rows = []
+    for res in results:
+        if not res or not res.get("ids"):
+            continue
+        ids = res["ids"][0]
+        for i in range(len(ids)):
+            row = {}
+            for key in keys:
+                column = res.get(key)
+                if column is not None and len(column) and column[0] is not None:
+                    row[key] = column[0][i]
+            rows.append(row)
+
+    rows.sort(key=lambda r: r.get("distances", float("inf")))
+    rows = rows[:k]
+
+    merged = {"ids": [[r["ids"] for r in rows]]}
+    for key in keys[1:]:
+        if any(key in r for r in rows):
+            merged[key] = [[r.get(key) for r in rows]]
+        elif any(res and res.get(key) is not None for res in results):
+            merged[key] = [[]]
+    return merged
+
+
+def list_shards(client, base_name: str) -> List[str]:
+    """
+    Names of `base_name`'s shard collections on the Chroma server (including ones other processes created).
+    """
+    names = [getattr(c, "name", c) for c in client.list_collections()]
+    return sorted(n for n in names if is_shard_of(base_name, n))
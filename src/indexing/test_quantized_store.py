@@ -0,0 +1,166 @@
+import os
+import asyncio
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from src.indexing.quantized_store import QuantizedVectorStore
+from src.indexing.embeddings import normalize_embeddings, check_collection_dimension
+
+def _append_in_batches(path, dim, ids, vectors):
+    store = QuantizedVectorStore(path, dim, "int8")
+    for start in range(0, len(ids), 7):
+        store.add(ids[start:start + 7], vectors[start:start + 7])
+
+class TestQuantizedStore(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.dim = 32
+        self.vectors = normalize_embeddings(rng.normal(size=(200, self.dim)).tolist(), self.dim)
+        self.ids = [f"T{i}" for i in range(200)]
+
+    def _exact_top(self, query, k):
+        dists = 2.0 - 2.0 * (np.asarray(self.vectors) @ np.asarray(query))
+        return [self.ids[i] for i in np.argsort(dists)[:k]]
+
+    def test_candidates_contain_exact_top(self):
+        for dtype in ("int8", "float16"):
+            with self.subTest(dtype=dtype), tempfile.TemporaryDirectory() as tmp:
+                store = QuantizedVectorStore(tmp, self.dim, dtype)
+                store.add(self.ids, self.vectors)
+
+                query = self.vectors[42]
+                ids, dists = store.search(query, k=25)
+
+                self.assertTrue(set(self._exact_top(query, 5)) <= set(ids))
+                self.assertEqual(ids[0], "T42")
+                self.assertEqual(dists, sorted(dists))
+
+    def test_interrupted_append_is_dropped(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = QuantizedVectorStore(tmp, self.dim, "int8")
+            store.add(self.ids[:10], self.vectors[:10])
+            # Crash after the records were written but before (part of) their ids
+            with open(os.path.join(tmp, "records.bin"), "ab") as f:
+                f.write(b"\0" * store._record.itemsize * 3)
+            with open(os.path.join(tmp, "ids.txt"), "a") as f:
+                f.write("T1")
+
+            self.assertEqual(len(QuantizedVectorStore(tmp, self.dim, "int8").ids), 10)
+            store.add(self.ids[10:20], self.vectors[10:20])
+            reopened = QuantizedVectorStore(tmp, self.dim, "int8")
+            self.assertEqual(reopened.ids, self.ids[:20])
+            self.assertEqual(reopened.search(self.vectors[15], k=1)[0], ["T15"])
+
+    def test_concurrent_writers_stay_aligned(self):
+        import multiprocessing
+
+        with tempfile.TemporaryDirectory() as tmp:
+            QuantizedVectorStore(tmp, self.dim, "int8")
+            halves = [(tmp, self.dim, self.ids[i::2], self.vectors[i::2]) for i in (0, 1)]
+            with multiprocessing.get_context("fork").Pool(2) as pool:
+                pool.starmap(_append_in_batches, halves)
+
+            store = QuantizedVectorStore(tmp, self.dim, "int8")
+            self.assertEqual(sorted(store.ids), sorted(self.ids))
+            for i in (0, 57, 199):
+                self.assertEqual(store.search(self.vectors[i], k=1)[0], [f"T{i}"])
+
+    def test_legacy_split_files_are_converted(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = QuantizedVectorStore(tmp, self.dim, "int8")
+            codes, scales = store.quantize(np.asarray(self.vectors, dtype=np.float32))
+            codes.tofile(os.path.join(tmp, "codes.bin"))
+            scales.tofile(os.path.join(tmp, "scales.bin"))
+            with open(os.path.join(tmp, "ids.txt"), "w") as f:
+                f.write("".join(f"{i}\n" for i in self.ids))
+
+            store = QuantizedVectorStore(tmp, self.dim, "int8")
+            self.assertFalse(os.path.exists(os.path.join(tmp, "codes.bin")))
+            self.assertEqual(store.search(self.vectors[3], k=1)[0], ["T3"])
+
+    def test_reupsert_masks_old_row(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = QuantizedVectorStore(tmp, self.dim, "int8")
+            store.add(self.ids, self.vectors)
+            # Move T0 onto T1's vector
+            store.add(["T0"], [self.vectors[1]])
+
+            ids, _ = store.search(self.vectors[0], k=3)
+            self.assertNotIn("T0", ids[:1])
+            ids, _ = store.search(self.vectors[1], k=2)
+            self.assertEqual(set(ids), {"T0", "T1"})
+
+    def test_dimension_guard(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            QuantizedVectorStore(tmp, self.dim, "int8")
+            with self.assertRaises(ValueError):
+                QuantizedVectorStore(tmp, 768, "int8")
+        with self.assertRaises(ValueError):
+            normalize_embeddings([[0.1, 0.2]], 768)
+
+    def test_dimension_guard_without_recorded_width(self):
+        legacy = mock.Mock(metadata=None)
+        legacy.name = "tenders_v1"
+        legacy.get.return_value = {"ids": ["T1"], "embeddings": np.zeros((1, 3072))}
+        with self.assertRaises(ValueError):
+            check_collection_dimension(legacy, 768)
+        check_collection_dimension(legacy, 3072)
+
+        legacy.get.return_value = {"ids": [], "embeddings": []}
+        check_collection_dimension(legacy, 768)
+
+    def test_width_defaults_to_existing_collection(self):
+        import chromadb
+        from src.search.engine import SmartSearchEngine
+
+        with tempfile.TemporaryDirectory() as tmp:
+            # Built before widths were recorded, at a width other than the 768 default
+            chromadb.PersistentClient(path=tmp).get_or_create_collection("tenders_v1").add(
+                ids=["T1"], embeddings=[self.vectors[0]])
+            env = {"GEMINI_API_KEY": "test", "CHROMA_SHARD_BY": "", "QUANTIZED_STORE": ""}
+            with mock.patch.dict(os.environ, env):
+                os.environ.pop("EMBEDDING_DIM", None)
+                self.assertEqual(SmartSearchEngine(persist_directory=tmp).embedding_dim, self.dim)
+                with self.assertRaises(ValueError):
+                    SmartSearchEngine(persist_directory=tmp, output_dimensionality=768)
+
+    def test_search_within_ids(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = QuantizedVectorStore(tmp, self.dim, "int8")
+            store.add(self.ids, self.vectors)
+            ids, _ = store.search(self.vectors[0], k=3, within={"T5", "T9", "missing"})
+            self.assertEqual(set(ids), {"T5", "T9"})
+            self.assertEqual(store.search(self.vectors[0], k=3, within=set()), ([], []))
+
+    def test_filtered_query_fills_results(self):
+        from src.search import engine as engine_module
+
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {"GEMINI_API_KEY": "test", "QUANTIZED_STORE": "int8",
+                   "QUANTIZED_STORE_PATH": os.path.join(tmp, "store"), "CHROMA_SHARD_BY": ""}
+            with mock.patch.dict(os.environ, env):
+                engine = engine_module.SmartSearchEngine(persist_directory=tmp, output_dimensionality=self.dim)
+            # Only the two records farthest from the query match the filter
+            query = self.vectors[0]
+            far = self._exact_top([-x for x in query], 2)
+            metas = [{"core_domain": "Energy" if i in far else "Healthcare"} for i in self.ids]
+            engine.collection.add(ids=self.ids, embeddings=self.vectors, metadatas=metas, documents=self.ids)
+            engine.quantized_store.add(self.ids, self.vectors)
+
+            engine.quantized_oversample = 1
+            for limit in (5000, 10):
+                with self.subTest(max_candidates=limit), mock.patch.object(engine_module, "QUANTIZED_MAX_CANDIDATES", limit):
+                    res = asyncio.run(engine._query_quantized(query, 5, {"core_domain": "Energy"}, [engine.collection]))
+                    self.assertEqual(set(res["ids"][0]), set(far))
+                    self.assertEqual(res["metadatas"][0][0], {"core_domain": "Energy"})
+
+            # Unfiltered: exact ranking and distances, re-scored against Chroma's vectors
+            res = asyncio.run(engine._query_quantized(query, 5, None, [engine.collection]))
+            self.assertEqual(res["ids"][0], self._exact_top(query, 5))
+            exact = engine.collection.query(query_embeddings=[query], n_results=5)
+            np.testing.assert_allclose(res["distances"][0], exact["distances"][0], atol=1e-4)
+
+if __name__ == '__main__':
+    unittest.main()
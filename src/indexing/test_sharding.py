@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from src.indexing.sharding import get_shard_by, shard_collection_name, merge_query_results
+
+class TestSharding(unittest.TestCase):
+
+    def test_shard_names(self):
+        self.assertEqual(shard_collection_name("tenders_v1", "Healthcare"), "tenders_v1__healthcare")
+        self.assertEqual(shard_collection_name("tenders_v1", "United States"), "tenders_v1__united_states")
+        self.assertEqual(shard_collection_name("tenders_v1", None), "tenders_v1__unknown")
+
+    def test_shard_mode(self):
+        self.assertIsNone(get_shard_by("none"))
+        self.assertEqual(get_shard_by("Domain"), "domain")
+        with self.assertRaises(ValueError):
+            get_shard_by("city")
+
+    def test_merge_by_distance(self):
+        a = {"ids": [["a1", "a2"]], "distances": [[0.3, 0.9]], "metadatas": [[{"s": "a"}, {"s": "a"}]]}
+        b = {"ids": [["b1"]], "distances": [[0.5]], "metadatas": [[{"s": "b"}]]}
+        merged = merge_query_results([a, b], k=2)
+
+        self.assertEqual(merged["ids"], [["a1", "b1"]])
+        self.assertEqual(merged["distances"], [[0.3, 0.5]])
+        self.assertEqual(merged["metadatas"][0][1], {"s": "b"})
+
+    def test_shards_follow_ingestion(self):
+        from src.indexing.chroma_loader import ChromaLoader
+        from src.search import engine as engine_module
+
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        with mock.patch.dict(os.environ, {"GEMINI_API_KEY": "test", "QUANTIZED_STORE": ""}):
+            loader = ChromaLoader(persist_directory=tmp, shard_by="domain", output_dimensionality=4)
+            engine = engine_module.SmartSearchEngine(persist_directory=tmp, shard_by="domain", output_dimensionality=4)
+        self.assertEqual(engine.count(), 0)
+
+        vec = [[1.0, 0.0, 0.0, 0.0]]
+        self.assertEqual(loader.upsert(["t1"], vec, [{"core_domain": "Healthcare"}], ["doc"]), 1)
+        # Re-enriched into another domain: moved, not duplicated (and not counted as new)
+        self.assertEqual(loader.upsert(["t1"], vec, [{"core_domain": "Energy"}], ["doc"]), 0)
+        self.assertEqual(loader._get_shard_collection("tenders_v1__healthcare").count(), 0)
+
+        # Unchanged records probe no other shard, and the shard list is not re-read per batch
+        with mock.patch.object(loader.client, "list_collections", wraps=loader.client.list_collections) as listing, \
+             mock.patch.object(loader._get_shard_collection("tenders_v1__healthcare"), "get") as probe:
+            self.assertEqual(loader.upsert(["t1"], vec, [{"core_domain": "Energy"}], ["doc"]), 0)
+        listing.assert_not_called()
+        probe.assert_not_called()
+
+        # The running engine picks up shards created after it started
+        with mock.patch.object(engine_module, "SHARD_MISS_REFRESH", 0.0):
+            targets = engine._target_collections(["Energy"])
+        self.assertEqual([c.name for c in targets], ["tenders_v1__energy"])
+        self.assertEqual(engine.count(), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import sys
 import os
 from src.ingestion.pipeline import IngestionPipeline
+from src.ingestion.sharded import ShardedIngestion, get_process_count
 
 # Default Configuration
 DEFAULT_CSV = "tender_dataset_06082025_6Jan2026.csv"
@@ -16,6 +17,10 @@ def main():
     parser.add_argument("--api-key", help="Gemini API Key (overrides env var)", default=None)
     parser.add_argument("--offset", type=int, default=START_OFFSET, help="Start offset")
     parser.add_argument("--limit", type=int, default=TOTAL_RECORDS, help="Total records to process")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="Worker processes, each ingesting a record range (default INGEST_PROCESSES or 1)")
+    parser.add_argument("--full", action="store_true",
+                        help="Re-enrich every record, ignoring the ingestion ledger")
     
     args = parser.parse_args()
     
@@ -26,13 +31,26 @@ def main():
         
     print(f"Initializing Ingestion Pipeline for {args.input_file}...")
     
-    pipeline = IngestionPipeline(
-        input_file=args.input_file,
-        api_key=args.api_key,
-        total_records=args.limit,
-        start_offset=args.offset,
-        chunk_size=500
-    )
+    if get_process_count(args.processes) > 1:
+        # Same [offset, limit) window, split into ranges across processes sharing one rate limiter
+        pipeline = ShardedIngestion(
+            input_file=args.input_file,
+            processes=args.processes,
+            api_key=args.api_key,
+            start_offset=args.offset,
+            end_offset=args.limit,
+            chunk_size=500,
+            incremental=not args.full
+        )
+    else:
+        pipeline = IngestionPipeline(
+            input_file=args.input_file,
+            api_key=args.api_key,
+            total_records=args.limit,
+            start_offset=args.offset,
+            chunk_size=500,
+            incremental=not args.full
+        )
     
     try:
         asyncio.run(pipeline.run())
@@ -0,0 +1,146 @@
+import os
+import re
+import difflib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from src.ingestion.ledger import IngestionLedger, title_key
+from src.monitoring.metrics import REGISTRY
+
+CORRIGENDA = REGISTRY.counter(
+    "tenders_corrigenda_total",
+    "Corrigenda seen at ingestion: linked to an indexed parent (no LLM/embedding calls) or enriched as new.",
+    ("result",),
+)
+
+_CORRIGENDUM = re.compile(
+    r"\b(corrigend(um|a)|addend(um|a)|amendment|date extension|extension of (the )?(due|closing|bid|submission) date)\b",
+    re.IGNORECASE,
+)
+# "Corrigendum 2 to", "Addendum No. 1 -", "Date Extension:" ... at the start of a title
+_PREFIX = re.compile(
+    r"^\W*(((corrigend(um|a)|addend(um|a)|amendment)(\s*(no\.?|#)?\s*\d+)?)|date extension)\W*((to|for|of|in|on|against)\b\W*)?",
+    re.IGNORECASE,
+)
+# Explicitly labelled references only ("Ref No: X", "NIT No. X", "Tender ID - X", "Bid #X"): bare
+# numbers in the text are more often dates, amounts or quantities than a parent's reference
+_REF_MENTION = re.compile(
+    r"\b(?:ref(?:erence)?|nit|tender|bid)\s*(?:(?:no|number|id)\b\.?\s*[:#-]?|[:#])\s*"
+    r"([A-Za-z0-9][\w/.-]*\d[\w/.-]*)",
+    re.IGNORECASE,
+)
+
+# Titles shorter than this (normalized) are too generic to link by title
+MIN_TITLE_LENGTH = 15
+
+
+def is_corrigendum(title: Any) -> bool:
+    return bool(_CORRIGENDUM.search(str(title or "")))
+
+
+def parent_title(title: Any) -> str:
+    """
+    The original notice's title as a corrigendum usually repeats it ("Corrigendum 1 to <title>").
+    """
+    return _PREFIX.sub("", str(title or "")).strip()
+
+
+def mentioned_refs(text: Any) -> List[str]:
+    """
+    Reference numbers quoted with an explicit label in `text` ("... against NIT No. NIT/2024/117").
+    """
+    return [ref.rstrip("./-") for ref in _REF_MENTION.findall(str(text or ""))]
+
+
+def child_id(row: Dict[str, Any], parent_id: str) -> str:
+    """
+    Index id of a linked corrigendum: its own RefNo, unless it reuses the parent's.
+    """
+    own = str(row.get("RefNo"))
+    if own != parent_id:
+        return own
+    suffix = row.get("TOT_ID") if row.get("TOT_ID") is not None else row.get("DedupHash")
+    return f"{parent_id}#corrigendum-{suffix}"
+
+
+class CorrigendumLinker:
+    """
+    Finds corrigenda in cleaned rows and resolves the already indexed tender they amend:
+    by reference number (the row's RefNo or a labelled "Ref/NIT/Tender No" in its title or
+    description), else by an exact or fuzzy match of the title without its "Corrigendum ... to"
+    prefix, all against the ingestion ledger. A title match also needs the same purchaser
+    (Purchaser_Name) or location (Location): titles like "Supply of Laptops" recur across
+    buyers. Linked corrigenda are stored as child records that reuse the parent's enrichment
+    and embedding (ChromaLoader.build_child_records).
+
+    CORRIGENDUM_TITLE_MATCH sets the fuzzy title similarity needed (0..1, default 0.85);
+    CORRIGENDUM_LINKING=0 disables linking.
+    """
+
+    def __init__(self, ledger: IngestionLedger, loader: Any, title_threshold: float = None):
+        self.ledger = ledger
+        self.loader = loader
+        self.title_threshold = title_threshold or float(os.getenv("CORRIGENDUM_TITLE_MATCH", "0.85"))
+
+    def resolve_parent(self, row: Dict[str, Any]) -> Optional[str]:
+        """
+        Index id of the tender a corrigendum row amends, or None (not a corrigendum / no parent found).
+        """
+        title = str(row.get("Summary") or row.get("Title") or "")
+        if not is_corrigendum(title):
+            return None
+        # Never the row's own earlier version
+        entry = IngestionLedger.entry_for(row)
+        own_key, purchaser, location = entry[0], entry[6], entry[7]
+
+        text = title + " " + str(row.get("Description") or "")
+        refs = [str(row.get("RefNo"))] + mentioned_refs(text)
+        known = self.ledger.known_index_ids(refs, exclude_key=own_key)
+        if known:
+            return known[0]
+
+        key = title_key(parent_title(title))
+        if len(key) < MIN_TITLE_LENGTH or is_corrigendum(key):
+            return None
+        if not (purchaser or location):
+            return None  # Nothing to confirm a title match with
+
+        def same_buyer(candidate_purchaser: str, candidate_location: str) -> bool:
+            return bool((purchaser and purchaser == candidate_purchaser) or
+                        (location and location == candidate_location))
+
+        exact = [i for i, _, p, l in self.ledger.titles_matching(key, exclude_key=own_key) if same_buyer(p, l)]
+        if exact:
+            return exact[0]
+
+        # Fuzzy: candidates sharing the title's most distinctive (longest) word
+        word = max(key.split(), key=len)
+        best, best_ratio = None, self.title_threshold
+        for index_id, candidate, p, l in self.ledger.titles_matching(key, word=word, exclude_key=own_key):
+            if is_corrigendum(candidate) or not same_buyer(p, l):
+                continue
+            ratio = difflib.SequenceMatcher(None, key, candidate).ratio()
+            if ratio >= best_ratio:
+                best, best_ratio = index_id, ratio
+        return best
+
+    def link(self, rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], str, Tuple]]]:
+        """
+        Splits rows into (rows to enrich, linked corrigenda as (row, parent_id, parent record)).
+        A corrigendum whose parent cannot be fetched from the index is enriched like any tender.
+        """
+        resolved = [(row, self.resolve_parent(row)) for row in rows]
+        parent_ids = [p for _, p in resolved if p]
+        parents = self.loader.fetch_records(parent_ids) if parent_ids else {}
+
+        regular, linked = [], []
+        for row, parent_id in resolved:
+            if parent_id and parent_id in parents:
+                linked.append((row, parent_id, parents[parent_id]))
+            else:
+                regular.append(row)
+                if is_corrigendum(row.get("Summary") or row.get("Title")):
+                    CORRIGENDA.inc(result="unlinked")
+        if linked:
+            CORRIGENDA.inc(len(linked), result="linked")
+            logging.info(f"Linked {len(linked)} corrigenda to their parent tenders (no enrichment needed)")
+        return regular, linked
@@ -0,0 +1,110 @@
+import io
+import logging
+from typing import List, Dict, Any, Iterator, Optional, BinaryIO
+import pandas as pd
+from src.ingestion.streaming import scan_quote_state
+
+
+class CSVChunk:
+    """
+    One chunk of parsed records plus its position in the file.
+    `end_byte` is the offset right after the chunk's last record (a resumable checkpoint).
+    """
+
+    def __init__(self, records: List[Dict[str, Any]], start_row: int, end_row: int, end_byte: int):
+        self.records = records
+        self.start_row = start_row
+        self.end_row = end_row
+        self.end_byte = end_byte
+
+    def __len__(self):
+        return self.end_row - self.start_row
+
+
+class CSVRecordSource:
+    """
+    Single-pass CSV reader: opens the file once and yields chunks of records.
+
+    Record boundaries are found on raw bytes (quote-aware, so multi-line fields stay
+    whole); each chunk's bytes are then parsed by pandas with the header prepended,
+    giving exactly the rows/dtypes the old per-chunk read_csv produced, without
+    re-scanning the rows before it. Resuming from a byte offset is a seek.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 500):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.header: Optional[bytes] = None
+        self.data_start = 0  # Byte offset of the first record after the header
+
+    @staticmethod
+    def _read_record(f: BinaryIO) -> bytes:
+        """
+        Reads one physical record (may span several lines). Returns b"" at EOF.
+        """
+        record = f.readline()
+        if not record:
+            return b""
+        in_quotes = scan_quote_state(record, False)
+        while in_quotes:
+            line = f.readline()
+            if not line:
+                break  # Unterminated quote at EOF: hand what we have to the parser
+            record += line
+            in_quotes = scan_quote_state(line, in_quotes)
+        return record
+
+    def _read_header(self, f: BinaryIO):
+        while True:
+            record = self._read_record(f)
+            if not record or record.strip():
+                break
+        if not record:
+            raise ValueError(f"CSV file {self.path} is empty")
+        if not record.endswith(b"\n"):
+            record += b"\n"
+        self.header = record
+        self.data_start = f.tell()
+
+    def chunks(self, start_row: int = 0, start_byte: Optional[int] = None, end_row: Optional[int] = None) -> Iterator[CSVChunk]:
+        """
+        Yields CSVChunk objects for rows [start_row, end_row). With `start_byte` (from a checkpoint
+        or a RecordIndex), seeks straight there; otherwise skips `start_row` records by scanning (no parsing).
+        """
+        with open(self.path, "rb") as f:
+            self._read_header(f)
+            if start_byte is not None and start_byte >= self.data_start:
+                f.seek(start_byte)
+            elif start_row:
+                logging.info(f"No byte checkpoint, scanning past {start_row} records...")
+                skipped = 0
+                while skipped < start_row:
+                    record = self._read_record(f)
+                    if not record:
+                        return
+                    if record.strip():
+                        skipped += 1
+
+            row = start_row
+            while end_row is None or row < end_row:
+                want = self.chunk_size if end_row is None else min(self.chunk_size, end_row - row)
+                records = []
+                while len(records) < want:
+                    record = self._read_record(f)
+                    if not record:
+                        break
+                    if record.strip():  # pandas skips blank lines too
+                        records.append(record)
+                if not records:
+                    return
+                if not records[-1].endswith(b"\n"):
+                    records[-1] += b"\n"
+
+                parsed = self._parse(records)
+                yield CSVChunk(parsed, row, row + len(records), f.tell())
+                row += len(records)
+
+    def _parse(self, records: List[bytes]) -> List[Dict[str, Any]]:
+        # utf-8-sig: the header may carry the BOM
+        df = pd.read_csv(io.BytesIO(self.header + b"".join(records)), encoding="utf-8-sig")
+        return df.to_dict(orient="records")
@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+from src.ingestion.ledger import IngestionLedger
+
+DEFAULT_DEAD_LETTER_DB = "data/dead_letters.db"
+
+
+class DeadLetterStore:
+    """
+    Durable store for records that could not be indexed (SQLite, shared by every
+    ingestion process on the host), with the stage that failed and the error.
+
+    Records are kept as cleaned source rows (no enrichment fields), so a replay
+    re-runs them through the current pipeline configuration. One row per record
+    (same key as the ingestion ledger): failing again bumps `attempts`, indexing
+    it successfully - by a replay or any later ingestion - removes it.
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or os.getenv("INGEST_DEAD_LETTER_DB", DEFAULT_DEAD_LETTER_DB)
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS dead_letters (
+                    record_key TEXT PRIMARY KEY,
+                    source TEXT,
+                    stage TEXT NOT NULL,
+                    error TEXT,
+                    record TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 1,
+                    first_failed_at REAL,
+                    last_failed_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_dead_letters_stage ON dead_letters (stage)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def key_for(row: Dict[str, Any]) -> str:
+        """
+        Ledger key (TOT_ID / DedupHash); rows that failed before cleaning may have
+        neither, those are keyed by their content.
+        """
+        key = IngestionLedger.entry_for(row)[0]
+        if key == "hash:":
+            canonical = json.dumps(row, sort_keys=True, default=str)
+            key = "row:" + hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+        return key
+
+    def add(self, rows: List[Dict[str, Any]], stage: str, error: str, source: str = None,
+            errors: Optional[List[str]] = None):
+        """
+        Records failed rows. `errors` gives a per-row error (same order as rows); otherwise `error` applies to all.
+        """
+        if not rows:
+            return
+        now = time.time()
+        params = []
+        for i, row in enumerate(rows):
+            # Enrichment output must not be replayed as input
+            clean = {k: v for k, v in row.items() if k != "error"}
+            params.append((
+                self.key_for(clean), source, stage, errors[i] if errors else error,
+                json.dumps(clean, default=str), now, now
+            ))
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO dead_letters (record_key, source, stage, error, record, attempts, first_failed_at, last_failed_at) "
+                "VALUES (?, ?, ?, ?, ?, 1, ?, ?) "
+                "ON CONFLICT(record_key) DO UPDATE SET source = excluded.source, stage = excluded.stage, "
+                "error = excluded.error, record = excluded.record, attempts = dead_letters.attempts + 1, "
+                "last_failed_at = excluded.last_failed_at",
+                params
+            )
+        logging.warning(f"Dead-lettered {len(rows)} records at stage '{stage}': {error or (errors or [''])[0]}")
+
+    def pending(self, stage: str = None, limit: int = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Returns (record_key, row) for dead-lettered records, oldest failure first.
+        """
+        query = "SELECT record_key, record FROM dead_letters"
+        params: List[Any] = []
+        if stage:
+            query += " WHERE stage = ?"
+            params.append(stage)
+        query += " ORDER BY first_failed_at"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._connect() as conn:
+            return [(key, json.loads(record)) for key, record in conn.execute(query, params).fetchall()]
+
+    def resolve(self, keys: List[str]) -> int:
+        """
+        Removes records that have since been indexed. Returns how many were dead-lettered.
+        """
+        if not keys:
+            return 0
+        removed = 0
+        with self._connect() as conn:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i+500]
+                placeholders = ", ".join("?" for _ in batch)
+                removed += conn.execute(f"DELETE FROM dead_letters WHERE record_key IN ({placeholders})", batch).rowcount
+        if removed:
+            logging.info(f"Resolved {removed} dead-lettered records.")
+        return removed
+
+    def summary(self) -> Dict[str, int]:
+        """
+        Dead-lettered record counts per stage.
+        """
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT stage, COUNT(*) FROM dead_letters GROUP BY stage").fetchall())
@@ -0,0 +1,388 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import logging
+import threading
+import multiprocessing
+from typing import Dict, Any, List, Optional
+
+DEFAULT_JOBS_DB = "data/ingest_jobs.db"
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    """
+    Raised inside a worker when its job was cancelled (possibly by another API process).
+    """
+
+
+class JobStore:
+    """
+    Persistent ingestion job queue in SQLite (shared by the API and worker processes).
+    Connections are short-lived and WAL mode lets workers write progress while the API reads.
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or os.getenv("INGEST_JOBS_DB", DEFAULT_JOBS_DB)
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    file_path TEXT NOT NULL,
+                    file_signature TEXT,
+                    streaming INTEGER DEFAULT 0,
+                    upload_complete INTEGER DEFAULT 1,
+                    status TEXT NOT NULL,
+                    current INTEGER DEFAULT 0,
+                    total INTEGER DEFAULT 0,
+                    indexed INTEGER DEFAULT 0,
+                    last_log TEXT DEFAULT '',
+                    error TEXT,
+                    pid INTEGER,
+                    metrics TEXT,
+                    created_at REAL,
+                    updated_at REAL
+                )
+            """)
+            # Databases created before worker metrics existed
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "metrics" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN metrics TEXT")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create(self, file_path: str, file_signature: str = None, streaming: bool = False) -> str:
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, file_path, file_signature, streaming, upload_complete, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, file_path, file_signature, int(streaming), int(not streaming), now, now)
+            )
+        return job_id
+
+    # Job rows as returned to callers; the metrics snapshot is only read by metrics_snapshots()
+    _JOB_COLUMNS = ("id, file_path, file_signature, streaming, upload_complete, status, current, total, "
+                    "indexed, last_log, error, pid, created_at, updated_at")
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {self._JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT {self._JOB_COLUMNS} FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def save_metrics(self, job_id: str, snapshot: Dict[str, Any]):
+        """
+        Stores a worker's cumulative metrics snapshot (one worker process per job).
+        """
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET metrics = ? WHERE id = ?", (json.dumps(snapshot), job_id))
+
+    def metrics_snapshots(self) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT metrics FROM jobs WHERE metrics IS NOT NULL").fetchall()
+        return [json.loads(r["metrics"]) for r in rows]
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """
+        Atomically moves the oldest queued job to 'running' and returns it.
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1").fetchone()
+            if not row:
+                return None
+            conn.execute("UPDATE jobs SET status = 'running', error = NULL, updated_at = ? WHERE id = ?", (time.time(), row["id"]))
+        return self.get(row["id"])
+
+    def update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{k} = ?" for k in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def record_progress(self, job_id: str, current: int, total: int, last_log: str, indexed_delta: int = 0):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET current = ?, total = ?, last_log = ?, indexed = indexed + ?, updated_at = ? WHERE id = ?",
+                (current or 0, total or 0, last_log, indexed_delta or 0, time.time(), job_id)
+            )
+
+    def complete_upload(self, job_id: str, file_signature: str):
+        self.update(job_id, upload_complete=1, file_signature=file_signature)
+
+    def transition(self, job_id: str, from_statuses: List[str], to_status: str) -> bool:
+        """
+        Compare-and-set on status. Returns False if the job was not in one of `from_statuses`.
+        """
+        placeholders = ", ".join("?" for _ in from_statuses)
+        with self._connect() as conn:
+            cur = conn.execute(
+                f"UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status IN ({placeholders})",
+                (to_status, time.time(), job_id, *from_statuses)
+            )
+        return cur.rowcount > 0
+
+    def requeue_interrupted(self, grace: float = 60.0) -> int:
+        """
+        Jobs left 'running' by a previous API process are queued again (they resume from checkpoints).
+        Jobs whose worker is still alive belong to another API process (uvicorn workers share the
+        store) and are left alone, as are jobs claimed less than `grace` seconds ago whose worker
+        has not recorded its pid yet. Streamed uploads that never completed cannot resume (the
+        request that carried the body is gone), so they are marked failed instead.
+        """
+        now = time.time()
+        requeued = 0
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT id, pid, streaming, upload_complete, updated_at FROM jobs WHERE status = 'running'"
+            ).fetchall()
+            for row in rows:
+                if row["pid"] and _pid_alive(row["pid"]):
+                    continue
+                if not row["pid"] and now - (row["updated_at"] or 0) < grace:
+                    continue
+                if row["streaming"] and not row["upload_complete"]:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', pid = NULL, error = ?, last_log = ?, updated_at = ? WHERE id = ?",
+                        (INTERRUPTED_UPLOAD, f"Error: {INTERRUPTED_UPLOAD}", now, row["id"])
+                    )
+                    continue
+                conn.execute("UPDATE jobs SET status = 'queued', pid = NULL, updated_at = ? WHERE id = ?", (now, row["id"]))
+                requeued += 1
+        return requeued
+
+
+INTERRUPTED_UPLOAD = "Upload interrupted by a restart before it completed; upload the file again."
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, owned by another user
+    return True
+
+
+def run_job(job_id: str, db_path: str):
+    """
+    Worker process entry point: runs one ingestion job and records progress in the job store.
+    """
+    logging.basicConfig(level=logging.INFO, format=f'%(asctime)s - job {job_id} - %(levelname)s - %(message)s')
+    from src.monitoring.metrics import REGISTRY
+
+    store = JobStore(db_path)
+    store.update(job_id, pid=os.getpid())
+    try:
+        asyncio.run(_run_job_async(store, store.get(job_id)))
+        store.transition(job_id, ["running"], "completed")
+    except JobCancelled:
+        logging.info(f"Ingestion job {job_id} was cancelled; stopping (checkpoint kept for resume).")
+    except Exception as e:
+        logging.error(f"Ingestion job {job_id} failed: {e}")
+        store.update(job_id, error=str(e), last_log=f"Error: {e}")
+        store.transition(job_id, ["running"], "failed")
+        raise SystemExit(1)
+    finally:
+        # This process's stage latencies/counters, merged into the API's /metrics
+        store.save_metrics(job_id, REGISTRY.snapshot())
+
+
+async def _run_job_async(store: JobStore, job: Dict[str, Any]):
+    # Imported here so the API process does not pay for the pipeline imports on every dispatch
+    from src.ingestion.pipeline import IngestionPipeline
+    from src.ingestion.sharded import ShardedIngestion, get_process_count
+    from src.ingestion.streaming import tail_csv_records
+    from src.monitoring.metrics import REGISTRY
+
+    job_id = job["id"]
+
+    async def on_progress(data: Dict[str, Any]):
+        store.record_progress(job_id, data["current"], data["total"], data["last_log"], data.get("indexed_delta", 0))
+        store.save_metrics(job_id, REGISTRY.snapshot())
+        # Called between chunks: stop here if the job was cancelled, even by an API process that does not own us
+        if store.get(job_id)["status"] == "cancelled":
+            raise JobCancelled(job_id)
+
+    if job["streaming"] and not job["upload_complete"]:
+        # Upload still arriving: tail the file, the upload flag lives in the job store
+        pipeline = IngestionPipeline(input_file=job["file_path"], streaming=True, progress_callback=on_progress,
+                                     file_signature=job["file_signature"])
+
+        def upload_complete() -> bool:
+            row = store.get(job_id)
+            # The API stores the signature as soon as the upload's first 4KB are in
+            if row["file_signature"] and pipeline.file_signature is None:
+                pipeline.set_file_signature(row["file_signature"])
+            return bool(row["upload_complete"])
+
+        await pipeline.run_stream(tail_csv_records(job["file_path"], upload_complete))
+    elif get_process_count() > 1:
+        # INGEST_PROCESSES > 1: split the file into record ranges across worker processes
+        await ShardedIngestion(
+            job["file_path"], file_signature=job["file_signature"], progress_callback=on_progress
+        ).run()
+    else:
+        pipeline = IngestionPipeline(
+            input_file=job["file_path"], file_signature=job["file_signature"], progress_callback=on_progress
+        )
+        await pipeline.run()
+
+
+class JobManager:
+    """
+    Dispatches queued ingestion jobs to worker processes (INGEST_CONCURRENCY at a time),
+    so enrichment never competes with search on the API event loop.
+    Progress is read back from the job store and pushed to an optional ProgressBroadcaster.
+    """
+
+    def __init__(self, store: JobStore, concurrency: int = None, poll_interval: float = 1.0,
+                 progress=None, on_job_finished=None):
+        self.store = store
+        self.concurrency = concurrency or int(os.getenv("INGEST_CONCURRENCY", "1"))
+        self.poll_interval = poll_interval
+        self.progress = progress
+        self.on_job_finished = on_job_finished  # Optional async callback, e.g. reconcile the index count
+        self.processes: Dict[str, multiprocessing.Process] = {}
+        self._lock = threading.Lock()
+        # 'spawn' so workers don't inherit the API's event loop, threads and sockets
+        self._ctx = multiprocessing.get_context("spawn")
+        self._task: Optional[asyncio.Task] = None
+        self._seen: Dict[str, Dict[str, Any]] = {}
+
+    def start(self):
+        requeued = self.store.requeue_interrupted()
+        if requeued:
+            logging.info(f"Re-queued {requeued} interrupted ingestion jobs.")
+        self._task = asyncio.create_task(self._loop())
+        logging.info(f"Ingestion job manager started (concurrency={self.concurrency}).")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        # Stop workers; their jobs are re-queued on next start and resume from checkpoints
+        for proc in self.processes.values():
+            proc.terminate()
+        for proc in self.processes.values():
+            proc.join(timeout=10)
+        self.processes.clear()
+
+    def submit(self, file_path: str, file_signature: str = None, streaming: bool = False) -> str:
+        job_id = self.store.create(file_path, file_signature=file_signature, streaming=streaming)
+        logging.info(f"Queued ingestion job {job_id} for {file_path}")
+        return job_id
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Queued jobs are dropped; running jobs have their worker terminated (checkpoint kept for resume).
+        A worker started by another API process sees the cancelled status after its current chunk and exits.
+        """
+        if self.store.transition(job_id, ["queued"], "cancelled"):
+            return True
+        if self.store.transition(job_id, ["running"], "cancelled"):
+            with self._lock:
+                proc = self.processes.pop(job_id, None)
+            if proc is not None:
+                proc.terminate()
+                proc.join(timeout=10)
+            self.store.update(job_id, last_log="Cancelled by user.")
+            return True
+        return False
+
+    def resume(self, job_id: str) -> bool:
+        """
+        Re-queues a failed or cancelled job. The pipeline resumes from its file checkpoint.
+        A streamed upload that never completed has no file to resume from.
+        """
+        job = self.store.get(job_id)
+        if job and job["streaming"] and not job["upload_complete"]:
+            return False
+        return self.store.transition(job_id, ["failed", "cancelled"], "queued")
+
+    def _tick(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._reap_and_launch()
+        return self.store.list(limit=20)
+
+    def _reap_and_launch(self):
+        # Reap finished workers
+        for job_id, proc in list(self.processes.items()):
+            if proc.is_alive():
+                continue
+            proc.join()
+            del self.processes[job_id]
+            if proc.exitcode != 0 and self.store.transition(job_id, ["running"], "failed"):
+                self.store.update(job_id, error=f"Worker exited with code {proc.exitcode}")
+
+        # Launch queued jobs into free slots
+        while len(self.processes) < self.concurrency:
+            job = self.store.claim_next()
+            if not job:
+                break
+            proc = self._ctx.Process(target=run_job, args=(job["id"], self.store.db_path), name=f"ingest-{job['id']}")
+            proc.start()
+            self.processes[job["id"]] = proc
+            # Recorded right away, so other API processes see a live worker (see requeue_interrupted)
+            self.store.update(job["id"], pid=proc.pid)
+            logging.info(f"Started ingestion job {job['id']} in worker pid {proc.pid}")
+
+    async def _loop(self):
+        while True:
+            try:
+                jobs = await asyncio.to_thread(self._tick)
+                if self._publish(jobs) and self.on_job_finished:
+                    await self.on_job_finished()
+            except Exception as e:
+                logging.error(f"Job manager error: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def _publish(self, jobs: List[Dict[str, Any]]) -> bool:
+        """
+        Pushes changed job rows to the progress broadcaster (index count grows by each job's new 'indexed').
+        Returns True if a job reached a terminal state since the last tick.
+        """
+        finished = False
+        for job in sorted(jobs, key=lambda j: j["updated_at"]):
+            seen = self._seen.get(job["id"])
+            if seen and seen["updated_at"] == job["updated_at"]:
+                continue
+            delta = job["indexed"] - (seen["indexed"] if seen else job["indexed"])
+            self._seen[job["id"]] = job
+            if seen and seen["status"] != job["status"] and job["status"] in TERMINAL_STATUSES:
+                finished = True
+            if not self.progress:
+                continue
+            self.progress.publish({
+                "job_id": job["id"],
+                "status": job["status"],
+                "current_offset": job["current"],
+                "total": job["total"],
+                "last_log": job["last_log"],
+                "indexed_delta": delta,
+            })
+
+        # Finished jobs that dropped out of the listing will not change again
+        listed = {job["id"] for job in jobs}
+        for job_id in [i for i, job in self._seen.items() if i not in listed and job["status"] in TERMINAL_STATUSES]:
+            del self._seen[job_id]
+        return finished
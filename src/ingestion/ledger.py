@@ -0,0 +1,206 @@
+import os
+import re
+import json
+import math
+import time
+import sqlite3
+import hashlib
+import logging
+from typing import List, Dict, Any, Tuple
+
+DEFAULT_LEDGER_DB = "data/ingest_ledger.db"
+
+# A ledger entry: (record_key, tot_id, dedup_hash, fingerprint, index_id, title_key, purchaser_key, location_key)
+LedgerEntry = Tuple[str, str, str, str, str, str, str, str]
+
+
+# Text that pandas would read as a number
+_NUMERIC = re.compile(r"\s*[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?\s*$")
+
+
+def _canonical(value: Any) -> Any:
+    """
+    Text form of a value that is the same whether the row was parsed by pandas
+    (CSVRecordSource: int/float/bool, NaN for gaps, 123 or 123.0 depending on whether
+    a chunk has gaps) or as raw text (StreamingCSVParser: str, None for gaps).
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        if value == "":
+            return None
+        if value.lower() in ("true", "false"):
+            return value.lower()
+        if not _NUMERIC.match(value):
+            return value
+        text = value.strip()
+        if text.lstrip("+-").isdigit():
+            return str(int(text))
+        value = float(text)
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, float):
+        if math.isnan(value):
+            return None
+        return str(int(value)) if value.is_integer() else repr(value)
+    return str(value)
+
+
+def title_key(title: Any) -> str:
+    """
+    Case and punctuation insensitive form of a tender title, for title lookups.
+    """
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", str(title or "").lower()).split())
+
+
+class IngestionLedger:
+    """
+    Persistent record of what has been enriched and indexed, across runs
+    (SQLite, shared by every ingestion process on the host).
+
+    Keyed by TOT_ID (DedupHash when a row has no TOT_ID) and storing a content
+    fingerprint, so a re-run only sends new or changed tenders to Gemini.
+    Entries are written after the upsert succeeded, never before. The index id
+    and title of each record are kept too, so corrigenda can find their parent, with its
+    purchaser and location to confirm a match by title.
+
+    Each entry also records the index `target` it went into (collection, sharding and
+    embedding width, see ChromaLoader.index_target): a row indexed into another target,
+    e.g. before a collection rebuild, counts as new. Entries written before targets were
+    recorded have none and are re-processed once.
+    """
+
+    def __init__(self, db_path: str = None, target: str = ""):
+        self.target = target
+        self.db_path = db_path or os.getenv("INGEST_LEDGER_DB", DEFAULT_LEDGER_DB)
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS records (
+                    record_key TEXT PRIMARY KEY,
+                    tot_id TEXT,
+                    dedup_hash TEXT,
+                    fingerprint TEXT NOT NULL,
+                    indexed_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_records_dedup ON records (dedup_hash)")
+            # Ledgers created before corrigendum linking / index targets lack these columns
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(records)")}
+            for column in ("index_id", "title_key", "target", "purchaser_key", "location_key"):
+                if column not in columns:
+                    try:
+                        conn.execute(f"ALTER TABLE records ADD COLUMN {column} TEXT")
+                    except sqlite3.OperationalError:
+                        pass  # Added by another process meanwhile
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_records_index_id ON records (index_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_records_title ON records (title_key)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def entry_for(row: Dict[str, Any]) -> LedgerEntry:
+        """
+        Ledger entry for a cleaned row (after TenderEnricher.clean_records, which adds DedupHash).
+        The fingerprint covers every field of the row, so any source edit counts as a change;
+        values are canonicalized first, so pandas-parsed and streamed rows fingerprint alike.
+        """
+        tot_id = _canonical(row.get("TOT_ID"))
+        dedup_hash = row.get("DedupHash") or ""
+        key = f"tot:{tot_id}" if tot_id is not None else f"hash:{dedup_hash}"
+        canonical = json.dumps({k: _canonical(v) for k, v in row.items()}, sort_keys=True)
+        fingerprint = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+        # Indexed ids are str(RefNo) (see ChromaLoader.build_records)
+        index_id = str(row["RefNo"]) if row.get("RefNo") is not None else ""
+        title = title_key(row.get("Summary") or row.get("Title") or "")
+        purchaser = title_key(_canonical(row.get("Purchaser_Name")) or "")
+        location = title_key(_canonical(row.get("Location")) or "")
+        return key, tot_id or "", dedup_hash, fingerprint, index_id, title, purchaser, location
+
+    def filter_new(self, rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[LedgerEntry]]:
+        """
+        Returns the rows that are new or changed since they were last indexed, with their entries.
+        """
+        entries = [self.entry_for(row) for row in rows]
+        known: Dict[str, str] = {}
+        keys = [e[0] for e in entries]
+        with self._connect() as conn:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i+500]
+                placeholders = ", ".join("?" for _ in batch)
+                known.update(conn.execute(
+                    f"SELECT record_key, fingerprint FROM records WHERE record_key IN ({placeholders}) AND target = ?",
+                    (*batch, self.target)
+                ).fetchall())
+
+        fresh_rows, fresh_entries = [], []
+        for row, entry in zip(rows, entries):
+            if known.get(entry[0]) == entry[3]:
+                continue
+            fresh_rows.append(row)
+            fresh_entries.append(entry)
+        return fresh_rows, fresh_entries
+
+    def mark_indexed(self, entries: List[LedgerEntry]):
+        if not entries:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO records (record_key, tot_id, dedup_hash, fingerprint, index_id, title_key, "
+                "purchaser_key, location_key, target, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(record_key) DO UPDATE SET tot_id = excluded.tot_id, dedup_hash = excluded.dedup_hash, "
+                "fingerprint = excluded.fingerprint, index_id = excluded.index_id, title_key = excluded.title_key, "
+                "purchaser_key = excluded.purchaser_key, location_key = excluded.location_key, "
+                "target = excluded.target, indexed_at = excluded.indexed_at",
+                [(*entry, self.target, now) for entry in entries]
+            )
+        logging.debug(f"Ledger: marked {len(entries)} records as indexed.")
+
+    def known_index_ids(self, index_ids: List[str], exclude_key: str = "") -> List[str]:
+        """
+        The given index ids that belong to indexed records (other than `exclude_key`), in the order given.
+        """
+        unique = [i for i in dict.fromkeys(index_ids) if i]
+        found = set()
+        with self._connect() as conn:
+            for i in range(0, len(unique), 500):
+                batch = unique[i:i+500]
+                placeholders = ", ".join("?" for _ in batch)
+                found.update(r[0] for r in conn.execute(
+                    f"SELECT index_id FROM records WHERE index_id IN ({placeholders}) AND record_key != ?",
+                    (*batch, exclude_key)
+                ))
+        return [i for i in unique if i in found]
+
+    def titles_matching(self, key: str, word: str = None, exclude_key: str = "",
+                        limit: int = 2000) -> List[Tuple[str, str, str, str]]:
+        """
+        (index_id, title_key, purchaser_key, location_key) of indexed records titled exactly `key`,
+        or, given `word`, of those whose title contains it (candidates for a fuzzy match).
+        Most recent first.
+        """
+        columns = "index_id, title_key, COALESCE(purchaser_key, ''), COALESCE(location_key, '')"
+        with self._connect() as conn:
+            if word is None:
+                query, args = f"SELECT {columns} FROM records WHERE title_key = ?", (key,)
+            else:
+                query, args = f"SELECT {columns} FROM records WHERE title_key LIKE ?", (f"%{word}%",)
+            return conn.execute(
+                f"{query} AND index_id != '' AND record_key != ? ORDER BY indexed_at DESC LIMIT ?",
+                (*args, exclude_key, limit)
+            ).fetchall()
+
+    def retarget(self, old_target: str, new_target: str) -> int:
+        """
+        Moves entries to another index target after the index was rebuilt from itself
+        (scripts/rebuild_collection.py), so the next run does not re-enrich everything.
+        """
+        with self._connect() as conn:
+            return conn.execute("UPDATE records SET target = ? WHERE target = ?", (new_target, old_target)).rowcount
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
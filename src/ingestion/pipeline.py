@@ -1,12 +1,21 @@
 import os
 import time
+import asyncio
 import logging
 import pandas as pd
-import hashlib
 import json
+from typing import AsyncIterator, Dict, Any, List
 from tqdm import tqdm
 from src.enrichment.processor import TenderEnricher
 from src.indexing.chroma_loader import ChromaLoader
+from src.ingestion.csv_source import CSVRecordSource
+from src.ingestion.streaming import file_signature, SIGNATURE_HEAD_BYTES
+from src.ingestion.record_index import RecordIndex
+from src.ingestion.ledger import IngestionLedger
+from src.ingestion.dead_letters import DeadLetterStore
+from src.ingestion.corrigenda import CorrigendumLinker, child_id
+from src.ingestion.stages import Stage, StagePipeline
+from src.monitoring.metrics import track, CACHE_EVENTS
 
 # Configure logging to show up in standard output
 logging.basicConfig(
@@ -20,7 +29,9 @@ logging.basicConfig(
 class IngestionPipeline:
     def __init__(self, input_file: str, api_key: str = None, 
                  start_offset: int = 0, total_records: int = None, chunk_size: int = 500,
-                 progress_callback=None):
+                 progress_callback=None, file_signature: str = None, streaming: bool = False,
+                 stage_workers: Dict[str, int] = None, queue_size: int = None, end_offset: int = None,
+                 incremental: bool = True):
         """
         Initializes the ingestion pipeline.
         
@@ -31,49 +42,85 @@ class IngestionPipeline:
             total_records: Total records to process (if None, will try to count).
             chunk_size: Number of records to process in each batch.
             progress_callback: Optional async function(progress_data) to call with updates.
+            file_signature: Precomputed checkpoint signature (e.g. content hash taken during upload).
+            streaming: Input CSV is still being written; records come from run_stream() instead
+                of the file, so the file is not counted or hashed up front.
+            stage_workers: Concurrent workers per stage, e.g. {"enrich": 2, "embed": 1}
+                (default INGEST_ENRICH_WORKERS / INGEST_EMBED_WORKERS, 1 each).
+            queue_size: Chunks buffered between stages (default INGEST_QUEUE_SIZE, 2).
+            end_offset: Stop before this record (a worker's range in sharded ingestion).
+            incremental: Skip rows the ingestion ledger has already indexed with identical content.
+                False re-processes everything (the ledger is still updated).
         """
         self.original_input_file = input_file
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         self.chunk_size = chunk_size
         self.total_records = total_records
         self.progress_callback = progress_callback
+
+        # Stage concurrency. Upsert stays single-worker per pipeline; across processes (ShardedIngestion)
+        # the quantized store serializes appends with its file lock.
+        self.stage_workers = {
+            "enrich": int(os.getenv("INGEST_ENRICH_WORKERS", "1")),
+            "embed": int(os.getenv("INGEST_EMBED_WORKERS", "1")),
+        }
+        self.stage_workers.update(stage_workers or {})
+        self.queue_size = queue_size or int(os.getenv("INGEST_QUEUE_SIZE", "2"))
         
         # Helper: Convert Excel to CSV if needed
-        self.working_csv_file = self._prepare_input_file(input_file)
+        self.working_csv_file = input_file if streaming else self._prepare_input_file(input_file)
         
         # Checkpoint Logic
         self.checkpoint_dir = "checkpoints"
         os.makedirs(self.checkpoint_dir, exist_ok=True)
-        self.file_signature = self._get_file_signature(self.working_csv_file)
-        self.checkpoint_file = os.path.join(self.checkpoint_dir, f"{self.file_signature}.json")
-        
-        # Determine Start Offset (Resume vs New)
-        self.start_offset = self._load_checkpoint(start_offset)
+        self.file_signature = None
+        self.checkpoint_file = None
+        self.start_offset = start_offset
+        self.start_byte = None  # Byte offset matching start_offset, when resuming from a checkpoint
+        self.end_offset = end_offset
+        self.record_index = None  # Record byte offsets (exact count, O(1) seek); not for streamed input
+        self.streaming = streaming
+        if file_signature or not streaming:
+            self.set_file_signature(file_signature or self._get_file_signature(self.working_csv_file))
+            # Determine Start Offset (Resume vs New)
+            self.start_offset = self._load_checkpoint(start_offset)
 
         # Initialize components
         self.enricher = TenderEnricher(api_key=self.api_key)
         self.loader = ChromaLoader(api_key=self.api_key)
+        # Cross-run ledger (TOT_ID / DedupHash -> content fingerprint), per index target
+        self.ledger = IngestionLedger(target=self.loader.index_target)
+        self.incremental = incremental
+        # Records that failed a stage, kept for replay_dead_letters.py
+        self.dead_letters = DeadLetterStore()
+        # Corrigenda of indexed tenders reuse the parent's enrichment/embedding (CORRIGENDUM_LINKING=0 disables)
+        self.corrigenda = CorrigendumLinker(self.ledger, self.loader) if os.getenv("CORRIGENDUM_LINKING", "1") != "0" else None
         
         # Determine total records if not provided
-        if self.total_records is None:
+        if self.total_records is None and not streaming:
             self._count_total_records()
+        if self.end_offset is not None and self.total_records is not None:
+            self.total_records = min(self.total_records, self.end_offset)
+
+    def set_file_signature(self, signature: str):
+        """
+        Sets the checkpoint signature. A streamed upload learns it mid-stream (once its first
+        4KB are in), then resumes past rows an earlier run of the same file already checkpointed.
+        """
+        self.file_signature = signature
+        self.checkpoint_file = os.path.join(self.checkpoint_dir, f"{signature}.json")
+        if self.streaming:
+            self.start_offset = self._load_checkpoint(self.start_offset)
 
-    def _get_file_signature(self, file_path: str) -> str:
+    @staticmethod
+    def _get_file_signature(file_path: str) -> str:
         """
         Generates a unique signature for the file based on size and first 4KB.
         """
         try:
-            stats = os.stat(file_path)
-            file_size = stats.st_size
-            
-            hasher = hashlib.md5()
             with open(file_path, 'rb') as f:
-                buf = f.read(4096)
-                hasher.update(buf)
-                
-            # Combine size and header hash
-            signature_base = f"{file_size}_{hasher.hexdigest()}"
-            return hashlib.md5(signature_base.encode()).hexdigest()
+                head = f.read(SIGNATURE_HEAD_BYTES)
+            return file_signature(os.stat(file_path).st_size, head)
         except Exception as e:
             logging.warning(f"Failed to generate file signature: {e}")
             return "unknown_signature"
@@ -82,30 +129,39 @@ class IngestionPipeline:
         """
         Checks for existing checkpoint. Returns the offset to start from.
         """
-        if os.path.exists(self.checkpoint_file):
+        if self.checkpoint_file and os.path.exists(self.checkpoint_file):
             try:
                 with open(self.checkpoint_file, 'r') as f:
                     data = json.load(f)
                     last_offset = data.get("last_offset", 0)
                     if last_offset > requested_offset:
                         logging.info(f"RESUMING ingestion from checkpoint offset: {last_offset}")
+                        # Older checkpoints have no byte offset: the reader scans to the row instead
+                        self.start_byte = data.get("byte_offset")
                         return last_offset
             except Exception as e:
                 logging.warning(f"Failed to load checkpoint: {e}")
         
         return requested_offset
 
-    def _save_checkpoint(self, offset: int):
+    def _save_checkpoint(self, offset: int, byte_offset: int = None):
         """
         Saves current progress to checkpoint file.
+        byte_offset: position of the next unread record in the working CSV (lets resume seek).
         """
+        if not self.checkpoint_file:
+            return
         try:
+            checkpoint = {"last_offset": offset, "updated_at": time.time()}
+            if byte_offset is not None:
+                checkpoint["byte_offset"] = byte_offset
             with open(self.checkpoint_file, 'w') as f:
-                json.dump({"last_offset": offset, "updated_at": time.time()}, f)
+                json.dump(checkpoint, f)
         except Exception as e:
             logging.warning(f"Failed to save checkpoint: {e}")
 
-    def _prepare_input_file(self, file_path: str) -> str:
+    @staticmethod
+    def _prepare_input_file(file_path: str) -> str:
         """
         Ensures we have a CSV file to work with. 
         If input is Excel, converts to temp CSV.
@@ -130,14 +186,10 @@ class IngestionPipeline:
 
     def _count_total_records(self):
         try:
-            # Efficiently count lines for CSV
-            if self.working_csv_file.endswith('.csv'):
-                with open(self.working_csv_file, 'r', encoding='utf-8', errors='ignore') as f:
-                     # Subtract 1 for header
-                     self.total_records = sum(1 for _ in f) - 1
-            else:
-                 # Should not happen given _prepare_input_file
-                 pass
+            # Exact record count from the quote-aware offset index (raw line counts drift
+            # when Description fields contain newlines). The index is reused by run() to seek.
+            self.record_index = RecordIndex.load_or_build(self.working_csv_file)
+            self.total_records = self.record_index.count
             
             logging.info(f"Detected {self.total_records} records in {self.working_csv_file}")
             
@@ -159,89 +211,27 @@ class IngestionPipeline:
             logging.warning(f"Start offset {self.start_offset} is >= total records {self.total_records}. Nothing to do.")
             return
 
-        # Create a progress bar
-        # We assume total_records is accurate.
-        
-        # Safe upper bound for range
-        upper_bound = self.total_records if self.total_records else self.start_offset + 1000000 
-        
-        with tqdm(total=self.total_records, initial=self.start_offset, unit="rec", desc="Ingestion Progress") as pbar:
-            for offset in range(self.start_offset, upper_bound, self.chunk_size):
-                
-                # Check bounds if total_records is hard set? 
-                # range takes care of it.
-                
-                limit = self.chunk_size
-                
-                chunk_start_time = time.time()
-                
-                # Temp file for this chunk
-                # We use a unique name to avoid collisions
-                output_file = f"batch_{offset}_{offset+limit}.jsonl"
-                
-                # 1. Enrichment
-                if os.path.exists(output_file):
-                    os.remove(output_file)
-                    
-                try:
-                    # process_csv_to_jsonl(input_csv, output_jsonl, batch_size=50, limit=None, offset=0)
-                    # Note: process_csv_to_jsonl uses 'skiprows=range(1, offset+1)' and 'nrows=limit'
-                    # So passing offset=offset and limit=chunk_size is correct mapping.
-                    
-                    logging.info(f"Processing chunk offset={offset}, limit={limit}")
-                    
-                    # We need to capture the fact if NO records were read.
-                    # process_csv_to_jsonl doesn't return count.
-                    # But it writes to output_file.
-                    
-                    await self.enricher.process_csv_to_jsonl(
-                        input_csv=self.working_csv_file,
-                        output_jsonl=output_file,
-                        batch_size=50, 
-                        limit=limit,
-                        offset=offset
-                    )
-                    
-                    # Check if file exists and has content
-                    if not os.path.exists(output_file) or os.stat(output_file).st_size == 0:
-                        logging.info("No more records processed. Stopping pipeline.")
-                        if os.path.exists(output_file): os.remove(output_file)
-                        break
-                    
-                    # 2. Indexing
-                    self.loader.load_from_jsonl(output_file)
-                    
-                    # Cleanup
-                    os.remove(output_file)
-
-                except Exception as e:
-                    logging.error(f"Pipeline failed at chunk {offset}: {e}")
-                    # In production, we might want to store failed chunks in a DLQ
-                    continue
-                
-                chunk_duration = time.time() - chunk_start_time
-                logging.info(f"Chunk finished in {chunk_duration:.2f}s")
-                
-                # Update progress bar
-                pbar.update(limit)
-
-                # Callback Update
-                if self.progress_callback:
-                    await self.progress_callback({
-                        "status": "processing",
-                        "current": offset + limit,
-                        "total": self.total_records,
-                        "last_log": f"Processed chunk {offset}-{offset+limit} in {chunk_duration:.2f}s"
-                    })
-                
-                # SAVE CHECKPOINT
-                self._save_checkpoint(offset + limit)
-                
-        logging.info("Ingestion Pipeline Completed Successfully.")
+        # Single pass over the file: chunks come from one open handle, resuming is a seek
+        start_byte = self.start_byte
+        if start_byte is None and self.start_offset and self.record_index:
+            start_byte = self.record_index.offset(self.start_offset)
+        source = CSVRecordSource(self.working_csv_file, chunk_size=self.chunk_size)
+        chunks = source.chunks(start_row=self.start_offset, start_byte=start_byte, end_row=self.end_offset)
 
-        # CLEANUP CHECKPOINT
-        if os.path.exists(self.checkpoint_file):
-            os.remove(self.checkpoint_file)
+        async def read_chunks():
+            seq = 0
+            while True:
+                with track("ingestion", "read"):
+                    chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    logging.info("No more records. Waiting for in-flight chunks...")
+                    return
+                yield _ChunkWork(seq, chunk.start_row, chunk.end_row, chunk.records, chunk.end_byte)
+                seq += 1
+
+        await self._run_stages(read_chunks())
+                
+        self._finish_checkpoint()
 
         if self.progress_callback:
             await self.progress_callback({
@@ -255,3 +245,205 @@ class IngestionPipeline:
         if self.working_csv_file != self.original_input_file and os.path.exists(self.working_csv_file):
             logging.info("Cleaning up temporary CSV file...")
             os.remove(self.working_csv_file)
+            RecordIndex.remove_sidecar(self.working_csv_file)
+
+    def _finish_checkpoint(self):
+        logging.info("Ingestion Pipeline Completed Successfully.")
+
+        # CLEANUP CHECKPOINT
+        if self.checkpoint_file and os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
+
+    async def run_stream(self, record_stream: AsyncIterator[Dict[str, Any]]):
+        """
+        Streaming variant of run(): consumes already-parsed rows (e.g. StreamingUpload.records())
+        in chunks of chunk_size, so enrichment starts while the file is still arriving.
+        """
+        logging.info(f"Starting Streaming Ingestion Pipeline for {self.original_input_file}")
+
+        async def collect_chunks():
+            consumed = 0
+            seq = 0
+            rows: List[Dict[str, Any]] = []
+
+            def chunk_work():
+                # Rows up to start_offset were ingested already (checkpoint; may be found mid-stream)
+                fresh = rows[max(0, self.start_offset - (consumed - len(rows))):]
+                return _ChunkWork(seq, consumed - len(fresh), consumed, fresh) if fresh else None
+
+            async for row in record_stream:
+                consumed += 1
+                rows.append(row)
+                if len(rows) >= self.chunk_size:
+                    work = chunk_work()
+                    if work:
+                        yield work
+                        seq += 1
+                    rows = []
+            if rows and chunk_work():
+                yield chunk_work()
+            self.total_records = consumed
+
+        await self._run_stages(collect_chunks())
+        self._finish_checkpoint()
+
+        if self.progress_callback:
+            await self.progress_callback({
+                "status": "completed",
+                "current": self.total_records,
+                "total": self.total_records,
+                "last_log": "Ingestion Completed Successfully."
+            })
+
+    async def _run_stages(self, chunks: AsyncIterator["_ChunkWork"]):
+        """
+        reader -> clean -> enrich -> embed -> upsert, connected by bounded queues; nothing is
+        written to intermediate files. Chunks may finish out of order (several enrich/embed
+        workers), so progress and checkpoints only advance over the contiguous finished prefix.
+        """
+        stages = StagePipeline([
+            Stage("clean", self._clean_stage),
+            Stage("enrich", self._enrich_stage, workers=self.stage_workers["enrich"]),
+            Stage("embed", self._embed_stage, workers=self.stage_workers["embed"]),
+            Stage("upsert", self._upsert_stage),
+        ], queue_size=self.queue_size)
+
+        finished: Dict[int, _ChunkWork] = {}
+        next_seq = [0]
+
+        with tqdm(total=self.total_records, initial=self.start_offset, unit="rec", desc="Ingestion Progress") as pbar:
+            async def on_done(work: _ChunkWork):
+                finished[work.seq] = work
+                while next_seq[0] in finished:
+                    await self._report_chunk(finished.pop(next_seq[0]), pbar)
+                    next_seq[0] += 1
+
+            async def on_error(work: _ChunkWork, stage: str, error: BaseException):
+                logging.error(f"Pipeline failed at chunk {work.start_row} ({stage}): {error}")
+                work.error = f"{stage}: {error}"
+                # Keep the chunk's rows so they can be replayed instead of re-ingesting the file
+                await asyncio.to_thread(self.dead_letters.add, work.source_rows, stage, str(error),
+                                        self.original_input_file)
+                await on_done(work)
+
+            await stages.run(chunks, on_done, on_error)
+
+    async def _clean_stage(self, work: "_ChunkWork") -> "_ChunkWork":
+        cleaned = self.enricher.clean_records(work.records)
+        if self.incremental:
+            # Only new or changed tenders go on to Gemini
+            work.records, entries = await asyncio.to_thread(self.ledger.filter_new, cleaned)
+            work.skipped = len(cleaned) - len(work.records)
+            CACHE_EVENTS.inc(work.skipped, cache="ingest_ledger", result="hit")
+            CACHE_EVENTS.inc(len(work.records), cache="ingest_ledger", result="miss")
+        else:
+            work.records = cleaned
+            entries = [self.ledger.entry_for(row) for row in cleaned]
+        # Indexed ids are str(RefNo) (see ChromaLoader.build_records)
+        work.ledger_entries = {str(row["RefNo"]): entry for row, entry in zip(work.records, entries)}
+        work.source_rows = work.records
+        return work
+
+    async def _enrich_stage(self, work: "_ChunkWork") -> "_ChunkWork":
+        if self.corrigenda:
+            # Linked corrigenda skip enrichment and embedding altogether
+            work.records, work.linked = await asyncio.to_thread(self.corrigenda.link, work.records)
+        logging.info(f"Enriching chunk offset={work.start_row}, size={len(work.records)}")
+        with track("ingestion", "enrichment"):
+            work.records = await self.enricher.enrich_records(work.records)
+        return work
+
+    async def _embed_stage(self, work: "_ChunkWork") -> "_ChunkWork":
+        failures = []  # (ids, error) per embedding batch that failed
+
+        def embed():
+            return self.loader.embed_records(*self.loader.build_records(work.records), failures=failures)
+
+        with track("ingestion", "embedding"):
+            work.batches = await asyncio.to_thread(embed)
+        if work.linked:
+            work.batches.append(self.loader.build_child_records(work.linked))
+            for row, parent_id, _ in work.linked:
+                # A corrigendum reusing its parent's RefNo is indexed under its own child id
+                ref, linked_id = str(row["RefNo"]), child_id(row, parent_id)
+                if linked_id != ref and ref in work.ledger_entries:
+                    entry = work.ledger_entries.pop(ref)
+                    work.ledger_entries[linked_id] = entry[:4] + (linked_id,) + entry[5:]
+            work.linked = []
+
+        # Record-level failures: build_records skips rows whose enrichment errored,
+        # embed_records skips batches whose embedding call failed
+        failed = [r for r in work.records if "error" in r]
+        if failed:
+            by_ref = {str(r["RefNo"]): r for r in work.source_rows}
+            await asyncio.to_thread(
+                self.dead_letters.add, [by_ref.get(str(r["RefNo"]), r) for r in failed], "enrich", None,
+                self.original_input_file, [str(r["error"]) for r in failed]
+            )
+        if failures:
+            by_ref = {str(r["RefNo"]): r for r in work.source_rows}
+            for ids, error in failures:
+                rows = [by_ref[i] for i in ids if i in by_ref]
+                await asyncio.to_thread(self.dead_letters.add, rows, "embed", error, self.original_input_file)
+
+        work.records = []  # Not needed past this point; free memory early
+        return work
+
+    async def _upsert_stage(self, work: "_ChunkWork") -> "_ChunkWork":
+        with track("ingestion", "upsert"):
+            for batch in work.batches:
+                work.indexed += await asyncio.to_thread(self.loader.upsert, *batch)
+                # Ledger only learns about records that actually made it into the index
+                entries = [work.ledger_entries[i] for i in batch[0] if i in work.ledger_entries]
+                await asyncio.to_thread(self.ledger.mark_indexed, entries)
+                # Anything dead-lettered by an earlier run is now recovered
+                await asyncio.to_thread(self.dead_letters.resolve, [e[0] for e in entries])
+        work.batches = []
+        return work
+
+    async def _report_chunk(self, work: "_ChunkWork", pbar):
+        chunk_duration = time.time() - work.started_at
+        if work.error:
+            last_log = f"Chunk {work.start_row}-{work.end_row} failed ({work.error})"
+        else:
+            last_log = f"Processed chunk {work.start_row}-{work.end_row} in {chunk_duration:.2f}s"
+            if work.skipped:
+                last_log += f" ({work.skipped} unchanged, skipped)"
+            logging.info(f"Chunk finished in {chunk_duration:.2f}s")
+
+        # Update progress bar
+        pbar.update(work.end_row - work.start_row)
+
+        # Callback Update
+        if self.progress_callback:
+            await self.progress_callback({
+                "status": "processing",
+                "current": work.end_row,
+                "total": self.total_records or 0, # Unknown until a streamed upload completes
+                "last_log": last_log,
+                "indexed_delta": work.indexed
+            })
+
+        # SAVE CHECKPOINT (row count + byte offset of the next record, when reading a file)
+        self._save_checkpoint(work.end_row, work.end_byte)
+
+
+class _ChunkWork:
+    """
+    A chunk of records moving through the ingestion stages.
+    """
+
+    def __init__(self, seq: int, start_row: int, end_row: int, records: List[Dict[str, Any]], end_byte: int = None):
+        self.seq = seq
+        self.start_row = start_row
+        self.end_row = end_row
+        self.end_byte = end_byte
+        self.records = records
+        self.source_rows = records  # Input rows (cleaned once past the clean stage), for dead-lettering
+        self.batches = []  # (ids, embeddings, metadatas, documents) ready for upsert
+        self.indexed = 0
+        self.skipped = 0  # Unchanged since the last run (ingestion ledger)
+        self.ledger_entries = {}
+        self.linked = []  # Corrigenda linked to an indexed parent: (row, parent_id, parent record)
+        self.error = None
+        self.started_at = time.time()
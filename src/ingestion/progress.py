@@ -0,0 +1,87 @@
+import json
+import asyncio
+import logging
+from typing import Dict, Any, AsyncIterator
+
+
+class ProgressBroadcaster:
+    """
+    Push-based ingestion progress.
+
+    Holds the latest ingestion state (including an incrementally maintained
+    index count) and fans every update out to subscribers, e.g. SSE streams.
+    Dashboards read this state instead of querying Chroma.
+    """
+
+    def __init__(self, chroma_count: int = 0, max_pending: int = 100):
+        self.state: Dict[str, Any] = {
+            "status": "idle",
+            "progress": 0,
+            "total": 0,
+            "current_offset": 0,
+            "last_log": "",
+            "chroma_count": chroma_count
+        }
+        self.max_pending = max_pending
+        self._subscribers = set()
+
+    def set_count(self, count: int):
+        self.publish({"chroma_count": count})
+
+    def publish(self, update: Dict[str, Any]):
+        """
+        Merges an update into the state and pushes a snapshot to every subscriber.
+        `indexed_delta` (records newly added to the index) is folded into chroma_count.
+        """
+        update = dict(update)
+        delta = update.pop("indexed_delta", 0) or 0
+        if delta:
+            self.state["chroma_count"] += delta
+        self.state.update(update)
+
+        total = self.state.get("total") or 0
+        if total > 0 and "current_offset" in update:
+            self.state["progress"] = min(round((self.state["current_offset"] / total) * 100, 1), 100)
+
+        snapshot = dict(self.state)
+        for queue in list(self._subscribers):
+            if queue.full():
+                # Slow client: drop its oldest snapshot, only the latest matters
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(snapshot)
+
+    async def progress_callback(self, data: Dict[str, Any]):
+        """
+        Adapter for IngestionPipeline(progress_callback=...).
+        """
+        update = {
+            "status": data["status"],
+            "current_offset": data["current"],
+            "total": data["total"],
+            "last_log": data["last_log"],
+        }
+        if "indexed_delta" in data:
+            update["indexed_delta"] = data["indexed_delta"]
+        self.publish(update)
+
+    async def subscribe(self, keepalive: float = 15.0) -> AsyncIterator[str]:
+        """
+        Yields Server-Sent Events: the current state first, then every update.
+        Emits a comment line as keep-alive when idle.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_pending)
+        self._subscribers.add(queue)
+        logging.info(f"Progress subscriber connected ({len(self._subscribers)} active).")
+        try:
+            yield f"data: {json.dumps(self.state)}\n\n"
+            while True:
+                try:
+                    snapshot = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                    yield f"data: {json.dumps(snapshot)}\n\n"
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            self._subscribers.discard(queue)
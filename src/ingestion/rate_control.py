@@ -0,0 +1,345 @@
+import os
+import re
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from src.ingestion.rate_limiter import SharedRateLimiter, RateLimitWaitExceeded
+from src.monitoring.metrics import REGISTRY
+
+RATE_EVENTS = REGISTRY.counter(
+    "tenders_gemini_rate_events_total",
+    "Gemini rate-control events per lane (throttled, retry, decrease).",
+    ("lane", "event"),
+)
+
+# Seconds a call may take before it counts as a congestion signal, per lane (per tender for packed calls)
+DEFAULT_LATENCY_TARGETS = {"generate": 15.0, "generate_packed": 15.0, "embed": 10.0}
+
+_RETRY_DELAY_PATTERNS = (
+    re.compile(r"retry[_ ]?delay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", re.IGNORECASE),  # RetryInfo detail
+    re.compile(r"retry in (\d+(?:\.\d+)?)\s*s", re.IGNORECASE),  # "Please retry in 31.2s."
+)
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    # google.genai APIError has .code, google.api_core exceptions have .code (or .grpc_status_code)
+    for attr in ("code", "status_code"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    if _status_code(error) == 429:
+        return True
+    message = str(error)
+    return "429" in message or "RESOURCE_EXHAUSTED" in message or "ResourceExhausted" in type(error).__name__
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Worth retrying: rate limits, 5xx, timeouts and dropped connections. Bad requests are not.
+    """
+    if is_rate_limited(error) or isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    code = _status_code(error)
+    if code is not None:
+        return code >= 500
+    message = str(error)
+    return any(s in message for s in ("500", "502", "503", "504", "UNAVAILABLE", "DEADLINE_EXCEEDED"))
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """
+    Server-requested wait: a Retry-After header, or Gemini's RetryInfo delay in the error details.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        try:
+            value = headers.get("retry-after") or headers.get("Retry-After")
+            if value:
+                return float(value)
+        except (TypeError, ValueError):
+            pass
+    message = str(error)
+    for pattern in _RETRY_DELAY_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class _Lane:
+    """
+    AIMD concurrency window for one kind of call. Usable from the event loop and from threads.
+    """
+
+    def __init__(self, name: str, initial: float, min_limit: float, max_limit: float, latency_target: float):
+        self.name = name
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self.blocked_until = 0.0  # Retry-After: nothing starts before this (time.monotonic())
+        self.last_decrease = 0.0
+        self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
+        self.waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    @property
+    def capacity(self) -> int:
+        return max(1, int(self.limit))
+
+    def _try_enter(self) -> float:
+        """
+        Caller holds the lock. Takes a slot and returns 0, or returns how long a Retry-After block lasts.
+        """
+        blocked = self.blocked_until - time.monotonic()
+        if blocked > 0:
+            return blocked
+        if self.in_flight < self.capacity:
+            self.in_flight += 1
+            return 0.0
+        return -1.0  # Window full: wait for a release
+
+    async def enter(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self.lock:
+                wait = self._try_enter()
+                if wait == 0.0:
+                    return
+                future = None
+                if wait < 0:
+                    future = loop.create_future()
+                    self.waiters.append((loop, future))
+            if future is None:
+                await asyncio.sleep(wait)
+                continue
+            try:
+                # Timeout guards against a wake-up lost between threads
+                await asyncio.wait_for(future, timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self.lock:
+                    if (loop, future) in self.waiters:
+                        self.waiters.remove((loop, future))
+
+    def enter_sync(self, deadline: Optional[float] = None) -> bool:
+        """
+        Takes a slot; False (and no slot) if none frees up before `deadline` (time.monotonic()).
+        """
+        with self.lock:
+            while True:
+                wait = self._try_enter()
+                if wait == 0.0:
+                    return True
+                timeout = wait if wait > 0 else 1.0
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    timeout = min(timeout, remaining)
+                self.cond.wait(timeout=timeout)
+
+    def _wake(self):
+        # Caller holds the lock. Waiters re-check the window themselves.
+        self.cond.notify_all()
+        for loop, future in self.waiters:
+            loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+        self.waiters = []
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+            self._wake()
+
+    def on_success(self, latency: float, size: float = 1.0):
+        with self.lock:
+            if latency > self.latency_target * size:
+                self._decrease("slow")
+                return
+            # Additive increase: about +1 per window's worth of successful calls
+            before = self.capacity
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            if self.capacity > before:
+                self._wake()
+
+    def on_rate_limited(self, wait: Optional[float]):
+        with self.lock:
+            self._decrease("throttled")
+            if wait:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + wait)
+
+    def _decrease(self, reason: str):
+        # Multiplicative decrease, at most once per cooldown: one burst of 429s is one congestion event
+        now = time.monotonic()
+        if now - self.last_decrease < 1.0:
+            return
+        self.last_decrease = now
+        self.limit = max(self.min_limit, self.limit / 2.0)
+        RATE_EVENTS.inc(lane=self.name, event="decrease")
+        logging.info(f"Gemini {self.name} concurrency reduced to {self.capacity} ({reason})")
+
+
+class AdaptiveRateController:
+    """
+    Rate control for every Gemini call in the process (enrichment, embeddings, search intent, chat).
+
+    Each lane ("generate", "generate_packed", "embed") has an AIMD concurrency window: it grows by ~1 per window
+    of successful calls and halves on a 429 or when calls get slower than the lane's latency
+    target, so throughput settles right under the quota ceiling instead of bursting into
+    rejections. Retry-After / RetryInfo delays are honoured (and pushed into the shared token
+    buckets, so other processes back off too); other transient errors are retried with
+    exponential backoff and full jitter.
+
+    Interactive calls (priority="interactive": search intent, query embeddings, chat) get their
+    own lanes, so they never queue behind a bulk window, and priority on the shared buckets (see
+    SharedRateLimiter). Give them a `max_wait`: a call that cannot start (or retry) within it
+    fails fast with RateLimitWaitExceeded instead of waiting out the ingestion backlog.
+
+    Configure with GEMINI_CONCURRENCY (initial window, default 8), GEMINI_MAX_CONCURRENCY
+    (default 64), GEMINI_MAX_RETRIES (default 5) and GEMINI_LATENCY_TARGET (seconds, all lanes).
+    """
+
+    def __init__(self, limiter: Optional[SharedRateLimiter] = None, initial: float = None, max_limit: float = None,
+                 max_retries: int = None, base_delay: float = 1.0, max_delay: float = 60.0,
+                 latency_targets: Dict[str, float] = None):
+        self.limiter = limiter
+        self.initial = initial or float(os.getenv("GEMINI_CONCURRENCY", "8"))
+        self.max_limit = max_limit or float(os.getenv("GEMINI_MAX_CONCURRENCY", "64"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("GEMINI_MAX_RETRIES", "5"))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.latency_targets = dict(DEFAULT_LATENCY_TARGETS)
+        if os.getenv("GEMINI_LATENCY_TARGET"):
+            self.latency_targets = {k: float(os.getenv("GEMINI_LATENCY_TARGET")) for k in self.latency_targets}
+        self.latency_targets.update(latency_targets or {})
+        self._lanes: Dict[str, _Lane] = {}
+        self._lanes_lock = threading.Lock()
+
+    def lane(self, name: str, priority: str = "bulk") -> _Lane:
+        key = name if priority == "bulk" else f"{name}:{priority}"
+        with self._lanes_lock:
+            if key not in self._lanes:
+                self._lanes[key] = _Lane(key, min(self.initial, self.max_limit), 1.0, self.max_limit,
+                                         self.latency_targets.get(name, 15.0))
+            return self._lanes[key]
+
+    def _backoff(self, attempt: int, error: BaseException, lane: _Lane) -> float:
+        """
+        Handles a failed attempt; returns the delay before the next one.
+        """
+        wait = retry_after(error) if is_rate_limited(error) else None
+        if is_rate_limited(error):
+            RATE_EVENTS.inc(lane=lane.name, event="throttled")
+            lane.on_rate_limited(wait)
+            if wait and self.limiter:
+                # Make every process sharing the buckets wait it out, not just this one
+                self.limiter.drain(wait, "embed_requests" if lane.name.startswith("embed") else "requests")
+        RATE_EVENTS.inc(lane=lane.name, event="retry")
+        if wait:
+            # Server told us when; a little jitter so callers do not all return at once
+            return wait + random.uniform(0, self.base_delay)
+        # Full jitter: uniform over the exponential window
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    @staticmethod
+    def _past_deadline(deadline: Optional[float], delay: float = 0.0) -> bool:
+        return deadline is not None and time.monotonic() + delay > deadline
+
+    async def run(self, lane_name: str, fn: Callable[[], Awaitable[Any]], max_retries: int = None,
+                  priority: str = "bulk", max_wait: float = None, size: float = 1.0, **amounts: float) -> Any:
+        """
+        Awaits `fn()` (a fresh coroutine per attempt) inside the lane's window. `amounts` are
+        taken from the shared token buckets per attempt (e.g. requests=1, tokens=900).
+        `size` is the work in one call (e.g. tenders in a packed call); it scales the latency target.
+        The last error is raised once retries are exhausted or the error is not transient;
+        RateLimitWaitExceeded once waiting for a slot or quota would exceed `max_wait` seconds.
+        """
+        lane = self.lane(lane_name, priority)
+        retries = self.max_retries if max_retries is None else max_retries
+        deadline = time.monotonic() + max_wait if max_wait is not None else None
+        attempt = 0
+        while True:
+            if deadline is None:
+                await lane.enter()
+            else:
+                try:
+                    await asyncio.wait_for(lane.enter(), timeout=max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    raise RateLimitWaitExceeded(f"No Gemini {lane_name} slot within {max_wait}s") from None
+            try:
+                if self.limiter:
+                    await self.limiter.acquire(priority, deadline, **amounts)
+                start = time.monotonic()
+                result = await fn()
+                lane.on_success(time.monotonic() - start, size)
+                return result
+            except Exception as e:
+                if isinstance(e, RateLimitWaitExceeded) or attempt >= retries or not is_transient(e):
+                    raise
+                delay = self._backoff(attempt, e, lane)
+                if self._past_deadline(deadline, delay):
+                    raise
+            finally:
+                lane.leave()
+            logging.warning(f"Gemini {lane_name} call failed (attempt {attempt + 1}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def run_sync(self, lane_name: str, fn: Callable[[], Any], max_retries: int = None,
+                 priority: str = "bulk", max_wait: float = None, size: float = 1.0, **amounts: float) -> Any:
+        """
+        Blocking variant of run() for synchronous callers (embedding batches run in threads).
+        """
+        lane = self.lane(lane_name, priority)
+        retries = self.max_retries if max_retries is None else max_retries
+        deadline = time.monotonic() + max_wait if max_wait is not None else None
+        attempt = 0
+        while True:
+            if not lane.enter_sync(deadline):
+                raise RateLimitWaitExceeded(f"No Gemini {lane_name} slot within {max_wait}s")
+            try:
+                if self.limiter:
+                    self.limiter.acquire_sync(priority, deadline, **amounts)
+                start = time.monotonic()
+                result = fn()
+                lane.on_success(time.monotonic() - start, size)
+                return result
+            except Exception as e:
+                if isinstance(e, RateLimitWaitExceeded) or attempt >= retries or not is_transient(e):
+                    raise
+                delay = self._backoff(attempt, e, lane)
+                if self._past_deadline(deadline, delay):
+                    raise
+            finally:
+                lane.leave()
+            logging.warning(f"Gemini {lane_name} call failed (attempt {attempt + 1}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+
+_controller: Optional[AdaptiveRateController] = None
+_controller_lock = threading.Lock()
+
+
+def get_rate_controller() -> AdaptiveRateController:
+    """
+    The process-wide controller (one AIMD window per lane for everything in the process),
+    using the shared token buckets from GEMINI_RPM / GEMINI_TPM / GEMINI_EMBED_RPM when set.
+    """
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdaptiveRateController(SharedRateLimiter.from_env())
+        return _controller
@@ -0,0 +1,163 @@
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+
+DEFAULT_RATE_LIMIT_DB = "data/rate_limits.db"
+PRIORITIES = ("bulk", "interactive")
+
+
+class RateLimitWaitExceeded(Exception):
+    """
+    The quota would not fit before the caller's deadline. Not retried.
+    """
+
+
+class SharedRateLimiter:
+    """
+    Token buckets shared by every process on the host (API, job workers, sharded
+    ingestion workers). Bucket levels live in a small SQLite file, so the file itself
+    is the coordinator: an acquire is one short IMMEDIATE transaction, no extra service.
+
+    Buckets are refilled continuously at `rate` units/s up to `capacity`:
+      - requests:       Gemini generate calls (GEMINI_RPM)
+      - tokens:         estimated prompt + output tokens (GEMINI_TPM)
+      - embed_requests: embedding calls (GEMINI_EMBED_RPM)
+    Acquiring from a bucket that is not configured is free.
+
+    Interactive callers (search, chat) have priority over bulk ones (ingestion): bulk
+    acquires must leave `reserve` of each bucket's capacity (GEMINI_INTERACTIVE_RESERVE,
+    default 0.2) untouched, and only bulk callers are held back by a drain.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]], db_path: str = None, reserve: float = None):
+        """
+        limits: bucket name -> (rate per second, capacity).
+        """
+        self.limits = limits
+        self.reserve = reserve if reserve is not None else float(os.getenv("GEMINI_INTERACTIVE_RESERVE", "0.2"))
+        self.db_path = db_path or os.getenv("RATE_LIMIT_DB", DEFAULT_RATE_LIMIT_DB)
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, level REAL, updated REAL)")
+            # Files created before drains were bulk-only lack this column
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(buckets)")}
+            if "blocked_until" not in columns:
+                try:
+                    conn.execute("ALTER TABLE buckets ADD COLUMN blocked_until REAL")
+                except sqlite3.OperationalError:
+                    pass  # Added by another process meanwhile
+
+    @classmethod
+    def from_env(cls) -> Optional["SharedRateLimiter"]:
+        """
+        Builds the limiter from GEMINI_RPM / GEMINI_TPM / GEMINI_EMBED_RPM. None if no limit is set.
+        """
+        per_minute = {
+            "requests": os.getenv("GEMINI_RPM"),
+            "tokens": os.getenv("GEMINI_TPM"),
+            "embed_requests": os.getenv("GEMINI_EMBED_RPM"),
+        }
+        # Refill at quota/60 per second; burst up to one minute's quota (the window Gemini enforces)
+        limits = {name: (float(v) / 60.0, float(v)) for name, v in per_minute.items() if v}
+        return cls(limits) if limits else None
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def try_acquire(self, priority: str = "bulk", **amounts: float) -> float:
+        """
+        Takes `amounts` from all named buckets atomically. Returns 0 on success,
+        otherwise the seconds to wait before the request can fit (nothing is taken).
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        bulk = priority == "bulk"
+        wanted = {n: float(a) for n, a in amounts.items() if n in self.limits and a}
+        if not wanted:
+            return 0.0
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            levels = {}
+            wait = 0.0
+            for name, amount in wanted.items():
+                rate, capacity = self.limits[name]
+                floor = capacity * self.reserve if bulk else 0.0
+                amount = wanted[name] = min(amount, capacity - floor)
+                row = conn.execute(
+                    "SELECT level, updated, blocked_until FROM buckets WHERE name = ?", (name,)
+                ).fetchone()
+                level = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+                levels[name] = level
+                if level - floor < amount:
+                    wait = max(wait, (amount + floor - level) / rate)
+                if bulk and row is not None and row[2]:
+                    wait = max(wait, row[2] - now)
+            if wait == 0.0:
+                for name, amount in wanted.items():
+                    conn.execute(
+                        "INSERT INTO buckets (name, level, updated) VALUES (?, ?, ?) "
+                        "ON CONFLICT(name) DO UPDATE SET level = excluded.level, updated = excluded.updated",
+                        (name, levels[name] - amount, now)
+                    )
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def drain(self, seconds: float, *names: str):
+        """
+        Holds bulk callers of the named buckets back for `seconds` in every process sharing
+        them (Gemini answered 429 with a retry delay). Interactive callers are not held back,
+        they only take what is left in the buckets.
+        """
+        names = [n for n in names if n in self.limits]
+        if not names:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            for name in names:
+                _, capacity = self.limits[name]
+                conn.execute(
+                    "INSERT INTO buckets (name, level, updated, blocked_until) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET blocked_until = MAX(COALESCE(blocked_until, 0), excluded.blocked_until)",
+                    (name, capacity, now, now + seconds)
+                )
+
+    @staticmethod
+    def _check_deadline(wait: float, deadline: Optional[float]):
+        if deadline is not None and time.monotonic() + wait > deadline:
+            raise RateLimitWaitExceeded(f"Gemini quota would not be available for {wait:.1f}s")
+
+    async def acquire(self, priority: str = "bulk", deadline: float = None, **amounts: float):
+        """
+        Waits (without blocking the event loop) until `amounts` fit, then takes them.
+        Raises RateLimitWaitExceeded rather than wait past `deadline` (time.monotonic()).
+        """
+        while True:
+            wait = await asyncio.to_thread(self.try_acquire, priority, **amounts)
+            if wait <= 0:
+                return
+            self._check_deadline(wait, deadline)
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self, priority: str = "bulk", deadline: float = None, **amounts: float):
+        """
+        Blocking variant for synchronous callers (e.g. embedding batches run in a thread).
+        """
+        while True:
+            wait = self.try_acquire(priority, **amounts)
+            if wait <= 0:
+                return
+            self._check_deadline(wait, deadline)
+            logging.debug(f"Rate limited, waiting {wait:.2f}s")
+            time.sleep(wait)
@@ -0,0 +1,160 @@
+import os
+import json
+import mmap
+import logging
+from typing import List, Tuple, Optional
+import numpy as np
+from src.ingestion.streaming import scan_quote_state
+
+INDEX_VERSION = 1
+
+
+class RecordIndex:
+    """
+    Byte offsets of every data record in a CSV (header excluded, blank lines skipped).
+
+    Built in one pass over a memory-mapped file: newline and quote positions are found
+    with numpy, and only lines that contain a quote are scanned in Python (quote-aware,
+    so newlines inside quoted Description fields never split a record). Saved as a
+    sidecar next to the CSV (`<csv>.offsets.npy` + `.offsets.json`) and reused while
+    the file's size and mtime are unchanged.
+
+    Gives an exact record count, O(1) seek to any record, and row ranges that
+    parallel workers can take without re-parsing the file.
+    """
+
+    def __init__(self, path: str, offsets: np.ndarray, header_end: int, file_size: int):
+        self.path = path
+        self.offsets = offsets
+        self.header_end = header_end
+        self.file_size = file_size
+
+    @property
+    def count(self) -> int:
+        return len(self.offsets)
+
+    def offset(self, row: int) -> int:
+        """
+        Byte offset where data record `row` starts (file size for row == count).
+        """
+        if row >= self.count:
+            return self.file_size
+        return int(self.offsets[row])
+
+    def ranges(self, parts: int, min_rows: int = 1, start: int = 0, end: int = None) -> List[Tuple[int, int]]:
+        """
+        Splits [start, end) (default: every record) into up to `parts` contiguous
+        (start_row, end_row) ranges of near-equal size, each at least `min_rows` long.
+        """
+        end = self.count if end is None else min(end, self.count)
+        if end <= start:
+            return []
+        parts = max(1, min(parts, (end - start) // max(1, min_rows) or 1))
+        bounds = np.linspace(start, end, parts + 1).astype(int)
+        return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+    @staticmethod
+    def sidecar_paths(path: str) -> Tuple[str, str]:
+        return f"{path}.offsets.npy", f"{path}.offsets.json"
+
+    @classmethod
+    def load_or_build(cls, path: str) -> "RecordIndex":
+        stat = os.stat(path)
+        npy_path, meta_path = cls.sidecar_paths(path)
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            if (meta.get("version") == INDEX_VERSION and meta["file_size"] == stat.st_size
+                    and meta["mtime_ns"] == stat.st_mtime_ns):
+                offsets = np.load(npy_path, mmap_mode="r")
+                return cls(path, offsets, meta["header_end"], meta["file_size"])
+        except (OSError, ValueError, KeyError):
+            pass  # Missing or stale sidecar: rebuild
+
+        index = cls.build(path)
+        index.save(stat.st_mtime_ns)
+        return index
+
+    @classmethod
+    def build(cls, path: str) -> "RecordIndex":
+        file_size = os.path.getsize(path)
+        if file_size == 0:
+            return cls(path, np.zeros(0, dtype=np.uint64), 0, 0)
+
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data = np.frombuffer(mm, dtype=np.uint8)
+            try:
+                starts = cls._record_starts(mm, data, file_size)
+            finally:
+                del data  # Release the buffer before the mmap closes
+
+        # starts[0] is the header; everything after it is data
+        header_end = int(starts[1]) if len(starts) > 1 else file_size
+        offsets = starts[1:].astype(np.uint64)
+        logging.info(f"Indexed {len(offsets)} records in {path}")
+        return cls(path, offsets, header_end, file_size)
+
+    @staticmethod
+    def _record_starts(mm: mmap.mmap, data: np.ndarray, file_size: int) -> np.ndarray:
+        newlines = np.flatnonzero(data == 0x0A)
+        quotes = np.flatnonzero(data == 0x22)
+
+        # Quote state only changes on lines that contain a quote; walk just those lines
+        open_after = np.zeros(len(newlines) + 1, dtype=bool)  # Per line: inside quotes at its end?
+        quote_lines = np.unique(np.searchsorted(newlines, quotes))
+        change_lines, change_states = [], []
+        in_quotes = False
+        for line in quote_lines:
+            start = int(newlines[line - 1]) + 1 if line > 0 else 0
+            end = int(newlines[line]) + 1 if line < len(newlines) else file_size
+            state = scan_quote_state(mm[start:end], in_quotes)
+            if state != in_quotes:
+                change_lines.append(line)
+                change_states.append(state)
+                in_quotes = state
+        if change_lines:
+            # Forward-fill: each line inherits the state of the last quote line at or before it
+            last_change = np.searchsorted(np.array(change_lines), np.arange(len(open_after)), side="right") - 1
+            states = np.array(change_states)
+            open_after = np.where(last_change >= 0, states[np.maximum(last_change, 0)], False)
+
+        # A record ends at every newline that is not inside quotes
+        ends = newlines[~open_after[:len(newlines)]]
+        starts = np.concatenate(([0], ends + 1))
+        stops = np.concatenate((ends + 1, [file_size]))
+        keep = stops > starts
+
+        # Drop blank records (e.g. "\r\n"); only short records can be blank, check those exactly
+        lengths = stops - starts
+        for i in np.flatnonzero(keep & (lengths <= 8)):
+            if not mm[int(starts[i]):int(stops[i])].strip():
+                keep[i] = False
+        return starts[keep]
+
+    def save(self, mtime_ns: Optional[int] = None):
+        """
+        Writes the sidecar (atomically). A read-only directory just means no reuse next time.
+        """
+        npy_path, meta_path = self.sidecar_paths(self.path)
+        meta = {
+            "version": INDEX_VERSION,
+            "file_size": self.file_size,
+            "mtime_ns": mtime_ns if mtime_ns is not None else os.stat(self.path).st_mtime_ns,
+            "header_end": self.header_end,
+            "count": self.count,
+        }
+        try:
+            with open(npy_path + ".tmp", "wb") as f:
+                np.save(f, np.asarray(self.offsets))
+            os.replace(npy_path + ".tmp", npy_path)
+            with open(meta_path + ".tmp", "w") as f:
+                json.dump(meta, f)
+            os.replace(meta_path + ".tmp", meta_path)
+        except OSError as e:
+            logging.warning(f"Could not write record index for {self.path}: {e}")
+
+    @classmethod
+    def remove_sidecar(cls, path: str):
+        for sidecar in cls.sidecar_paths(path):
+            if os.path.exists(sidecar):
+                os.remove(sidecar)
@@ -0,0 +1,141 @@
+import os
+import queue
+import signal
+import asyncio
+import logging
+import multiprocessing
+from typing import Dict, Any, List, Tuple, Optional
+from src.ingestion.pipeline import IngestionPipeline
+from src.ingestion.record_index import RecordIndex
+
+
+def get_process_count(processes: int = None) -> int:
+    return max(1, processes or int(os.getenv("INGEST_PROCESSES", "1")))
+
+
+def _run_range(input_file: str, api_key: Optional[str], start: int, end: int, signature: str,
+               chunk_size: int, incremental: bool, worker: int, events):
+    """
+    Worker process entry point: one IngestionPipeline over records [start, end),
+    with its own checkpoint (signature is per range).
+    """
+    logging.basicConfig(level=logging.INFO, format=f'%(asctime)s - worker {worker} - %(levelname)s - %(message)s')
+
+    async def on_progress(data: Dict[str, Any]):
+        events.put((worker, data))
+
+    pipeline = IngestionPipeline(
+        input_file=input_file, api_key=api_key, start_offset=start, end_offset=end,
+        file_signature=signature, chunk_size=chunk_size, incremental=incremental, progress_callback=on_progress
+    )
+    asyncio.run(pipeline.run())
+
+
+class ShardedIngestion:
+    """
+    Multi-process ingestion: splits the input into record ranges (via RecordIndex) and runs
+    one IngestionPipeline per range in its own process, so cleaning, JSON handling and the
+    event loop scale across cores. Gemini quota is shared through SharedRateLimiter
+    (GEMINI_RPM / GEMINI_TPM), which every worker picks up from the environment.
+    Every worker upserts on its own; the optional quantized store (QUANTIZED_STORE) holds
+    an exclusive file lock around each append, so their rows never interleave.
+
+    Each range keeps its own checkpoint; re-running with the same process count resumes every range.
+    Worker progress is merged into one view for `progress_callback` (same payload as IngestionPipeline).
+    """
+
+    def __init__(self, input_file: str, processes: int = None, api_key: str = None, file_signature: str = None,
+                 start_offset: int = 0, end_offset: int = None, chunk_size: int = 500, progress_callback=None,
+                 incremental: bool = True):
+        self.input_file = input_file
+        self.processes = get_process_count(processes)
+        self.api_key = api_key
+        self.file_signature = file_signature
+        self.start_offset = start_offset
+        self.end_offset = end_offset
+        self.chunk_size = chunk_size
+        self.progress_callback = progress_callback
+        self.incremental = incremental
+        self._ctx = multiprocessing.get_context("spawn")
+
+    async def run(self):
+        working_csv = await asyncio.to_thread(IngestionPipeline._prepare_input_file, self.input_file)
+        signature = self.file_signature or IngestionPipeline._get_file_signature(working_csv)
+        index = await asyncio.to_thread(RecordIndex.load_or_build, working_csv)
+        ranges = index.ranges(self.processes, min_rows=self.chunk_size, start=self.start_offset, end=self.end_offset)
+        total = ranges[-1][1] if ranges else 0
+        logging.info(f"Sharded ingestion of {working_csv}: {len(ranges)} workers over {total - self.start_offset} records.")
+
+        events = self._ctx.Queue()
+        workers: List[multiprocessing.Process] = []
+        for i, (start, end) in enumerate(ranges):
+            proc = self._ctx.Process(
+                target=_run_range,
+                args=(working_csv, self.api_key, start, end, f"{signature}_{start}_{end}",
+                      self.chunk_size, self.incremental, i, events),
+                name=f"ingest-range-{i}",
+                daemon=True,  # Never outlive the coordinating process
+            )
+            proc.start()
+            workers.append(proc)
+
+        # A JobManager cancel sends SIGTERM: stop the workers too (their checkpoints remain)
+        loop = asyncio.get_running_loop()
+        main_task = asyncio.current_task()
+        try:
+            loop.add_signal_handler(signal.SIGTERM, main_task.cancel)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+        try:
+            await self._collect(workers, ranges, events, total)
+        finally:
+            for proc in workers:
+                if proc.is_alive():
+                    proc.terminate()
+            for proc in workers:
+                proc.join(timeout=10)
+            try:
+                loop.remove_signal_handler(signal.SIGTERM)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        failed = [i for i, proc in enumerate(workers) if proc.exitcode != 0]
+        if failed:
+            raise RuntimeError(f"Ingestion workers {failed} failed; re-run to resume them from their checkpoints.")
+
+        if self.progress_callback:
+            await self.progress_callback({
+                "status": "completed",
+                "current": total,
+                "total": total,
+                "last_log": "Ingestion Completed Successfully."
+            })
+
+        if working_csv != self.input_file and os.path.exists(working_csv):
+            os.remove(working_csv)
+            RecordIndex.remove_sidecar(working_csv)
+
+    async def _collect(self, workers: List[multiprocessing.Process], ranges: List[Tuple[int, int]], events, total: int):
+        """
+        Merges per-worker progress events until every worker has exited.
+        """
+        done = [0] * len(ranges)
+        while True:
+            try:
+                worker, data = await asyncio.to_thread(events.get, True, 0.5)
+            except queue.Empty:
+                if not any(proc.is_alive() for proc in workers):
+                    break
+                continue
+
+            start, end = ranges[worker]
+            done[worker] = max(0, min((data.get("current") or start), end) - start)
+            if self.progress_callback:
+                await self.progress_callback({
+                    "status": "processing",
+                    "current": self.start_offset + sum(done),
+                    "total": total,
+                    "last_log": f"[worker {worker}] {data.get('last_log', '')}",
+                    "indexed_delta": data.get("indexed_delta", 0)
+                })
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional
+
+# End-of-stream marker passed down the queues (one per downstream worker)
+_DONE = object()
+
+
+class Stage:
+    """
+    One pipeline step: `fn(item) -> item` run by `workers` concurrent tasks.
+    """
+
+    def __init__(self, name: str, fn: Callable[[Any], Awaitable[Any]], workers: int = 1):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+
+
+class StagePipeline:
+    """
+    Chain of async stages connected by bounded queues (backpressure: a slow stage
+    stalls the ones before it instead of buffering the whole file in memory).
+    Every stage runs concurrently, so e.g. enrichment of chunk N+1 overlaps
+    embedding/upsert of chunk N.
+
+    A stage that raises drops that item and reports it to `on_error(item, stage_name, exc)`;
+    the rest of the stream keeps flowing. Items leaving the last stage go to `on_result(item)`.
+    Results may complete out of order when a stage has more than one worker.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 2):
+        self.stages = stages
+        self.queue_size = queue_size
+
+    async def run(self, source: AsyncIterator[Any],
+                  on_result: Callable[[Any], Awaitable[None]],
+                  on_error: Optional[Callable[[Any, str, BaseException], Awaitable[None]]] = None):
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        tasks = [asyncio.create_task(self._feed(source, queues[0], self.stages[0].workers))]
+        for i, stage in enumerate(self.stages):
+            downstream = self.stages[i + 1].workers if i + 1 < len(self.stages) else 1
+            remaining = [stage.workers]  # Last worker out forwards end-of-stream downstream
+            for _ in range(stage.workers):
+                tasks.append(asyncio.create_task(
+                    self._work(stage, queues[i], queues[i + 1], remaining, downstream, on_error)
+                ))
+        tasks.append(asyncio.create_task(self._drain(queues[-1], on_result)))
+
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    @staticmethod
+    async def _feed(source: AsyncIterator[Any], out: asyncio.Queue, consumers: int):
+        async for item in source:
+            await out.put(item)
+        for _ in range(consumers):
+            await out.put(_DONE)
+
+    @staticmethod
+    async def _work(stage: Stage, inp: asyncio.Queue, out: asyncio.Queue, remaining: List[int],
+                    consumers: int, on_error):
+        while True:
+            item = await inp.get()
+            if item is _DONE:
+                break
+            try:
+                result = await stage.fn(item)
+            except Exception as e:
+                logging.error(f"Stage '{stage.name}' failed: {e}")
+                if on_error:
+                    await on_error(item, stage.name, e)
+                continue
+            await out.put(result)
+
+        remaining[0] -= 1
+        if remaining[0] == 0:
+            for _ in range(consumers):
+                await out.put(_DONE)
+
+    @staticmethod
+    async def _drain(inp: asyncio.Queue, on_result: Callable[[Any], Awaitable[None]]):
+        while True:
+            item = await inp.get()
+            if item is _DONE:
+                return
+            await on_result(item)
@@ -0,0 +1,279 @@
+import io
+import os
+import csv
+import time
+import codecs
+import asyncio
+import hashlib
+import logging
+from typing import List, Dict, Any, AsyncIterator, Optional, Callable, Awaitable
+import pandas as pd
+
+
+def scan_quote_state(line, in_quotes: bool, quote='"', delimiter=',') -> bool:
+    """
+    Returns whether `line` ends inside a quoted field, given the state at its start.
+    Follows the CSV dialect pandas/csv use: a quote only opens a field when it is the
+    first character of the field; inside a quoted field, a doubled quote is an escape.
+    Works on str or bytes and only visits quote characters, so plain lines cost one find().
+    """
+    if isinstance(line, bytes) and isinstance(quote, str):
+        quote, delimiter = quote.encode(), delimiter.encode()
+    pos = 0
+    while True:
+        pos = line.find(quote, pos)
+        if pos < 0:
+            return in_quotes
+        if in_quotes:
+            if line[pos + 1:pos + 2] == quote:
+                pos += 2  # Escaped quote
+                continue
+            in_quotes = False
+        elif pos == 0 or line[pos - 1:pos] == delimiter:
+            in_quotes = True
+        pos += 1
+
+
+class StreamingCSVParser:
+    """
+    Incremental, quote-aware CSV parser: feed() bytes as they arrive and get back
+    every row that is complete so far. Quoted fields may span lines (a record only
+    ends on a newline outside quotes).
+
+    By default values stay text and empty cells become None. With typed=True the rows
+    of each feed() are parsed by pandas exactly like CSVRecordSource chunks (numbers,
+    booleans, NaN for gaps), so downstream stages see the same types either way. Like
+    CSVRecordSource, types are inferred per batch (see IngestionLedger.entry_for).
+    """
+
+    def __init__(self, encoding: str = "utf-8-sig", typed: bool = False):
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._partial_line = ""
+        self._record_lines: List[str] = []
+        self._open_quotes = False
+        self._header_record = ""
+        self.typed = typed
+        self.header: Optional[List[str]] = None
+        self.rows_parsed = 0
+
+    def feed(self, data: bytes) -> List[Dict[str, Any]]:
+        text = self._partial_line + self._decoder.decode(data)
+        lines = text.split("\n")
+        self._partial_line = lines.pop()  # Incomplete last line waits for more data
+        return self._consume([line + "\n" for line in lines])
+
+    def close(self) -> List[Dict[str, Any]]:
+        """
+        Flushes the trailing line (file without final newline) and any unterminated record.
+        """
+        tail = self._partial_line + self._decoder.decode(b"", final=True)
+        self._partial_line = ""
+        records = self._split([tail] if tail else [])
+        if self._record_lines:
+            records.append("".join(self._record_lines))
+            self._record_lines = []
+        return self._parse(records)
+
+    def _consume(self, lines: List[str]) -> List[Dict[str, Any]]:
+        return self._parse(self._split(lines))
+
+    def _split(self, lines: List[str]) -> List[str]:
+        records = []
+        for line in lines:
+            self._record_lines.append(line)
+            self._open_quotes = scan_quote_state(line, self._open_quotes)
+            if not self._open_quotes:
+                records.append("".join(self._record_lines))
+                self._record_lines = []
+        return records
+
+    def _parse(self, records: List[str]) -> List[Dict[str, Any]]:
+        records = [r for r in records if r.strip()]
+        if self.header is None and records:
+            self._header_record = records.pop(0)
+            self.header = next(csv.reader([self._header_record]))
+        if not records:
+            return []
+        self.rows_parsed += len(records)
+        if self.typed:
+            # Same parse as CSVRecordSource._parse; the header record carries the column names
+            text = self._header_record.rstrip("\r\n") + "\n" + "".join(records)
+            return pd.read_csv(io.StringIO(text)).to_dict(orient="records")
+        return [self._row(record) for record in records]
+
+    def _row(self, record: str) -> Dict[str, Any]:
+        values = next(csv.reader([record]))
+        row = {}
+        for i, column in enumerate(self.header):
+            value = values[i] if i < len(values) else None
+            row[column] = value if value != "" else None
+        return row
+
+
+# Bytes of the file head that go into its checkpoint signature
+SIGNATURE_HEAD_BYTES = 4096
+
+
+def file_signature(size: int, head: bytes) -> str:
+    """
+    Checkpoint signature of a file: its size and first 4KB. Uploads compute it while
+    streaming, so an upload and the same file ingested from disk share one checkpoint.
+    """
+    head_hash = hashlib.md5(head[:SIGNATURE_HEAD_BYTES]).hexdigest()
+    return hashlib.md5(f"{size}_{head_hash}".encode()).hexdigest()
+
+
+class StreamingUpload:
+    """
+    Writes an upload to disk chunk by chunk (file I/O off the event loop). While the
+    upload is still arriving, records() tails the file and yields parsed CSV rows, so
+    ingestion can start before the upload finishes.
+
+    With `expected_size` (Content-Length / UploadFile.size) the checkpoint signature is
+    known as soon as the first 4KB are in, so ingestion can checkpoint mid-upload;
+    `on_signature` is awaited once with it.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 1024 * 1024, expected_size: int = None,
+                 on_signature: Callable[[str], Awaitable[None]] = None):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.expected_size = expected_size
+        self.on_signature = on_signature
+        self.bytes_written = 0
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._head = b""
+        self._announced = False
+        self._changed = asyncio.Event()
+
+    @property
+    def signature(self) -> Optional[str]:
+        """
+        Checkpoint signature (see file_signature): once the upload is complete, or earlier
+        when its size is known up front.
+        """
+        if self.error:
+            return None
+        if self.done:
+            return file_signature(self.bytes_written, self._head)
+        if self.expected_size and (len(self._head) >= SIGNATURE_HEAD_BYTES or self.bytes_written >= self.expected_size):
+            return file_signature(self.expected_size, self._head)
+        return None
+
+    def _notify(self):
+        self._changed.set()
+
+    def _write(self, f, chunk: bytes):
+        if len(self._head) < SIGNATURE_HEAD_BYTES:
+            self._head += chunk[:SIGNATURE_HEAD_BYTES - len(self._head)]
+        f.write(chunk)
+        f.flush()
+
+    async def _announce(self):
+        signature = self.signature
+        if signature and not self._announced:
+            self._announced = True
+            if self.on_signature:
+                await self.on_signature(signature)
+
+    async def write_from(self, chunks: AsyncIterator[bytes]) -> str:
+        """
+        Consumes an async byte stream (e.g. request.stream()) into the file. Returns the checkpoint signature.
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        f = await asyncio.to_thread(open, self.path, 'wb')
+        try:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                await asyncio.to_thread(self._write, f, chunk)
+                self.bytes_written += len(chunk)
+                self._notify()
+                await self._announce()
+        except BaseException as e:
+            self.error = e
+            raise
+        finally:
+            await asyncio.to_thread(f.close)
+            self.done = True
+            self._notify()
+        if self.expected_size and self.bytes_written != self.expected_size:
+            logging.warning(f"Upload {self.path} is {self.bytes_written} bytes, expected {self.expected_size}")
+        logging.info(f"Upload complete: {self.path} ({self.bytes_written} bytes)")
+        return self.signature
+
+    async def _wait_for_data(self):
+        # Clear only after waking: a notification that raced with the last read is not lost
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=0.5)
+        except asyncio.TimeoutError:
+            pass
+        self._changed.clear()
+
+    def _is_complete(self) -> bool:
+        if self.error:
+            raise RuntimeError(f"Upload of {self.path} failed: {self.error}")
+        return self.done
+
+    def records(self) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yields CSV rows as soon as they are on disk (same process as the writer). Ends when the upload is complete.
+        """
+        return tail_csv_records(self.path, self._is_complete, self._wait_for_data, self.chunk_size)
+
+
+async def _poll(interval: float = 0.5):
+    await asyncio.sleep(interval)
+
+
+async def tail_csv_records(path: str, is_complete: Callable[[], bool],
+                           wait: Callable[[], Awaitable[None]] = _poll,
+                           chunk_size: int = 1024 * 1024, idle_timeout: float = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Tails a CSV file that may still be growing and yields parsed rows as they land.
+    `is_complete()` tells when the writer is done (it may live in another process,
+    e.g. an upload flag in the job store); `wait()` blocks until more data may be there.
+    Raises TimeoutError when no data arrives for `idle_timeout` seconds
+    (INGEST_UPLOAD_IDLE_TIMEOUT, default 300) before the writer is done.
+    Rows are typed like CSVRecordSource rows (see StreamingCSVParser).
+    """
+    if idle_timeout is None:
+        idle_timeout = float(os.getenv("INGEST_UPLOAD_IDLE_TIMEOUT", "300"))
+    parser = StreamingCSVParser(typed=True)
+    f = None
+    last_data = time.monotonic()
+    try:
+        while True:
+            # Check completion BEFORE reading, so the final read sees every byte
+            complete = is_complete()
+            if f is None and os.path.exists(path):
+                f = await asyncio.to_thread(open, path, 'rb')
+            data = await asyncio.to_thread(f.read, chunk_size) if f is not None else b""
+            if data:
+                last_data = time.monotonic()
+                for row in parser.feed(data):
+                    yield row
+            elif complete:
+                break
+            elif time.monotonic() - last_data > idle_timeout:
+                raise TimeoutError(f"Upload {path} received no data for {idle_timeout:.0f}s")
+            else:
+                await wait()
+    finally:
+        if f is not None:
+            f.close()
+
+    for row in parser.close():
+        yield row
+
+
+async def iter_upload_file(upload_file, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+    """
+    Adapts a FastAPI UploadFile into an async byte stream.
+    """
+    while True:
+        chunk = await upload_file.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from src.ingestion.ledger import IngestionLedger
+from src.ingestion.corrigenda import CorrigendumLinker, is_corrigendum, parent_title, child_id, mentioned_refs
+
+class FakeIndex:
+    """Stands in for ChromaLoader.fetch_records."""
+
+    def __init__(self, records):
+        self.records = records
+
+    def fetch_records(self, ids):
+        return {i: self.records[i] for i in ids if i in self.records}
+
+class TestCorrigendumLinker(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.ledger = IngestionLedger(os.path.join(self.tmp.name, "ledger.db"))
+        parents = [
+            {"TOT_ID": 1, "RefNo": "NIT/2024/117", "Summary": "Construction of District Hospital Building at Pune"},
+            {"TOT_ID": 2, "RefNo": "R-2", "Summary": "Supply of Solar Street Lights for Gram Panchayats",
+             "Purchaser_Name": "Zilla Parishad Nashik", "Location": "Nashik"},
+            {"TOT_ID": 3, "RefNo": "12345678", "Summary": "Supply of Office Furniture for Collectorate",
+             "Purchaser_Name": "Collector Office Satara", "Location": "Satara"},
+        ]
+        self.ledger.mark_indexed([IngestionLedger.entry_for(row) for row in parents])
+        index = FakeIndex({"NIT/2024/117": ([0.1], {"core_domain": "Healthcare"}, "doc 1"),
+                           "R-2": ([0.2], {"core_domain": "Energy"}, "doc 2")})
+        self.linker = CorrigendumLinker(self.ledger, index)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_detection_and_prefix(self):
+        self.assertTrue(is_corrigendum("CORRIGENDUM 2 to Supply of Laptops"))
+        self.assertTrue(is_corrigendum("Extension of bid date for road works"))
+        self.assertFalse(is_corrigendum("Supply of Laptops"))
+        self.assertEqual(parent_title("Corrigendum No. 1 - Supply of Laptops"), "Supply of Laptops")
+        self.assertEqual(mentioned_refs("Ref: C-10, Tender ID - 2024_ABC_1. Dates 2024-06-30"), ["C-10", "2024_ABC_1"])
+
+    def test_links_by_reference_and_by_title(self):
+        rows = [
+            {"TOT_ID": 10, "RefNo": "C-10", "Summary": "Corrigendum 1", "Description": "Date extended for NIT No. NIT/2024/117"},
+            {"TOT_ID": 11, "RefNo": "C-11", "Summary": "Corrigendum: Supply of Solar Street Light for Gram Panchayat",
+             "Purchaser_Name": "Zilla Parishad  NASHIK"},
+            {"TOT_ID": 12, "RefNo": "R-2", "Summary": "Addendum - Supply of Solar Street Lights for Gram Panchayats"},
+            {"TOT_ID": 13, "RefNo": "C-13", "Summary": "Corrigendum to Supply of Laptops for Schools"},  # No parent
+            {"TOT_ID": 14, "RefNo": "N-14", "Summary": "Supply of Laptops for Schools"},
+            # Same title, another buyer
+            {"TOT_ID": 15, "RefNo": "C-15", "Summary": "Corrigendum to Supply of Solar Street Lights for Gram Panchayats",
+             "Purchaser_Name": "Zilla Parishad Pune", "Location": "Pune"},
+            # Same title, no purchaser or location to confirm it
+            {"TOT_ID": 16, "RefNo": "C-16", "Summary": "Corrigendum to Supply of Office Furniture for Collectorate"},
+            # A bare number that happens to be an indexed id is not a reference
+            {"TOT_ID": 17, "RefNo": "C-17", "Summary": "Corrigendum 2", "Description": "Quantity revised to 12345678 units"},
+        ]
+        regular, linked = self.linker.link(rows)
+
+        self.assertEqual([r["TOT_ID"] for r in regular], [13, 14, 15, 16, 17])
+        self.assertEqual([(row["TOT_ID"], parent_id) for row, parent_id, _ in linked],
+                         [(10, "NIT/2024/117"), (11, "R-2"), (12, "R-2")])
+        self.assertEqual(linked[0][2][1], {"core_domain": "Healthcare"})
+        # A corrigendum reusing its parent's RefNo gets its own index id
+        self.assertEqual(child_id(rows[2], "R-2"), "R-2#corrigendum-12")
+        self.assertEqual(child_id(rows[1], "R-2"), "C-11")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from src.ingestion.csv_source import CSVRecordSource
+
+CSV_TEXT = (
+    '﻿TOT_ID,Summary,Amount\r\n'
+    '1,Supply of 5" pipes,100\r\n'
+    '2,"Construction of road, phase 2\nwith ""quotes""",\r\n'
+    '\r\n'
+    '3,Hospital Ward,300\r\n'
+    '4,"Multi\r\nline title",400\r\n'
+    '5,Last row without newline,500'
+)
+
+class TestCSVRecordSource(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "tenders.csv")
+        with open(self.path, "w", encoding="utf-8", newline="") as f:
+            f.write(CSV_TEXT)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_chunks_match_full_read(self):
+        expected = pd.read_csv(self.path).to_dict(orient="records")
+        chunks = list(CSVRecordSource(self.path, chunk_size=2).chunks())
+
+        self.assertEqual([(c.start_row, c.end_row) for c in chunks], [(0, 2), (2, 4), (4, 5)])
+        rows = [r for c in chunks for r in c.records]
+        self.assertEqual([r["TOT_ID"] for r in rows], [r["TOT_ID"] for r in expected])
+        self.assertEqual([r["Summary"] for r in rows], [r["Summary"] for r in expected])
+
+    def test_resume_from_byte_offset_or_row(self):
+        source = CSVRecordSource(self.path, chunk_size=2)
+        first = next(source.chunks())
+
+        by_byte = list(source.chunks(start_row=first.end_row, start_byte=first.end_byte))
+        by_row = list(source.chunks(start_row=first.end_row))
+
+        self.assertEqual([r["TOT_ID"] for c in by_byte for r in c.records], [3, 4, 5])
+        self.assertEqual([r["TOT_ID"] for c in by_row for r in c.records], [3, 4, 5])
+        self.assertEqual(by_byte[-1].end_byte, os.path.getsize(self.path))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import os
+import tempfile
+import unittest
+from src.ingestion.dead_letters import DeadLetterStore
+
+class TestDeadLetterStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = DeadLetterStore(os.path.join(self.tmp.name, "dead_letters.db"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_failures_are_kept_until_resolved(self):
+        rows = [
+            {"TOT_ID": 1, "Summary": "Road works", "DedupHash": "h1"},
+            {"TOT_ID": 2, "Summary": "Hospital", "DedupHash": "h2"},
+        ]
+        self.store.add(rows, "embed", "embed down", source="tenders.csv")
+        self.store.add([dict(rows[0], error="429 quota")], "enrich", None, errors=["429 quota"])
+
+        self.assertEqual(self.store.summary(), {"embed": 1, "enrich": 1})
+        pending = dict(self.store.pending())
+        self.assertEqual(pending["tot:1"], rows[0])  # Replayable input, not the enrichment error
+        self.assertEqual([key for key, _ in self.store.pending(stage="embed")], ["tot:2"])
+
+        self.assertEqual(self.store.resolve(["tot:1", "tot:99"]), 1)
+        self.assertEqual(self.store.summary(), {"embed": 1})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import sys
+import tempfile
+import subprocess
+import unittest
+from unittest import mock
+from src.ingestion.jobs import JobStore, JobManager, run_job
+from src.ingestion.progress import ProgressBroadcaster
+
+class TestJobStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = JobStore(os.path.join(self.tmp.name, "jobs.db"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_claim_and_transitions(self):
+        first = self.store.create("a.csv", file_signature="sig-a")
+        second = self.store.create("b.csv", streaming=True)
+
+        claimed = self.store.claim_next()
+        self.assertEqual(claimed["id"], first)
+        self.assertEqual(claimed["status"], "running")
+        self.assertFalse(self.store.get(second)["upload_complete"])
+
+        # Only failed/cancelled jobs can be resumed
+        self.assertFalse(self.store.transition(first, ["failed", "cancelled"], "queued"))
+        self.assertTrue(self.store.transition(first, ["running"], "failed"))
+        self.assertTrue(self.store.transition(first, ["failed", "cancelled"], "queued"))
+
+        self.store.complete_upload(second, "sig-b")
+        self.assertEqual(self.store.get(second)["file_signature"], "sig-b")
+
+    def test_interrupted_jobs_are_requeued(self):
+        dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+        dead_pid = int(dead.stdout)
+
+        job_id = self.store.create("a.csv")
+        self.store.claim_next()
+        self.store.update(job_id, pid=dead_pid)
+        live_id = self.store.create("b.csv")
+        self.store.claim_next()
+        self.store.update(live_id, pid=os.getpid())  # Worker of another API process, still running
+        upload_id = self.store.create("c.csv", streaming=True)
+        self.store.claim_next()
+        self.store.update(upload_id, pid=dead_pid)
+
+        self.assertEqual(self.store.requeue_interrupted(), 1)
+        self.assertEqual(self.store.get(job_id)["status"], "queued")
+        self.assertEqual(self.store.get(live_id)["status"], "running")
+        # The upload can never complete: failed, and not resumable
+        self.assertEqual(self.store.get(upload_id)["status"], "failed")
+        self.assertFalse(JobManager(self.store).resume(upload_id))
+
+        # Claimed moments ago, worker pid not recorded yet
+        fresh_id = self.store.create("d.csv")
+        self.store.claim_next()
+        self.assertEqual(self.store.requeue_interrupted(), 0)
+        self.assertEqual(self.store.requeue_interrupted(grace=0), 1)
+        self.assertEqual(self.store.get(fresh_id)["status"], "queued")
+
+    def test_progress_is_published_as_deltas(self):
+        progress = ProgressBroadcaster(chroma_count=10)
+        manager = JobManager(self.store, progress=progress)
+        job_id = self.store.create("a.csv")
+
+        self.assertFalse(manager._publish(self.store.list()))
+        self.store.claim_next()
+        self.store.record_progress(job_id, 50, 100, "Processed chunk 0-50", indexed_delta=40)
+        manager._publish(self.store.list())
+        self.assertEqual(progress.state["chroma_count"], 50)
+        self.assertEqual(progress.state["progress"], 50.0)
+
+        self.store.transition(job_id, ["running"], "completed")
+        self.assertTrue(manager._publish(self.store.list()))
+
+        # Once a finished job leaves the listing its state is forgotten
+        manager._publish([])
+        self.assertNotIn(job_id, manager._seen)
+
+    def test_worker_stops_when_cancelled_elsewhere(self):
+        job_id = self.store.create("a.csv")
+        self.store.claim_next()
+        chunks = []
+
+        class FakePipeline:
+            def __init__(self, progress_callback=None, **kwargs):
+                self.progress_callback = progress_callback
+
+            async def run(inner):
+                for end in (50, 100, 150):
+                    chunks.append(end)
+                    await inner.progress_callback({"current": end, "total": 150, "last_log": f"Chunk {end}"})
+                    # Another API process cancels the job after the first chunk
+                    self.store.transition(job_id, ["running"], "cancelled")
+
+        with mock.patch("src.ingestion.pipeline.IngestionPipeline", FakePipeline), \
+             mock.patch.dict(os.environ, {"INGEST_PROCESSES": "1"}):
+            run_job(job_id, self.store.db_path)
+
+        self.assertEqual(chunks, [50, 100])  # Stopped at the next chunk boundary
+        job = self.store.get(job_id)
+        self.assertEqual((job["status"], job["current"]), ("cancelled", 100))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from src.ingestion.ledger import IngestionLedger
+from src.ingestion.csv_source import CSVRecordSource
+from src.ingestion.streaming import StreamingCSVParser
+
+class TestIngestionLedger(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.ledger = IngestionLedger(os.path.join(self.tmp.name, "ledger.db"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_only_new_or_changed_rows_pass(self):
+        rows = [
+            {"TOT_ID": 1, "Summary": "Road works", "DedupHash": "h1"},
+            {"TOT_ID": 2, "Summary": "Hospital", "DedupHash": "h2"},
+            {"TOT_ID": None, "Summary": "No id", "DedupHash": "h3"},
+        ]
+        fresh, entries = self.ledger.filter_new(rows)
+        self.assertEqual(len(fresh), 3)
+        self.ledger.mark_indexed(entries)
+
+        next_run = [
+            {"TOT_ID": 1.0, "Summary": "Road works", "DedupHash": "h1"},  # Same row, float-inferred id
+            {"TOT_ID": 2, "Summary": "Hospital (amended)", "DedupHash": "h2"},
+            {"TOT_ID": float("nan"), "Summary": "No id", "DedupHash": "h3"},
+            {"TOT_ID": 4, "Summary": "New tender", "DedupHash": "h4"},
+        ]
+        fresh, _ = self.ledger.filter_new(next_run)
+        self.assertEqual([r["Summary"] for r in fresh], ["Hospital (amended)", "New tender"])
+        self.assertEqual(self.ledger.count(), 3)
+
+    def test_other_index_target_counts_as_new(self):
+        rows = [{"TOT_ID": 1, "Summary": "Road works", "DedupHash": "h1"}]
+        path = os.path.join(self.tmp.name, "targets.db")
+        old = IngestionLedger(path, target="tenders_v1|flat|3072")
+        old.mark_indexed(old.filter_new(rows)[1])
+        self.assertEqual(old.filter_new(rows)[0], [])
+
+        # Rebuilt at 768 dims: the new collection is empty, so the row must be indexed again
+        rebuilt = IngestionLedger(path, target="tenders_v1|flat|768")
+        fresh, entries = rebuilt.filter_new(rows)
+        self.assertEqual(len(fresh), 1)
+        rebuilt.mark_indexed(entries)
+        self.assertEqual(rebuilt.filter_new(rows)[0], [])
+
+    def test_parsed_and_streamed_rows_fingerprint_alike(self):
+        path = os.path.join(self.tmp.name, "tenders.csv")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(
+                'TOT_ID,Summary,Amount,Rate,Closed,Purchaser_Name\n'
+                '1,Road works,100,2.5,True,City Council\n'
+                '2,"Hospital, ward 3",,0.125,false,\n'
+                '0003,Bridge,300.0,7,TRUE,Port Trust\n'
+            )
+        parsed = [r for c in CSVRecordSource(path).chunks() for r in c.records]
+        parser = StreamingCSVParser()
+        with open(path, "rb") as f:
+            streamed = parser.feed(f.read()) + parser.close()
+
+        self.assertEqual(len(parsed), 3)
+        self.assertEqual([IngestionLedger.entry_for(r) for r in parsed],
+                         [IngestionLedger.entry_for(r) for r in streamed])
+
+if __name__ == '__main__':
+    unittest.main()
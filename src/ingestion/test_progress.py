@@ -0,0 +1,31 @@
+import json
+import asyncio
+import unittest
+from src.ingestion.progress import ProgressBroadcaster
+
+class TestProgressBroadcaster(unittest.TestCase):
+
+    def test_incremental_count_and_push(self):
+        async def run():
+            progress = ProgressBroadcaster(chroma_count=100)
+            stream = progress.subscribe()
+
+            first = json.loads((await stream.__anext__())[len("data: "):])
+            await progress.progress_callback({
+                "status": "processing", "current": 500, "total": 1000,
+                "last_log": "Processed chunk 0-500", "indexed_delta": 480
+            })
+            second = json.loads((await stream.__anext__())[len("data: "):])
+            await stream.aclose()
+            return progress, first, second
+
+        progress, first, second = asyncio.run(run())
+
+        self.assertEqual(first["chroma_count"], 100)
+        self.assertEqual(second["chroma_count"], 580)
+        self.assertEqual(second["progress"], 50.0)
+        self.assertEqual(second["last_log"], "Processed chunk 0-500")
+        self.assertEqual(len(progress._subscribers), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import time
+import asyncio
+import unittest
+from src.ingestion.rate_control import AdaptiveRateController, retry_after, is_transient
+from src.ingestion.rate_limiter import RateLimitWaitExceeded
+
+class QuotaError(Exception):
+    code = 429
+
+class TestAdaptiveRateController(unittest.TestCase):
+
+    def test_throttling_halves_window_and_honours_retry_after(self):
+        controller = AdaptiveRateController(initial=8, max_limit=16, max_retries=3, base_delay=0.01)
+        calls = []
+
+        async def call():
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                raise QuotaError("429 RESOURCE_EXHAUSTED. Please retry in 0.2s.")
+            return "ok"
+
+        self.assertEqual(asyncio.run(controller.run("generate", call)), "ok")
+        self.assertGreaterEqual(calls[1] - calls[0], 0.2)
+        lane = controller.lane("generate")
+        self.assertEqual(lane.capacity, 4)  # 8 -> 4, plus a fraction from the success
+        self.assertEqual(lane.in_flight, 0)
+
+    def test_successes_grow_window_additively(self):
+        controller = AdaptiveRateController(initial=2, max_limit=4)
+        for _ in range(20):
+            controller.run_sync("embed", lambda: None)
+        self.assertEqual(controller.lane("embed").capacity, 4)  # Capped at max_limit
+
+    def test_latency_target_scales_with_call_size(self):
+        controller = AdaptiveRateController(initial=8, max_limit=8, latency_targets={"generate_packed": 0.01})
+
+        async def slow():
+            await asyncio.sleep(0.03)
+
+        asyncio.run(controller.run("generate_packed", slow, size=10))  # 10 tenders: not slow
+        self.assertEqual(controller.lane("generate_packed").capacity, 8)
+        asyncio.run(controller.run("generate_packed", slow))
+        self.assertEqual(controller.lane("generate_packed").capacity, 4)
+
+    def test_window_bounds_concurrency(self):
+        controller = AdaptiveRateController(initial=2, max_limit=2)
+        active, peak = [0], [0]
+
+        async def call():
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.01)
+            active[0] -= 1
+
+        async def main():
+            await asyncio.gather(*(controller.run("generate", call) for _ in range(10)))
+
+        asyncio.run(main())
+        self.assertEqual(peak[0], 2)
+
+    def test_non_transient_errors_are_not_retried(self):
+        controller = AdaptiveRateController(max_retries=5, base_delay=0.01)
+        calls = []
+
+        def call():
+            calls.append(1)
+            raise ValueError("400 INVALID_ARGUMENT")
+
+        with self.assertRaises(ValueError):
+            controller.run_sync("generate", call)
+        self.assertEqual(len(calls), 1)
+
+    def test_error_classification(self):
+        self.assertEqual(retry_after(Exception("{'@type': 'RetryInfo', 'retryDelay': '31s'}")), 31.0)
+        self.assertIsNone(retry_after(Exception("boom")))
+        self.assertTrue(is_transient(Exception("503 UNAVAILABLE")))
+        self.assertTrue(is_transient(QuotaError("quota")))
+
+    def test_interactive_calls_do_not_wait_past_max_wait(self):
+        controller = AdaptiveRateController(initial=1, max_limit=1, max_retries=5, base_delay=0.01)
+        calls = []
+
+        def throttled():
+            calls.append(1)
+            raise QuotaError("429 RESOURCE_EXHAUSTED. Please retry in 30s.")
+
+        start = time.monotonic()
+        with self.assertRaises(QuotaError):
+            controller.run_sync("generate", throttled, priority="interactive", max_wait=1)
+        self.assertEqual(len(calls), 1)  # The retry delay alone exceeds max_wait
+
+        async def main():
+            # Interactive lane is still blocked by that Retry-After; the bulk lane is separate
+            with self.assertRaises(RateLimitWaitExceeded):
+                await controller.run("generate", lambda: asyncio.sleep(0), priority="interactive", max_wait=0.2)
+            await controller.run("generate", lambda: asyncio.sleep(0))
+
+        asyncio.run(main())
+        self.assertLess(time.monotonic() - start, 2)
+
+if __name__ == '__main__':
+    unittest.main()
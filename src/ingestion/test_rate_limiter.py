@@ -0,0 +1,62 @@
+import os
+import time
+import asyncio
+import tempfile
+import unittest
+from src.ingestion.rate_limiter import SharedRateLimiter, RateLimitWaitExceeded
+
+class TestSharedRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "limits.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_buckets_are_shared_between_instances(self):
+        # 60 requests/min burst, 1000 tokens/min burst; two "processes" share the same file
+        limits = {"requests": (1.0, 60.0), "tokens": (1000 / 60, 1000.0)}
+        worker_a = SharedRateLimiter(limits, self.db_path, reserve=0)
+        worker_b = SharedRateLimiter(limits, self.db_path, reserve=0)
+
+        self.assertEqual(worker_a.try_acquire(requests=1, tokens=600), 0.0)
+        # Token budget is now short for B; nothing is taken when it has to wait
+        wait = worker_b.try_acquire(requests=1, tokens=600)
+        self.assertGreater(wait, 10)
+        self.assertEqual(worker_b.try_acquire(requests=1, tokens=300), 0.0)
+
+    def test_unconfigured_buckets_are_free(self):
+        limiter = SharedRateLimiter({"requests": (1.0, 1.0)}, self.db_path)
+        self.assertEqual(limiter.try_acquire(embed_requests=1000), 0.0)
+        self.assertEqual(limiter.try_acquire(requests=1), 0.0)
+        self.assertGreater(limiter.try_acquire(requests=1), 0.0)
+
+    def test_drain_makes_every_instance_wait(self):
+        limits = {"requests": (1.0, 60.0)}
+        SharedRateLimiter(limits, self.db_path).drain(10, "requests", "tokens")
+        self.assertGreater(SharedRateLimiter(limits, self.db_path).try_acquire(requests=1), 9)
+        # Search is not held back by ingestion's 429
+        self.assertEqual(SharedRateLimiter(limits, self.db_path).try_acquire("interactive", requests=1), 0.0)
+
+    def test_bulk_leaves_reserve_for_interactive(self):
+        limiter = SharedRateLimiter({"requests": (1.0, 10.0)}, self.db_path, reserve=0.2)
+        for _ in range(8):
+            self.assertEqual(limiter.try_acquire(requests=1), 0.0)
+        self.assertGreater(limiter.try_acquire(requests=1), 0.0)
+        self.assertEqual(limiter.try_acquire("interactive", requests=1), 0.0)
+        self.assertEqual(limiter.try_acquire("interactive", requests=1), 0.0)
+        self.assertGreater(limiter.try_acquire("interactive", requests=1), 0.0)
+
+    def test_acquire_gives_up_at_deadline(self):
+        limiter = SharedRateLimiter({"requests": (0.01, 1.0)}, self.db_path)
+        limiter.acquire_sync("interactive", requests=1)
+        start = time.monotonic()
+        with self.assertRaises(RateLimitWaitExceeded):
+            limiter.acquire_sync("interactive", time.monotonic() + 1, requests=1)
+        with self.assertRaises(RateLimitWaitExceeded):
+            asyncio.run(limiter.acquire("interactive", time.monotonic() + 1, requests=1))
+        self.assertLess(time.monotonic() - start, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from src.ingestion.csv_source import CSVRecordSource
+from src.ingestion.record_index import RecordIndex
+
+CSV_TEXT = (
+    '﻿TOT_ID,Summary,Description\r\n'
+    '1,Supply of 5" pipes,Plain row\r\n'
+    '2,"Construction of road, phase 2","Line one\nLine two with ""quotes"""\r\n'
+    '\r\n'
+    '3,Hospital Ward,"Multi\r\nline\r\ndescription"\r\n'
+    '4,"Multi\nline title",x\n'
+    '5,Last row without newline,"a ""quoted"" word"'
+)
+
+class TestRecordIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "tenders.csv")
+        with open(self.path, "w", encoding="utf-8", newline="") as f:
+            f.write(CSV_TEXT)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_exact_count_and_record_offsets(self):
+        index = RecordIndex.build(self.path)
+        self.assertEqual(index.count, len(pd.read_csv(self.path)))
+
+        with open(self.path, "rb") as f:
+            data = f.read()
+        starts = [data[index.offset(i):].split(b",", 1)[0] for i in range(index.count)]
+        self.assertEqual(starts, [b"1", b"2", b"3", b"4", b"5"])
+        self.assertEqual(index.offset(index.count), len(data))
+
+    def test_seek_and_ranges_cover_every_row_once(self):
+        index = RecordIndex.build(self.path)
+        source = CSVRecordSource(self.path, chunk_size=2)
+
+        ids = []
+        for start, end in index.ranges(3):
+            for chunk in source.chunks(start_row=start, start_byte=index.offset(start), end_row=end):
+                ids.extend(r["TOT_ID"] for r in chunk.records)
+        self.assertEqual(ids, [1, 2, 3, 4, 5])
+
+    def test_sidecar_reused_until_file_changes(self):
+        first = RecordIndex.load_or_build(self.path)
+        npy_path, _ = RecordIndex.sidecar_paths(self.path)
+        self.assertTrue(os.path.exists(npy_path))
+
+        reused = RecordIndex.load_or_build(self.path)
+        self.assertEqual(list(reused.offsets), list(first.offsets))
+
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n6,Appended row,y\n")
+        self.assertEqual(RecordIndex.load_or_build(self.path).count, 6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import asyncio
+import unittest
+from src.ingestion.stages import Stage, StagePipeline
+
+class TestStagePipeline(unittest.TestCase):
+
+    def test_stages_overlap_and_errors_are_isolated(self):
+        log = []
+
+        async def source():
+            for i in range(6):
+                log.append(("read", i))
+                yield i
+
+        async def enrich(i):
+            await asyncio.sleep(0.01 * (i % 3))  # Uneven latency: finishes out of order
+            if i == 4:
+                raise ValueError("bad chunk")
+            log.append(("enrich", i))
+            return i * 10
+
+        async def upsert(i):
+            log.append(("upsert", i))
+            return i
+
+        results, errors = [], []
+
+        async def on_result(item):
+            results.append(item)
+
+        async def on_error(item, stage, exc):
+            errors.append((item, stage, str(exc)))
+
+        pipeline = StagePipeline([Stage("enrich", enrich, workers=3), Stage("upsert", upsert)], queue_size=1)
+        asyncio.run(pipeline.run(source(), on_result, on_error))
+
+        self.assertEqual(sorted(results), [0, 10, 20, 30, 50])
+        self.assertEqual(errors, [(4, "enrich", "bad chunk")])
+        # Upsert of an early chunk happens before the reader reaches the last chunk
+        self.assertLess(log.index(("upsert", 0)), log.index(("read", 5)))
+
+    def test_bounded_queues_apply_backpressure(self):
+        read = []
+
+        async def run():
+            gate = asyncio.Event()
+
+            async def source():
+                for i in range(20):
+                    read.append(i)
+                    yield i
+
+            async def slow(i):
+                await gate.wait()
+                return i
+
+            results = []
+
+            async def on_result(item):
+                results.append(item)
+
+            task = asyncio.create_task(StagePipeline([Stage("slow", slow)], queue_size=2).run(source(), on_result))
+            await asyncio.sleep(0.05)
+            read_while_blocked = len(read)
+            gate.set()
+            await task
+            return read_while_blocked, results
+
+        read_while_blocked, results = asyncio.run(run())
+        # 1 item in the stage + queue_size items waiting + 1 held by the feeder
+        self.assertLessEqual(read_while_blocked, 4)
+        self.assertEqual(results, list(range(20)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import os
+import csv
+import io
+import asyncio
+import tempfile
+import unittest
+import pandas as pd
+from src.ingestion.csv_source import CSVRecordSource
+from src.ingestion.streaming import StreamingCSVParser, StreamingUpload, scan_quote_state, file_signature, tail_csv_records
+
+CSV_TEXT = (
+    '﻿TOT_ID,Summary,Description\r\n'
+    '1,Supply of 5" pipes,Plain row\r\n'
+    '2,"Construction of road, phase 2","Line one\nLine two with ""quotes"""\r\n'
+    '3,Hospital Ward,\r\n'
+    '4,"Multi\r\nline title",Last row without newline'
+)
+
+def _reference_rows():
+    reader = csv.DictReader(io.StringIO(CSV_TEXT.lstrip('﻿'), newline=''))
+    return [{k: (v if v != "" else None) for k, v in row.items()} for row in reader]
+
+class TestStreamingCSV(unittest.TestCase):
+
+    def test_quote_state(self):
+        self.assertFalse(scan_quote_state('1,Supply of 5" pipes,x\n', False))
+        self.assertTrue(scan_quote_state('2,"open field\n', False))
+        self.assertFalse(scan_quote_state('still ""quoted"" then closed",x\n', True))
+        self.assertTrue(scan_quote_state(b'2,"open', False))
+
+    def test_parser_matches_csv_module_for_any_chunking(self):
+        data = CSV_TEXT.encode("utf-8")
+        expected = _reference_rows()
+        for chunk_size in (1, 3, 7, 64, len(data)):
+            with self.subTest(chunk_size=chunk_size):
+                parser = StreamingCSVParser()
+                rows = []
+                for i in range(0, len(data), chunk_size):
+                    rows.extend(parser.feed(data[i:i + chunk_size]))
+                rows.extend(parser.close())
+                self.assertEqual(rows, expected)
+
+    def test_typed_rows_match_csv_record_source(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tenders.csv")
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                f.write(CSV_TEXT.replace("Description", "Amount").replace("Plain row", "100")
+                        .replace('"Line one\nLine two with ""quotes"""', "2.5").replace("Last row without newline", "7") + "\r\n")
+            expected = [r for c in CSVRecordSource(path, chunk_size=10).chunks() for r in c.records]
+
+            parser = StreamingCSVParser(typed=True)
+            with open(path, "rb") as f:
+                rows = parser.feed(f.read()) + parser.close()
+
+            self.assertEqual([r["TOT_ID"] for r in rows], [1, 2, 3, 4])
+            self.assertEqual([r["Summary"] for r in rows], [r["Summary"] for r in expected])
+            self.assertEqual([type(r["Amount"]) for r in rows], [type(r["Amount"]) for r in expected])
+            self.assertEqual([r["Amount"] for r in rows[:2]], [100.0, 2.5])
+            self.assertTrue(pd.isna(rows[2]["Amount"]))
+
+    def test_upload_streams_rows_before_completion(self):
+        data = CSV_TEXT.encode("utf-8")
+        with tempfile.TemporaryDirectory() as tmp:
+            async def run():
+                upload = StreamingUpload(os.path.join(tmp, "daily.csv"))
+                first_row_seen_while_uploading = asyncio.Event()
+
+                async def body():
+                    mid = data.index(b"\r\n3,")
+                    yield data[:mid]
+                    await asyncio.wait_for(first_row_seen_while_uploading.wait(), timeout=5)
+                    yield data[mid:]
+
+                async def consume():
+                    rows = []
+                    async for row in upload.records():
+                        rows.append(row)
+                        if not upload.done:
+                            first_row_seen_while_uploading.set()
+                    return rows
+
+                consumer = asyncio.create_task(consume())
+                signature = await upload.write_from(body())
+                return signature, await consumer
+
+            signature, rows = asyncio.run(run())
+            # Typed like CSVRecordSource rows: ints for TOT_ID, NaN for the empty cell
+            reference = _reference_rows()
+            self.assertEqual([r["TOT_ID"] for r in rows], [int(r["TOT_ID"]) for r in reference])
+            self.assertEqual([r["Summary"] for r in rows], [r["Summary"] for r in reference])
+            self.assertTrue(pd.isna(rows[2]["Description"]))
+            self.assertEqual(signature, file_signature(len(data), data))
+
+    def test_signature_known_mid_upload_with_expected_size(self):
+        data = (CSV_TEXT * 200).encode("utf-8")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "daily.csv")
+            announced = []
+
+            async def on_signature(signature):
+                announced.append((signature, upload.done))
+
+            async def body():
+                for i in range(0, len(data), 1000):
+                    yield data[i:i + 1000]
+
+            upload = StreamingUpload(path, expected_size=len(data), on_signature=on_signature)
+            signature = asyncio.run(upload.write_from(body()))
+
+            # Same signature as the finished file read from disk, announced before the upload ended
+            with open(path, "rb") as f:
+                self.assertEqual(signature, file_signature(os.path.getsize(path), f.read(4096)))
+            self.assertEqual(announced, [(signature, False)])
+
+    def test_tail_gives_up_on_an_idle_upload(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "stalled.csv")
+            with open(path, "w") as f:
+                f.write("id,title\n1,a\n")
+
+            async def run():
+                rows = []
+                async for row in tail_csv_records(path, lambda: False, wait=lambda: asyncio.sleep(0.01), idle_timeout=0.05):
+                    rows.append(row)
+                return rows
+
+            with self.assertRaises(TimeoutError):
+                asyncio.run(run())
+
+if __name__ == '__main__':
+    unittest.main()
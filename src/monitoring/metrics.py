@@ -0,0 +1,197 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Tuple, Iterable
+
+# Latency buckets (seconds): from sub-10ms Chroma queries up to slow LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    """
+    Monotonic counter with labels. inc() is a dict update under a lock.
+    """
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels[n]) for n in self.labelnames), 0)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{"labels": list(k), "value": v} for k, v in self._values.items()]
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram with labels. observe() is one bisect plus a few adds,
+    cheap enough to leave on in production.
+    """
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (non-cumulative, last = +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(str(labels[n]) for n in self.labelnames))
+        return series[2] if series else 0
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{"labels": list(k), "buckets": list(s[0]), "sum": s[1], "count": s[2]}
+                    for k, s in self._series.items()]
+
+
+class MetricsRegistry:
+    """
+    Process-local metrics. Worker processes ship snapshot() (plain JSON) to the API
+    process, which merges them into its own series when rendering /metrics.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def render(self, extra_snapshots: Iterable[Dict[str, List[Dict[str, Any]]]] = ()) -> str:
+        """
+        Prometheus text exposition format (version 0.0.4), with `extra_snapshots`
+        (e.g. from ingestion workers) summed into this process's series.
+        """
+        extra_snapshots = list(extra_snapshots)
+        lines = []
+        for name, metric in self._metrics.items():
+            merged: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+            for snap in [metric.snapshot()] + [s.get(name, []) for s in extra_snapshots]:
+                for series in snap:
+                    key = tuple(series["labels"])
+                    if key not in merged:
+                        merged[key] = {k: (list(v) if isinstance(v, list) else v) for k, v in series.items()}
+                    elif metric.type == "counter":
+                        merged[key]["value"] += series["value"]
+                    else:
+                        target = merged[key]
+                        target["buckets"] = [a + b for a, b in zip(target["buckets"], series["buckets"])]
+                        target["sum"] += series["sum"]
+                        target["count"] += series["count"]
+
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for key, series in sorted(merged.items()):
+                if metric.type == "counter":
+                    lines.append(f"{name}{_format_labels(metric.labelnames, key)} {_format_value(series['value'])}")
+                    continue
+                cumulative = 0
+                bounds = [repr(float(b)) for b in metric.buckets] + ["+Inf"]
+                for bound, bucket_count in zip(bounds, series["buckets"]):
+                    cumulative += bucket_count
+                    le = f'le="{bound}"'
+                    lines.append(f"{name}_bucket{_format_labels(metric.labelnames, key, le)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(metric.labelnames, key)} {_format_value(series['sum'])}")
+                lines.append(f"{name}_count{_format_labels(metric.labelnames, key)} {series['count']}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_LATENCY = REGISTRY.histogram(
+    "tenders_stage_duration_seconds",
+    "Latency of each search/chat/enrichment/indexing/ingestion stage.",
+    ("component", "stage"),
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "tenders_stage_errors_total",
+    "Errors raised or swallowed per stage.",
+    ("component", "stage"),
+)
+CACHE_EVENTS = REGISTRY.counter(
+    "tenders_cache_events_total",
+    "Cache lookups by cache and result (hit/miss).",
+    ("cache", "result"),
+)
+PREFILTER_SKIPS = REGISTRY.counter(
+    "tenders_prefilter_skips_total",
+    "Tenders skipped by the enrichment pre-filter (no LLM call).",
+)
+
+
+@contextmanager
+def track(component: str, stage: str):
+    """
+    Times a stage into STAGE_LATENCY; an exception escaping the block also counts in STAGE_ERRORS.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(component=component, stage=stage)
+        raise
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - start, component=component, stage=stage)
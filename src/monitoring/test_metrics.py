@@ -0,0 +1,37 @@
+import unittest
+from src.monitoring.metrics import MetricsRegistry
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.latency = self.registry.histogram("stage_seconds", "Stage latency.", ("stage",), buckets=(0.1, 1.0))
+        self.errors = self.registry.counter("errors_total", "Errors.", ("stage",))
+
+    def test_histogram_buckets_are_cumulative(self):
+        for value in (0.05, 0.5, 0.5, 3.0):
+            self.latency.observe(value, stage="query")
+        text = self.registry.render()
+
+        self.assertIn('# TYPE stage_seconds histogram', text)
+        self.assertIn('stage_seconds_bucket{stage="query",le="0.1"} 1', text)
+        self.assertIn('stage_seconds_bucket{stage="query",le="1.0"} 3', text)
+        self.assertIn('stage_seconds_bucket{stage="query",le="+Inf"} 4', text)
+        self.assertIn('stage_seconds_count{stage="query"} 4', text)
+        self.assertIn('stage_seconds_sum{stage="query"} 4.05', text)
+
+    def test_worker_snapshots_are_merged(self):
+        self.errors.inc(stage="embedding")
+        worker = MetricsRegistry()
+        worker.counter("errors_total", "Errors.", ("stage",)).inc(2, stage="embedding")
+        worker.histogram("stage_seconds", "Stage latency.", ("stage",), buckets=(0.1, 1.0)).observe(0.2, stage="upsert")
+
+        text = self.registry.render([worker.snapshot()])
+
+        self.assertIn('errors_total{stage="embedding"} 3', text)
+        self.assertIn('stage_seconds_bucket{stage="upsert",le="1.0"} 1', text)
+        # Rendering never mutates this process's own series
+        self.assertEqual(self.errors.value(stage="embedding"), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import sys
+from src.ingestion.pipeline import IngestionPipeline
+from src.ingestion.dead_letters import DeadLetterStore
+
+async def replay(stage: str = None, limit: int = None, api_key: str = None, chunk_size: int = 500) -> int:
+    """
+    Re-runs dead-lettered records through the full pipeline (clean -> enrich -> embed -> upsert)
+    with the current configuration. Records that succeed leave the store; failures are kept
+    (with their attempt count bumped). Returns the number of records replayed.
+    """
+    store = DeadLetterStore()
+    pending = store.pending(stage=stage, limit=limit)
+    if not pending:
+        print("No dead-lettered records to replay.")
+        return 0
+
+    print(f"Replaying {len(pending)} dead-lettered records...")
+    # Rows are not read from a file: stream them in, no checkpoint, and bypass the
+    # ledger (a dead-lettered row never reached the index)
+    pipeline = IngestionPipeline(
+        input_file="dead_letters",
+        api_key=api_key,
+        chunk_size=chunk_size,
+        streaming=True,
+        incremental=False
+    )
+
+    async def rows():
+        for _, row in pending:
+            yield row
+
+    await pipeline.run_stream(rows())
+    return len(pending)
+
+def main():
+    import argparse
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Replay records from the ingestion dead-letter store")
+    parser.add_argument("--stage", help="Only replay records that failed at this stage (clean, enrich, embed, upsert)", default=None)
+    parser.add_argument("--limit", type=int, default=None, help="Replay at most this many records (oldest first)")
+    parser.add_argument("--api-key", help="Gemini API Key (overrides env var)", default=None)
+    parser.add_argument("--list", action="store_true", help="Only show dead-lettered record counts per stage")
+
+    args = parser.parse_args()
+
+    if args.list:
+        summary = DeadLetterStore().summary()
+        for stage, count in sorted(summary.items()):
+            print(f"{stage}: {count}")
+        print(f"Total: {sum(summary.values())}")
+        return
+
+    try:
+        asyncio.run(replay(stage=args.stage, limit=args.limit, api_key=args.api_key))
+    except KeyboardInterrupt:
+        print("\nReplay stopped by user.")
+        sys.exit(0)
+    except Exception as e:
+        print(f"\nReplay failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    remaining = DeadLetterStore().summary()
+    print(f"Replay finished. Still dead-lettered: {sum(remaining.values())}")
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,34 @@
 import os
 import json
+import time
 import logging
 import asyncio
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
 import chromadb
 # import google.generativeai as genai # REMOVE OLD SDK
 from google import genai
 from google.genai import types
 from dotenv import load_dotenv
+from src.indexing.sharding import get_shard_by, shard_collection_name, is_shard_of, list_shards, merge_query_results
+from src.indexing.embeddings import (
+    EMBEDDING_MODEL, get_output_dimensionality, embed_config, normalize_embeddings, check_collection_dimension,
+    existing_dimension
+)
+from src.indexing.quantized_store import QuantizedVectorStore, get_quantized_store_mode
+from src.monitoring.metrics import track, STAGE_ERRORS
+from src.ingestion.rate_control import get_rate_controller
+from src.ingestion.corrigenda import is_corrigendum
 
 load_dotenv()
 
+# Minimum seconds between shard re-listings triggered by a query for an unseen shard
+SHARD_MISS_REFRESH = 5.0
+
+# Largest quantized candidate pool tried for a filtered query before ranking only the
+# records that match the filter
+QUANTIZED_MAX_CANDIDATES = int(os.getenv("QUANTIZED_MAX_CANDIDATES", "5000"))
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -42,13 +60,19 @@ Return JSON:
 """
 
 class SmartSearchEngine:
-    def __init__(self, api_key: str = None, persist_directory: str = "./chroma_db"):
+    def __init__(self, api_key: str = None, persist_directory: str = "./chroma_db",
+                 collection_name: str = "tenders_v1", shard_by: str = None, output_dimensionality: int = None):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         if not self.api_key:
              logging.warning("No GEMINI_API_KEY found.")
         
         # Init New Client
         self.client_genai = genai.Client(api_key=self.api_key)
+        # Shared rate control for Gemini calls. Search and chat are interactive: own lanes, priority
+        # on the shared quota, fewer retries, and a bound on how long they wait for quota.
+        self.rate_control = get_rate_controller()
+        self.max_retries = 2
+        self.max_quota_wait = float(os.getenv("SEARCH_QUOTA_WAIT", "10"))
         
         # CHROMA CONNECTION LOGIC
         chroma_host = os.getenv("CHROMA_HOST")
@@ -61,7 +85,148 @@ class SmartSearchEngine:
             logging.info(f"Connecting to Local ChromaDB at {persist_directory}...")
             self.client = chromadb.PersistentClient(path=persist_directory)
 
-        self.collection = self.client.get_or_create_collection("tenders_v1")
+        # Must match the width used by ChromaLoader at ingestion time: EMBEDDING_DIM, else
+        # the width the existing index was built with
+        self.collection_name = collection_name
+        existing = None
+        if not (output_dimensionality or os.getenv("EMBEDDING_DIM")):
+            existing = existing_dimension(self.client, [collection_name, *list_shards(self.client, collection_name)])
+        self.embedding_dim = get_output_dimensionality(output_dimensionality, existing)
+
+        self.collection = self.client.get_or_create_collection(collection_name, metadata={"embedding_dim": self.embedding_dim})
+        check_collection_dimension(self.collection, self.embedding_dim)
+
+        # Sharding (must match the ChromaLoader setting used at ingestion time)
+        self.shard_by = get_shard_by(shard_by)
+        self.shards = {}
+        # Ingestion creates shard collections lazily: re-list them every CHROMA_SHARD_REFRESH
+        # seconds, and sooner (at most every SHARD_MISS_REFRESH seconds) when a query needs an unseen shard.
+        self.shard_refresh_interval = float(os.getenv("CHROMA_SHARD_REFRESH", "300"))
+        self._shards_refreshed_at = 0.0
+        if self.shard_by:
+            self.refresh_shards()
+
+        # Optional quantized local store: candidates come from the local store,
+        # metadata (and filters) from Chroma.
+        self.quantized_store = None
+        self.quantized_oversample = 5
+        quantized_mode = get_quantized_store_mode()
+        if quantized_mode:
+            store_path = os.getenv("QUANTIZED_STORE_PATH", "./vector_store")
+            self.quantized_store = QuantizedVectorStore(store_path, self.embedding_dim, quantized_mode)
+
+    def refresh_shards(self):
+        """
+        Discovers shard collections (e.g. tenders_v1__healthcare) on the Chroma server.
+        """
+        shards = {}
+        for col in self.client.list_collections():
+            name = col if isinstance(col, str) else col.name
+            if is_shard_of(self.collection_name, name):
+                shards[name] = self.client.get_collection(name)
+                check_collection_dimension(shards[name], self.embedding_dim)
+        if len(shards) != len(self.shards) or not self._shards_refreshed_at:
+            logging.info(f"Discovered {len(shards)} '{self.shard_by}' shards.")
+        self.shards = shards
+        self._shards_refreshed_at = time.monotonic()
+
+    def _current_shards(self, names: List[str] = None) -> Dict[str, Any]:
+        """
+        Known shards, re-listed when stale or when one of `names` has not been seen yet.
+        """
+        age = time.monotonic() - self._shards_refreshed_at
+        missing = any(n not in self.shards for n in names or [])
+        if age > self.shard_refresh_interval or (missing and age > SHARD_MISS_REFRESH):
+            try:
+                self.refresh_shards()
+            except Exception as e:
+                logging.warning(f"Shard refresh failed, using the {len(self.shards)} known shards: {e}")
+        return self.shards
+
+    def _target_collections(self, domains: List[str]) -> List[Any]:
+        """
+        Picks the collections a query must hit. Domain-filtered queries on a
+        domain-sharded store only touch the shards for those domains.
+        """
+        if not self.shard_by:
+            return [self.collection]
+        if self.shard_by == "domain" and domains:
+            names = [shard_collection_name(self.collection_name, d) for d in domains]
+            shards = self._current_shards(names)
+            return [shards[n] for n in names if n in shards]
+        return list(self._current_shards().values())
+
+    def count(self) -> int:
+        """
+        Total records across the flat collection or all shards.
+        """
+        if not self.shard_by:
+            return self.collection.count()
+        return sum(col.count() for col in self._current_shards().values())
+
+    async def _query_quantized(self, query_vec: List[float], n_results: int, where: Optional[Dict[str, Any]], targets: List[Any],
+                               include: List[str] = None) -> Dict[str, Any]:
+        """
+        Candidate generation on the local quantized store, then an exact re-score against the
+        vectors fetched from Chroma (with metadata + filtering). Returns Chroma's query result shape.
+
+        With a `where` filter the candidate pool widens (x4 per round) until n_results rows
+        pass it; past QUANTIZED_MAX_CANDIDATES the matching ids are fetched from Chroma first
+        and the store searches only those, so selective filters still fill the page.
+        """
+        get_include = [c for c in (include or ["metadatas", "documents"]) if c in ("metadatas", "documents")]
+        query = np.asarray(query_vec, dtype=np.float32)
+
+        async def fetch(ids: List[str], where_clause: Optional[Dict[str, Any]]) -> List[Tuple]:
+            fetched = await asyncio.gather(
+                *[asyncio.to_thread(col.get, ids=ids, where=where_clause, include=get_include + ["embeddings"])
+                  for col in targets]
+            )
+            rows = []
+            for res in fetched:
+                if not res["ids"]:
+                    continue
+                metas = res.get("metadatas") or [None] * len(res["ids"])
+                docs = res.get("documents") or [None] * len(res["ids"])
+                # Exact squared L2, Chroma's own distance for the default space
+                diffs = np.asarray(res["embeddings"], dtype=np.float32) - query
+                dists = np.einsum("ij,ij->i", diffs, diffs)
+                rows.extend(zip(dists.tolist(), res["ids"], metas, docs))
+            return rows
+
+        rows, seen = [], set()
+        n_cand = n_results * self.quantized_oversample
+        while True:
+            cand_ids, _ = await asyncio.to_thread(self.quantized_store.search, query_vec, n_cand)
+            new_ids = [i for i in cand_ids if i not in seen]
+            seen.update(new_ids)
+            if new_ids:
+                rows += await fetch(new_ids, where)
+            exhausted = len(cand_ids) < n_cand
+            if where is None or len(rows) >= n_results or exhausted:
+                break
+            n_cand *= 4
+            if n_cand > QUANTIZED_MAX_CANDIDATES:
+                # Selective filter: rank only the records that match it
+                matching = await asyncio.gather(
+                    *[asyncio.to_thread(col.get, where=where, include=[]) for col in targets]
+                )
+                within = {i for res in matching for i in res["ids"]}
+                cand_ids, _ = await asyncio.to_thread(
+                    self.quantized_store.search, query_vec, n_results * self.quantized_oversample, within=within
+                )
+                rows = await fetch(cand_ids, None) if cand_ids else []
+                break
+
+        rows.sort(key=lambda r: r[0])
+        rows = rows[:n_results]
+
+        results = {"ids": [[r[1] for r in rows]], "distances": [[r[0] for r in rows]]}
+        if "metadatas" in get_include:
+            results["metadatas"] = [[r[2] for r in rows]]
+        if "documents" in get_include:
+            results["documents"] = [[r[3] for r in rows]]
+        return results
         
     async def analyze_intent(self, query: str) -> Dict[str, Any]:
         """
@@ -77,36 +242,63 @@ class SmartSearchEngine:
             
             # Using 'gemini-2.0-flash' or 'gemini-2.5-flash-lite' as configured?
             # Sticking to the lite model requested: gemini-2.5-flash-lite
-            response = await self.client_genai.aio.models.generate_content(
-                model="gemini-2.5-flash-lite",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    temperature=0.0
-                )
+            response = await self.rate_control.run(
+                "generate",
+                lambda: self.client_genai.aio.models.generate_content(
+                    model="gemini-2.5-flash-lite",
+                    contents=prompt,
+                    config=types.GenerateContentConfig(
+                        response_mime_type="application/json",
+                        temperature=0.0
+                    )
+                ),
+                max_retries=self.max_retries,
+                priority="interactive",
+                max_wait=self.max_quota_wait,
+                requests=1,
+                tokens=len(prompt) // 4
             )
             text = response.text.replace("```json", "").replace("```", "").strip()
             return json.loads(text)
         except Exception as e:
             logging.error(f"Intent analysis failed: {e}")
+            STAGE_ERRORS.inc(component="search", stage="intent")
             return {}
 
     def get_embedding(self, text: str) -> List[float]:
         try:
-            response = self.client_genai.models.embed_content(
-                model="gemini-embedding-001",
-                contents=text,
+            response = self.rate_control.run_sync(
+                "embed",
+                lambda: self.client_genai.models.embed_content(
+                    model=EMBEDDING_MODEL,
+                    contents=text,
+                    config=embed_config(self.embedding_dim),
+                ),
+                max_retries=self.max_retries,
+                priority="interactive",
+                max_wait=self.max_quota_wait,
+                embed_requests=1
             )
-            return response.embeddings[0].values
+            return normalize_embeddings([response.embeddings[0].values], self.embedding_dim)[0]
         except Exception as e:
             logging.error(f"Embedding failed: {e}")
             raise
 
-    async def search(self, query: str, k: int = 20, include_corrigendum: bool = True):
+    async def search(self, query: str, k: int = 20, include_corrigendum: bool = True, include: List[str] = None):
+        """
+        include: Chroma columns to return (default: metadatas, documents, distances).
+        Distances are always returned (needed for shard merging); metadatas are
+        added when the corrigendum guardrail needs titles.
+        """
+        with track("search", "total"):
+            return await self._search(query, k, include_corrigendum, include)
+
+    async def _search(self, query: str, k: int, include_corrigendum: bool, include: Optional[List[str]]):
         print(f"\n--- Searching for: '{query}' (Corrigendum: {include_corrigendum}) ---")
         
         # 1. Intent Analysis
-        intent = await self.analyze_intent(query)
+        with track("search", "intent"):
+            intent = await self.analyze_intent(query)
         print(f"DEBUG: Intent Analysis: {intent}")
         
         domains = intent.get("core_domains", [])
@@ -158,20 +350,42 @@ class SmartSearchEngine:
         print(f"DEBUG: Vector Filter: {where_clause}")
         
         # 3. Vector Search
-        query_vec = self.get_embedding(refined_query)
+        with track("search", "embedding"):
+            # In a thread: rate-control backoff must not stall the event loop
+            query_vec = await asyncio.to_thread(self.get_embedding, refined_query)
         
         # Fetch slightly more to account for post-filtering
         fetch_k = k * 2 if not include_corrigendum else k
         
-        results = self.collection.query(
+        include = list(include) if include is not None else ["metadatas", "documents", "distances"]
+        if "distances" not in include:
+            include.append("distances")
+        if not include_corrigendum and "metadatas" not in include:
+            include.append("metadatas")
+
+        query_args = dict(
             query_embeddings=[query_vec],
             n_results=fetch_k,
             where=where_clause,
-            include=["metadatas", "documents", "distances"]
+            include=include
         )
+
+        targets = self._target_collections(domains if not is_broad else [])
+        with track("search", "query"):
+            if self.quantized_store:
+                results = await self._query_quantized(query_vec, fetch_k, where_clause, targets, include)
+            elif len(targets) == 1:
+                results = targets[0].query(**query_args)
+            else:
+                # Fan out to shards concurrently and merge by distance
+                shard_results = await asyncio.gather(
+                    *[asyncio.to_thread(col.query, **query_args) for col in targets]
+                )
+                results = merge_query_results(shard_results, fetch_k)
         
         # 4. Runtime Guardrail: Filter by Title text if metadata failed
-        # Many old records have is_corrigendum=False but title="Corrigendum: ..."
+        # Many old records have is_corrigendum=False but title="Corrigendum: ..." (records
+        # indexed since corrigendum linking carry the flag; this only catches older ones)
         if not include_corrigendum:
             final_ids = []
             final_metas = []
@@ -185,11 +399,10 @@ class SmartSearchEngine:
             r_docs = results["documents"][0] if results.get("documents") else []
             
             for i in range(len(r_ids)):
-                title = r_metas[i].get("original_title", "").lower()
-                summary = r_metas[i].get("description", "").lower() # Check description too?
+                title = r_metas[i].get("original_title", "")
                 
-                # STRING CHECK:
-                if "corrigendum" in title:
+                # STRING CHECK (same detector as ingestion):
+                if r_metas[i].get("is_corrigendum") is True or is_corrigendum(title):
                     # Skip it
                     continue
                     
@@ -215,10 +428,15 @@ class SmartSearchEngine:
         """
         # 1. Fetch Tender Context
         try:
-            record = self.collection.get(
-                ids=[tender_id],
-                include=["metadatas", "documents"]
-            )
+            record = {"ids": []}
+            with track("chat", "fetch"):
+                for col in ([self.collection] if not self.shard_by else self._current_shards().values()):
+                    record = col.get(
+                        ids=[tender_id],
+                        include=["metadatas", "documents"]
+                    )
+                    if record["ids"]:
+                        break
             
             if not record["ids"]:
                 return "Tender not found."
@@ -236,7 +454,8 @@ class SmartSearchEngine:
                     import httpx
                     import re
                     async with httpx.AsyncClient(follow_redirects=True, timeout=10.0) as client:
-                        resp = await client.get(url)
+                        with track("chat", "live_fetch"):
+                            resp = await client.get(url)
                         if resp.status_code == 200:
                             # Simple HTML to Text
                             raw_html = resp.text
@@ -285,10 +504,19 @@ class SmartSearchEngine:
             # If we need async, we must use `genai.Client(..., http_options=...)` or check docs.
             # Docs say: `client.aio.models.generate_content` for async.
             
-            response = await self.client_genai.aio.models.generate_content(
-                model="gemini-2.5-flash-lite",
-                contents=prompt
-            )
+            with track("chat", "generate"):
+                response = await self.rate_control.run(
+                    "generate",
+                    lambda: self.client_genai.aio.models.generate_content(
+                        model="gemini-2.5-flash-lite",
+                        contents=prompt
+                    ),
+                    max_retries=self.max_retries,
+                    priority="interactive",
+                    max_wait=self.max_quota_wait,
+                    requests=1,
+                    tokens=len(prompt) // 4
+                )
             return response.text
             
         except Exception as e:
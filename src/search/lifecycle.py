@@ -0,0 +1,122 @@
+import os
+import time
+import asyncio
+import logging
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+
+DEFAULT_WARMUP_QUERIES = ["hospital construction", "road maintenance works", "supply of IT equipment"]
+
+
+def get_warmup_queries(queries: List[str] = None) -> List[str]:
+    """
+    Canned warm-up queries (WARMUP_QUERIES, comma separated). Empty string disables warm-up.
+    """
+    if queries is not None:
+        return queries
+    env = os.getenv("WARMUP_QUERIES")
+    if env is None:
+        return list(DEFAULT_WARMUP_QUERIES)
+    return [q.strip() for q in env.split(",") if q.strip()]
+
+
+class SearchEngineLifecycle:
+    """
+    Builds the search engine off the event loop with retry, then warms the search path
+    (SDK connections, HNSW segments, quantized store pages) with canned queries.
+    The API process starts serving immediately; readiness flips once the engine is up.
+
+    States: starting -> connecting -> warming -> ready. Connection attempts never stop
+    (backoff capped at max_retry_delay); after ENGINE_INIT_ATTEMPTS consecutive failures
+    the state is "failed" and `healthy` turns False, so /health lets the orchestrator
+    restart the pod. Warm-up queries make billed Gemini calls and are best-effort: their
+    failure is reported in the state but does not hold back readiness.
+    """
+
+    def __init__(self, factory: Callable[[], Any], warmup_queries: List[str] = None,
+                 max_attempts: int = None, retry_delay: float = 2.0, max_retry_delay: float = 30.0,
+                 on_ready: Optional[Callable[[], Awaitable[None]]] = None):
+        self.factory = factory
+        self.warmup_queries = get_warmup_queries(warmup_queries)
+        self.max_attempts = max_attempts or int(os.getenv("ENGINE_INIT_ATTEMPTS", "5"))
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.on_ready = on_ready  # Optional async hook, e.g. read the index count
+        self.engine = None
+        self.state: Dict[str, Any] = {"status": "starting", "attempts": 0, "error": None,
+                                      "warmup_seconds": None, "warmup_error": None}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state["status"] == "ready"
+
+    @property
+    def healthy(self) -> bool:
+        return self.state["status"] != "failed"
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def wait_ready(self):
+        if self._task:
+            await self._task
+        return self.ready
+
+    async def _run(self):
+        await self._connect()
+        await self._warm_up()
+        self.state.update(status="ready", error=None)
+        logging.info(f"Search Engine ready (warm-up {self.state['warmup_seconds']}s).")
+        if self.on_ready:
+            try:
+                await self.on_ready()
+            except Exception as e:
+                logging.warning(f"Search Engine on_ready hook failed: {e}")
+
+    async def _connect(self):
+        self.state["status"] = "connecting"
+        delay = self.retry_delay
+        while True:
+            self.state["attempts"] += 1
+            attempt = self.state["attempts"]
+            try:
+                # Chroma/SDK clients connect synchronously: keep that off the event loop
+                self.engine = await asyncio.to_thread(self.factory)
+                logging.info("Search Engine initialized successfully.")
+                return
+            except Exception as e:
+                self.state["error"] = str(e)
+                if attempt >= self.max_attempts:
+                    self.state["status"] = "failed"
+                    logging.error(f"Search Engine init attempt {attempt} failed: {e}. Still retrying in {delay:.0f}s.")
+                else:
+                    logging.warning(f"Search Engine init attempt {attempt}/{self.max_attempts} failed: {e}. Retrying in {delay:.0f}s.")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+
+    async def _warm_up(self):
+        """
+        Runs the canned queries through the real search path. Failures (e.g. a transient
+        Gemini error) are logged and reported as warmup_error; the engine is still ready.
+        """
+        self.state["status"] = "warming"
+        start = time.time()
+        failed = 0
+        for query in self.warmup_queries:
+            try:
+                await self.engine.search(query, k=5)
+            except Exception as e:
+                failed += 1
+                self.state["warmup_error"] = str(e)
+                logging.warning(f"Warm-up query '{query}' failed: {e}")
+        if self.warmup_queries and failed == len(self.warmup_queries):
+            logging.warning("All warm-up queries failed; serving cold.")
+        self.state["warmup_seconds"] = round(time.time() - start, 3)
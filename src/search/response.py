@@ -0,0 +1,128 @@
+from typing import List, Dict, Any, Optional, Iterable
+import numpy as np
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # Fallback: stdlib json (slower, same output)
+    orjson = None
+    import json
+
+# Output field -> (metadata key, default). Fields not listed here are derived from distances.
+META_FIELDS = {
+    "title": ("original_title", "No Title"),
+    "description": ("description", "No description available."),
+    "core_domain": ("core_domain", "Unclassified"),
+    "procurement_type": ("procurement_type", "Unknown"),
+    "authority": ("authority_name", "Unknown"),
+    "country": ("country", "Unknown"),
+    "city": ("location_city", "Unknown"),
+    "state": ("location_state", "Unknown"),
+    "closing_date": ("closing_date", "N/A"),
+    "url": ("url", "#"),
+    "ref_no": ("ref_no", "N/A"),
+    "tot_id": ("tot_id", "N/A"),
+    "is_corrigendum": ("is_corrigendum", False),
+}
+SCORE_FIELDS = ("score", "match_label", "match_color")
+DEFAULT_FIELDS = ["id", *SCORE_FIELDS, *META_FIELDS]
+
+# Calibrated Scoring: piecewise linear mapping of distance -> match score
+# Dist 0.5 -> 100%, 0.7 -> 90% (Strong Semantic Match), 0.9 -> 60% (Broad Context),
+# 1.1 -> 20% (Weak), 1.2 -> 0%. Clamped outside that range.
+SCORE_DISTANCES = [0.5, 0.7, 0.9, 1.1, 1.2]
+SCORE_VALUES = [1.0, 0.9, 0.6, 0.2, 0.0]
+
+# (min score, label, UI color class), checked in order
+MATCH_LABELS = [
+    (0.85, "Excellent Match", "green"),
+    (0.65, "Strong Match", "teal"),
+    (0.45, "Good Match", "yellow"),
+]
+FALLBACK_LABEL = ("Potential Lead", "gray")
+
+
+def resolve_fields(fields: Optional[Iterable[str]]) -> List[str]:
+    """
+    Validates requested fields. None/empty means the full default projection.
+    """
+    if not fields:
+        return list(DEFAULT_FIELDS)
+    fields = list(dict.fromkeys(fields))
+    unknown = [f for f in fields if f not in DEFAULT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {unknown}. Allowed: {DEFAULT_FIELDS}")
+    return fields
+
+
+def required_includes(fields: List[str]) -> List[str]:
+    """
+    Chroma `include` columns needed to build the given fields. Documents are never needed.
+    """
+    include = []
+    if any(f in META_FIELDS for f in fields):
+        include.append("metadatas")
+    if any(f in SCORE_FIELDS for f in fields):
+        include.append("distances")
+    return include
+
+
+def calibrate_scores(distances: List[float]) -> np.ndarray:
+    """
+    Vectorized distance -> score (0..1) over the whole result set.
+    """
+    return np.interp(np.asarray(distances, dtype=np.float64), SCORE_DISTANCES, SCORE_VALUES)
+
+
+def match_labels(scores: np.ndarray):
+    conditions = [scores >= threshold for threshold, _, _ in MATCH_LABELS]
+    labels = np.select(conditions, [label for _, label, _ in MATCH_LABELS], default=FALLBACK_LABEL[0])
+    colors = np.select(conditions, [color for _, _, color in MATCH_LABELS], default=FALLBACK_LABEL[1])
+    return labels.tolist(), colors.tolist()
+
+
+def build_results(results: Dict[str, Any], fields: List[str]) -> List[Dict[str, Any]]:
+    """
+    Projects a Chroma query result (lists of lists) into response rows with only the requested fields.
+    """
+    ids = (results.get("ids") or [[]])[0]
+    if not ids:
+        return []
+
+    columns = {}
+    if "id" in fields:
+        columns["id"] = ids
+
+    if any(f in SCORE_FIELDS for f in fields):
+        scores = calibrate_scores(results["distances"][0])
+        if "score" in fields:
+            columns["score"] = np.round(scores * 100, 1).tolist()
+        if "match_label" in fields or "match_color" in fields:
+            labels, colors = match_labels(scores)
+            if "match_label" in fields:
+                columns["match_label"] = labels
+            if "match_color" in fields:
+                columns["match_color"] = colors
+
+    meta_fields = [f for f in fields if f in META_FIELDS]
+    if meta_fields:
+        metadatas = results["metadatas"][0]
+        for f in meta_fields:
+            key, default = META_FIELDS[f]
+            columns[f] = [(m or {}).get(key, default) for m in metadatas]
+
+    # Keep the requested field order
+    ordered = [(f, columns[f]) for f in fields]
+    return [{f: col[i] for f, col in ordered} for i in range(len(ids))]
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response serialized with orjson (falls back to stdlib json).
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,79 @@
+import asyncio
+import unittest
+from src.search.lifecycle import SearchEngineLifecycle
+
+class FakeEngine:
+    def __init__(self, fail_search: bool = False):
+        self.fail_search = fail_search
+        self.queries = []
+
+    async def search(self, query, k=20):
+        if self.fail_search:
+            raise RuntimeError("embedding unavailable")
+        self.queries.append(query)
+        return {"ids": [[]]}
+
+class TestSearchEngineLifecycle(unittest.TestCase):
+
+    def test_retries_connection_then_warms_up(self):
+        attempts = []
+        engine = FakeEngine()
+
+        def factory():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ConnectionError("chroma not up yet")
+            return engine
+
+        ready_hook = []
+
+        async def on_ready():
+            ready_hook.append(True)
+
+        async def run():
+            lifecycle = SearchEngineLifecycle(factory, warmup_queries=["a", "b"], max_attempts=5,
+                                              retry_delay=0.01, on_ready=on_ready)
+            self.assertFalse(lifecycle.ready)
+            lifecycle.start()
+            return lifecycle, await lifecycle.wait_ready()
+
+        lifecycle, ready = asyncio.run(run())
+        self.assertTrue(ready)
+        self.assertEqual(lifecycle.state["attempts"], 3)
+        self.assertEqual(engine.queries, ["a", "b"])
+        self.assertEqual(ready_hook, [True])
+
+    def test_warm_up_failure_does_not_block_readiness(self):
+        async def run():
+            lifecycle = SearchEngineLifecycle(lambda: FakeEngine(fail_search=True), warmup_queries=["a"], max_attempts=1)
+            lifecycle.start()
+            return lifecycle, await lifecycle.wait_ready()
+
+        lifecycle, ready = asyncio.run(run())
+        self.assertTrue(ready)
+        self.assertIn("embedding unavailable", lifecycle.state["warmup_error"])
+
+    def test_keeps_retrying_after_max_attempts(self):
+        health = []
+
+        async def run():
+            lifecycle = None
+
+            def factory():
+                health.append(lifecycle.healthy)
+                if len(health) < 4:
+                    raise ConnectionError("chroma down")
+                return FakeEngine()
+
+            lifecycle = SearchEngineLifecycle(factory, warmup_queries=[], max_attempts=2, retry_delay=0.01)
+            lifecycle.start()
+            return lifecycle, await lifecycle.wait_ready()
+
+        lifecycle, ready = asyncio.run(run())
+        # Unhealthy (so the pod can be restarted) once the attempts ran out, ready once it recovered
+        self.assertEqual(health, [True, True, False, False])
+        self.assertTrue(ready)
+        self.assertTrue(lifecycle.healthy)
+
+if __name__ == '__main__':
+    unittest.main()
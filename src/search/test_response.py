@@ -0,0 +1,48 @@
+import json
+import unittest
+from src.search.response import (
+    resolve_fields, required_includes, calibrate_scores, build_results, FastJSONResponse
+)
+
+class TestResponseBuilder(unittest.TestCase):
+
+    def test_score_calibration(self):
+        cases = [
+            (0.3, 1.0),
+            (0.5, 1.0),
+            (0.6, 0.95),
+            (0.8, 0.75),
+            (1.0, 0.4),
+            (1.15, 0.1),
+            (1.5, 0.0),
+        ]
+        scores = calibrate_scores([d for d, _ in cases])
+        for (dist, expected), score in zip(cases, scores):
+            with self.subTest(dist=dist):
+                self.assertAlmostEqual(score, expected)
+
+    def test_projection_and_includes(self):
+        self.assertEqual(required_includes(["id", "score"]), ["distances"])
+        self.assertEqual(required_includes(["id", "title"]), ["metadatas"])
+        self.assertNotIn("documents", required_includes(resolve_fields(None)))
+        with self.assertRaises(ValueError):
+            resolve_fields(["id", "embedding"])
+
+    def test_build_results(self):
+        results = {
+            "ids": [["T1", "T2"]],
+            "distances": [[0.55, 1.3]],
+            "metadatas": [[{"original_title": "Road Works", "country": "India"}, {}]],
+        }
+        rows = build_results(results, ["id", "score", "match_label", "title"])
+
+        self.assertEqual(rows[0], {"id": "T1", "score": 97.5, "match_label": "Excellent Match", "title": "Road Works"})
+        self.assertEqual(rows[1]["match_label"], "Potential Lead")
+        self.assertEqual(rows[1]["title"], "No Title")
+        self.assertEqual(build_results({"ids": [[]]}, ["id"]), [])
+
+        body = json.loads(FastJSONResponse({"results": rows}).body)
+        self.assertEqual(body["results"][0]["id"], "T1")
+
+if __name__ == '__main__':
+    unittest.main()